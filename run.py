@@ -1,7 +1,11 @@
+import os
 import argparse
 import logging
 from src.core.registries import get_dataframe_loader, get_converter
 from src.processing.pipeline import BreastImageProcessingPipeline
+from src.processing.pipeline.cache import OperationCache
+from src.processing.pipeline.profiling import OperationProfiler
+from src.utils.dicom_index import build_index
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -12,7 +16,58 @@ if __name__ == "__main__":
     parser.add_argument("--out_dir", type=str, default='./data')
     parser.add_argument("--batch_size", type=int, default=500)
     parser.add_argument("--n_workers", type=int, default=4)
+    parser.add_argument("--output_mode", type=str, default='batches', choices=['batches', 'split', 'npy', 'tar'],
+                        help="One HDF5 file per batch, a single HDF5 file per split written image by image, "
+                             "uncompressed .npy arrays per split for memory-mapped reads (MemmapDataset), "
+                             "or tar shards per split for sequential streaming reads (TarShardDataset)")
+    parser.add_argument("--storage_dtype", type=str, default='float32', choices=['float32', 'float16', 'uint16', 'uint8'],
+                        help="Dtype images are stored as; integer dtypes are dequantized when read")
+    parser.add_argument("--value_range", type=float, nargs=2, default=[0.0, 255.0],
+                        help="Range of the processed images, mapped onto integer storage dtypes")
+    parser.add_argument("--codec", type=str, default='gzip',
+                        help="HDF5 compression: none, lzf, gzip[-level] or a filter plugin (lz4, zstd[-level], blosc-lz4, ...)")
+    parser.add_argument("--chunk_layout", type=str, default=None,
+                        help="HDF5 chunk layout of the images: auto, image, images-N or tile-N")
+    parser.add_argument("--shard_size", type=int, default=1000, help="Number of samples per tar shard")
     parser.add_argument("--tmp_dir", type=str, default=None)
+    parser.add_argument("--tmp_budget", type=float, default=None,
+                        help="Maximum size of the staged files in --tmp_dir, in GB")
+    parser.add_argument("--copy_workers", type=int, default=8,
+                        help="Number of parallel copies into --tmp_dir")
+    parser.add_argument("--cache_dir", type=str, default=None,
+                        help="Directory memoizing intermediate pipeline outputs across runs")
+    parser.add_argument("--cache_size", type=float, default=None,
+                        help="Maximum size of --cache_dir, in GB")
+    parser.add_argument("--cache_after", type=str, nargs='+', default=['crop_to_roi'],
+                        help="Operations whose output is memoized in --cache_dir")
+    parser.add_argument("--lean", action="store_true",
+                        help="Keep images as uint16 through the pipeline and normalise them in place, to halve worker memory")
+    parser.add_argument("--roi_scale", type=float, default=1.0,
+                        help="Detect the breast region on a proxy downscaled by this factor (e.g. 0.125), "
+                             "see scripts/validate_roi.py")
+    parser.add_argument("--df_cache_dir", type=str, default=None,
+                        help="Directory caching the loaded DataFrames as Parquet until the annotation files change "
+                             "(default: <out_dir>/.dataframes)")
+    parser.add_argument("--no_df_cache", action="store_true", help="Parse the annotation files on every run")
+    parser.add_argument("--dicom_index", type=str, default=None,
+                        help="Header index of the input DICOM files (.parquet or .csv), built or updated before "
+                             "converting; unreadable files are skipped")
+    parser.add_argument("--schedule", type=str, default='input', choices=['input', 'size'],
+                        help="Processing order with --dicom_index: input order, or largest images first")
+    parser.add_argument("--index_workers", type=int, default=8,
+                        help="Number of parallel header reads when building --dicom_index")
+    parser.add_argument("--profile", type=str, default=None,
+                        help="JSON file receiving per-operation timings (calls, wall and CPU time percentiles, output size)")
+    parser.add_argument("--profile_memory", action="store_true",
+                        help="With --profile, also record the tracemalloc peak of each operation (slower)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip batches already completed by a previous run with the same settings")
+    parser.add_argument("--executor", type=str, default='thread', choices=['thread', 'process'],
+                        help="Run the processing pipeline in a thread pool or a persistent process pool")
+    parser.add_argument("--prefetch_depth", type=int, default=1,
+                        help="Number of prefetched chunks allowed to wait for processing")
+    parser.add_argument("--write_depth", type=int, default=1,
+                        help="Number of processed chunks allowed to wait for writing")
     args = parser.parse_args()
     parser.set_defaults(augment=True)
 
@@ -25,13 +80,42 @@ if __name__ == "__main__":
     
     logging.info(f'Running {args.dataset_name} dataset preparation')
     
-    processing_pipeline = BreastImageProcessingPipeline()
-    dataframe_loader = get_dataframe_loader(args.dataset_name, args.data_dir)
+    processing_pipeline = BreastImageProcessingPipeline(lean=args.lean, roi_scale=args.roi_scale)
+    if args.cache_dir:
+        cache_size = int(args.cache_size * 1024 ** 3) if args.cache_size else None
+        processing_pipeline.enable_cache(OperationCache(args.cache_dir, cache_size), args.cache_after)
+    if args.profile:
+        processing_pipeline.enable_profiling(OperationProfiler(trace_memory=args.profile_memory))
+    df_cache_dir = None if args.no_df_cache else (args.df_cache_dir or os.path.join(args.out_dir, '.dataframes'))
+    dataframe_loader = get_dataframe_loader(args.dataset_name, args.data_dir, cache_dir=df_cache_dir)
     dataframes = dataframe_loader.load()
     logging.info(f'Dataframes loaded: {list(dataframes.keys())}')
+    dicom_index = None
+    if args.dicom_index:
+        paths = [path for df in dataframes.values() for path in df['absolute_path']]
+        dicom_index = build_index(paths, args.dicom_index, n_workers=args.index_workers)
     
-    converter = get_converter(args.dataset_name, processing_pipeline, args.batch_size, args.n_workers, args.tmp_dir)
+    converter = get_converter(
+        args.dataset_name, processing_pipeline, args.batch_size, args.n_workers, args.tmp_dir,
+        executor=args.executor,
+        prefetch_depth=args.prefetch_depth,
+        write_depth=args.write_depth,
+        tmp_budget=int(args.tmp_budget * 1024 ** 3) if args.tmp_budget else None,
+        copy_workers=args.copy_workers,
+        resume=args.resume,
+        output_mode=args.output_mode,
+        storage_dtype=args.storage_dtype,
+        value_range=tuple(args.value_range),
+        codec=args.codec,
+        chunk_layout=args.chunk_layout,
+        shard_size=args.shard_size,
+        dicom_index=dicom_index,
+        schedule=args.schedule,
+    )
     converter.run(dataframes, args.out_dir)
+    if args.profile:
+        processing_pipeline.profiler.dump(args.profile)
+        logging.info(f"Operation profile written to {args.profile}")
     logging.info("Processing completed successfully.")
     logging.info("You can now use the processed dataset for training or evaluation.")
     logging.info("Thank you for using the KAPTIOS-AROB-BREAST-DATASETS processing pipeline!")
@@ -0,0 +1,64 @@
+import os
+import json
+import h5py
+import argparse
+import logging
+import numpy as np
+from glob import glob
+from src.utils.codecs import available_codecs, autotune, recommend
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.autotune",
+        description="[KAPTIOS-AROB-BREAST-DATASETS] Benchmark HDF5 codecs and chunk layouts on converted data")
+    parser.add_argument("--data_dir", type=str, required=True,
+                        help="Directory of converted HDF5 files (e.g. <out_dir>/train)")
+    parser.add_argument("--n_samples", type=int, default=64, help="Number of images sampled from the data")
+    parser.add_argument("--n_reads", type=int, default=200, help="Number of random reads per setting")
+    parser.add_argument("--codecs", type=str, nargs='+', default=None,
+                        help="Codecs to try (default: none, lzf, gzip-1, gzip-4, gzip-9 and every installed plugin)")
+    parser.add_argument("--layouts", type=str, nargs='+', default=['image', 'images-8', 'tile-64'],
+                        help="Chunk layouts to try")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON report path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - [KAPTIOS-AROB-BREAST-DATASETS] - %(levelname)s - %(message)s'
+    )
+
+    files = sorted(glob(os.path.join(args.data_dir, '*.h5')))
+    if not files:
+        raise SystemExit(f"No HDF5 files found in {args.data_dir}")
+
+    # Sample images across every file, keeping their storage dtype
+    rows = []
+    for file in files:
+        with h5py.File(file, 'r') as f:
+            rows.extend((file, i) for i in range(f['x'].shape[0]))
+    rng = np.random.default_rng(args.seed)
+    picked = sorted(rng.choice(len(rows), size=min(args.n_samples, len(rows)), replace=False))
+    images = []
+    for file in sorted({rows[i][0] for i in picked}):
+        with h5py.File(file, 'r') as f:
+            indices = [rows[i][1] for i in picked if rows[i][0] == file]
+            images.append(f['x'][indices])
+    images = np.concatenate(images)
+    logging.info(f"Benchmarking on {len(images)} images of shape {images.shape[1:]} ({images.dtype})")
+
+    codecs = args.codecs or ['none', 'lzf', 'gzip-1', 'gzip-4', 'gzip-9'] + available_codecs()[3:]
+    results = autotune(images, codecs, args.layouts, args.n_reads)
+
+    print(f"{'codec':<16}{'layout':<12}{'size MB':>10}{'ratio':>8}{'write s':>10}{'read p50 ms':>14}{'read p95 ms':>14}")
+    for result in results:
+        print(f"{result['codec']:<16}{result['layout']:<12}{result['size_mb']:>10.2f}{result['ratio']:>8.2f}"
+              f"{result['write_s']:>10.3f}{result['read_p50_ms']:>14.3f}{result['read_p95_ms']:>14.3f}")
+
+    recommendations = recommend(results)
+    for goal, result in recommendations.items():
+        logging.info(f"Recommended for {goal.replace('_', ' ')}: --codec {result['codec']} --chunk_layout {result['layout']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results, 'recommendations': recommendations}, f, indent=2)
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import argparse
+import logging
+import pandas as pd
+from time import perf_counter
+from src.core.df_loaders.cbis import CBISDataframeLoader, LESION_FILES
+from tests.loaders.cbis_rowwise import correct_paths_iterrows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.benchmark_cbis",
+        description="[KAPTIOS-AROB-BREAST-DATASETS] Compare the row by row and indexed corrections of the CBIS csv files")
+    parser.add_argument("--data_dir", type=str, default=None,
+                        help="CBIS-DDSM directory (default: synthetic csv files with the shapes of the real ones)")
+    parser.add_argument("--files", type=str, nargs='+', default=LESION_FILES, choices=LESION_FILES,
+                        help="Case description files to correct")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - [KAPTIOS-AROB-BREAST-DATASETS] - %(levelname)s - %(message)s'
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            from src.utils.synthetic import write_synthetic_cbis_csvs
+            data_dir = tmp_dir
+            write_synthetic_cbis_csvs(data_dir)
+        # The loader itself is only used for its helpers: no corrected file is written
+        loader = CBISDataframeLoader.__new__(CBISDataframeLoader)
+        loader.data_dir = data_dir
+        metadata_df = pd.read_csv(os.path.join(data_dir, 'metadata.csv'))
+        logging.info(f"metadata.csv: {len(metadata_df)} rows")
+
+        print(f"{'file':<36}{'rows':>6}{'iterrows s':>12}{'indexed s':>12}{'speedup':>9}")
+        for key in args.files:
+            df = pd.read_csv(os.path.join(data_dir, f"{key}.csv")).rename(columns={
+                'image file path': 'image_file_path',
+                'cropped image file path': 'cropped_image_file_path',
+                'ROI mask file path': 'roi_mask_file_path'
+            })
+            t_start = perf_counter()
+            expected = correct_paths_iterrows(loader, df.copy(), metadata_df)
+            t_iterrows = perf_counter() - t_start
+            t_start = perf_counter()
+            corrected = loader.correct_paths(df.copy(), loader.metadata_locations(metadata_df))
+            t_indexed = perf_counter() - t_start
+            pd.testing.assert_frame_equal(corrected, expected)
+            print(f"{key:<36}{len(df):>6}{t_iterrows:>12.3f}{t_indexed:>12.3f}{t_iterrows / t_indexed:>8.0f}x")
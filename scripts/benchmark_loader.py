@@ -0,0 +1,63 @@
+import time
+import torch
+import argparse
+import logging
+from torch.utils.data import DataLoader, BatchSampler, RandomSampler
+from src.utils.dataset import HDF5ChunkedDataset
+from src.utils.samplers import ChunkShuffleBatchSampler
+
+
+class PerItemDataset(HDF5ChunkedDataset):
+    """Dataset without the batched read path, so DataLoader reads one sample at a time."""
+    __getitems__ = None
+
+
+def epoch_time(dataset, batch_sampler, n_workers, max_batches=None):
+    loader = DataLoader(dataset, batch_sampler=batch_sampler, num_workers=n_workers)
+    t_start = time.perf_counter()
+    n_samples = 0
+    for i, (images, _) in enumerate(loader):
+        n_samples += len(images)
+        if max_batches is not None and i + 1 >= max_batches:
+            break
+    return time.perf_counter() - t_start, n_samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.benchmark_loader",
+        description="[KAPTIOS-AROB-BREAST-DATASETS] Compare epoch times of HDF5 loading strategies")
+    parser.add_argument("--data_dir", type=str, required=True,
+                        help="Directory of converted HDF5 files (e.g. <out_dir>/train)")
+    parser.add_argument("--batch_size", type=int, default=32)
+    parser.add_argument("--shuffle_buffer", type=int, default=1024, help="Shuffle buffer of the chunk-aware sampler")
+    parser.add_argument("--n_workers", type=int, default=0, help="Number of DataLoader workers")
+    parser.add_argument("--max_batches", type=int, default=None, help="Stop each epoch after this many batches")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - [KAPTIOS-AROB-BREAST-DATASETS] - %(levelname)s - %(message)s'
+    )
+
+    dataset = HDF5ChunkedDataset(args.data_dir)
+    if not len(dataset):
+        raise SystemExit(f"No samples found in {args.data_dir}")
+    logging.info(f"{len(dataset)} samples in {len(dataset.chunk_files)} files")
+
+    def random_batches():
+        sampler = RandomSampler(range(len(dataset)), generator=torch.Generator().manual_seed(args.seed))
+        return BatchSampler(sampler, args.batch_size, drop_last=False)
+
+    strategies = {
+        'random, per item': (PerItemDataset(args.data_dir), random_batches()),
+        'random, batched': (dataset, random_batches()),
+        'chunk shuffle, batched': (dataset, ChunkShuffleBatchSampler(
+            dataset.chunk_sizes, args.batch_size, args.shuffle_buffer, seed=args.seed)),
+    }
+
+    print(f"{'strategy':<26}{'epoch s':>10}{'samples/s':>12}")
+    for name, (strategy_dataset, batch_sampler) in strategies.items():
+        seconds, n_samples = epoch_time(strategy_dataset, batch_sampler, args.n_workers, args.max_batches)
+        print(f"{name:<26}{seconds:>10.2f}{n_samples / seconds:>12.1f}")
@@ -0,0 +1,55 @@
+import os
+import time
+import tempfile
+import argparse
+import logging
+import multiprocessing
+from src.core.converters.executors import peak_rss
+
+
+def measure(paths, lean, queue):
+    """Runs in a fresh process: processes `paths` one by one and reports the memory and time taken."""
+    from src.processing.pipeline import BreastImageProcessingPipeline
+    pipeline = BreastImageProcessingPipeline(lean=lean)
+    baseline = peak_rss()
+    t_start = time.perf_counter()
+    for path in paths:
+        pipeline.process(path)
+    queue.put({'baseline': baseline, 'peak': peak_rss(), 'seconds': time.perf_counter() - t_start})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.benchmark_memory",
+        description="[KAPTIOS-AROB-BREAST-DATASETS] Compare the peak memory of the default and lean pipelines")
+    parser.add_argument("--inputs", type=str, nargs='*', default=None,
+                        help="DICOM files to process (default: synthetic mammograms)")
+    parser.add_argument("--n_images", type=int, default=3, help="Number of synthetic mammograms")
+    parser.add_argument("--rows", type=int, default=4000)
+    parser.add_argument("--columns", type=int, default=3000)
+    parser.add_argument("--bits_stored", type=int, default=12)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - [KAPTIOS-AROB-BREAST-DATASETS] - %(levelname)s - %(message)s'
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = args.inputs
+        if not paths:
+            from src.utils.synthetic import write_synthetic_dataset
+            logging.info(f"Writing {args.n_images} synthetic {args.rows}x{args.columns} mammograms")
+            paths = write_synthetic_dataset(tmp_dir, args.n_images, args.rows, args.columns, args.bits_stored)
+
+        # One fresh worker process per mode, so each peak only reflects its own pipeline
+        context = multiprocessing.get_context("spawn")
+        print(f"{'pipeline':<10}{'peak RSS MB':>14}{'pipeline MB':>14}{'s / image':>12}")
+        for name, lean in [('default', False), ('lean', True)]:
+            queue = context.Queue()
+            process = context.Process(target=measure, args=(paths, lean, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            print(f"{name:<10}{result['peak'] / 1024 ** 2:>14.0f}{(result['peak'] - result['baseline']) / 1024 ** 2:>14.0f}"
+                  f"{result['seconds'] / len(paths):>12.3f}")
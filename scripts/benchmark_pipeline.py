@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+import argparse
+import logging
+from src.utils.synthetic import PHOTOMETRIC_INTERPRETATIONS, write_synthetic_dataset
+from src.utils.benchmark import (benchmark_operations, benchmark_converter, compare_to_baseline, load_baseline,
+                                 save_baseline)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.benchmark_pipeline",
+        description="[KAPTIOS-AROB-BREAST-DATASETS] Benchmark the processing operations and the conversion "
+                    "on synthetic mammograms, and compare them to a baseline")
+    parser.add_argument("--n_images", type=int, default=8, help="Number of synthetic mammograms")
+    parser.add_argument("--rows", type=int, default=2048)
+    parser.add_argument("--columns", type=int, default=1536)
+    parser.add_argument("--bits_stored", type=int, default=12)
+    parser.add_argument("--photometric", type=str, default='MONOCHROME2', choices=PHOTOMETRIC_INTERPRETATIONS)
+    parser.add_argument("--repeats", type=int, default=3, help="Throughputs are the best of this many passes")
+    parser.add_argument("--batch_size", type=int, default=4, help="Converter batch size")
+    parser.add_argument("--n_workers", type=int, default=2, help="Converter workers")
+    parser.add_argument("--executor", type=str, default='thread', choices=['thread', 'process'])
+    parser.add_argument("--baseline", type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json'),
+                        help="Baseline throughputs; the run fails if a benchmark is slower by more than --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed throughput drop, as a fraction of the baseline")
+    parser.add_argument("--update_baseline", action="store_true",
+                        help="Record this run as the new baseline instead of comparing to it")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - [KAPTIOS-AROB-BREAST-DATASETS] - %(levelname)s - %(message)s'
+    )
+
+    config = {key: getattr(args, key) for key in
+              ('n_images', 'rows', 'columns', 'bits_stored', 'photometric', 'batch_size', 'n_workers', 'executor')}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        logging.info(f"Writing {args.n_images} synthetic {args.rows}x{args.columns} mammograms")
+        paths = write_synthetic_dataset(tmp_dir, args.n_images, args.rows, args.columns, args.bits_stored,
+                                        args.photometric)
+        results = benchmark_operations(paths, args.repeats)
+        for lean in (False, True):
+            name = 'VindrH5Converter.run[lean]' if lean else 'VindrH5Converter.run'
+            results[name] = benchmark_converter(paths, args.batch_size, args.n_workers, args.executor, lean,
+                                                args.repeats)
+
+    baseline = None
+    if not args.update_baseline:
+        try:
+            baseline = load_baseline(args.baseline)
+        except FileNotFoundError:
+            logging.warning(f"No baseline found at {args.baseline}, run with --update_baseline to record one")
+
+    print(f"{'benchmark':<30}{'images/s':>12}{'baseline':>12}")
+    for name, value in results.items():
+        expected = baseline['results'].get(name) if baseline else None
+        print(f"{name:<30}{value:>12.1f}{expected if expected is not None else float('nan'):>12.1f}")
+
+    if args.update_baseline:
+        save_baseline(args.baseline, config, results)
+        logging.info(f"Baseline written to {args.baseline}")
+    elif baseline is not None:
+        if baseline['config'] != config:
+            logging.error(f"The baseline was recorded with other settings: {baseline['config']}")
+            sys.exit(1)
+        regressions = compare_to_baseline(results, baseline['results'], args.tolerance)
+        for regression in regressions:
+            logging.error(f"REGRESSION {regression['name']}: {regression['current']} images/s, "
+                          f"baseline {regression['baseline']:.1f} images/s")
+        if regressions:
+            sys.exit(1)
+        logging.info(f"No regression beyond {100 * args.tolerance:.0f}% of {args.baseline}")
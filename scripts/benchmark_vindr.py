@@ -0,0 +1,51 @@
+import os
+import tempfile
+import argparse
+import logging
+import pandas as pd
+from time import perf_counter
+from src.core.df_loaders import VindrDataframeLoader
+from tests.loaders.vindr_rowwise import load_rowwise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.benchmark_vindr",
+        description="[KAPTIOS-AROB-BREAST-DATASETS] Compare the row by row and vectorized Vindr-Mammo loaders")
+    parser.add_argument("--data_dir", type=str, default=None,
+                        help="Vindr-Mammo directory (default: a synthetic finding_annotations.csv)")
+    parser.add_argument("--n_rows", type=int, default=20486 * 10,
+                        help="Rows of the synthetic finding_annotations.csv (default: 10 times Vindr-Mammo)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timings are the best of this many loads")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - [KAPTIOS-AROB-BREAST-DATASETS] - %(levelname)s - %(message)s'
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            from src.utils.synthetic import write_synthetic_vindr_annotations
+            data_dir = tmp_dir
+            write_synthetic_vindr_annotations(data_dir, args.n_rows)
+        loader = VindrDataframeLoader(data_dir)
+
+        timings = {}
+        for name, load in [('row by row', lambda: load_rowwise(loader)), ('vectorized', loader.load)]:
+            best = float('inf')
+            for _ in range(args.repeats):
+                t_start = perf_counter()
+                dataframes = load()
+                best = min(best, perf_counter() - t_start)
+            timings[name] = (best, dataframes)
+
+        expected, result = timings['row by row'][1], timings['vectorized'][1]
+        for key in expected:
+            pd.testing.assert_frame_equal(result[key], expected[key])
+        n_rows = len(pd.read_csv(os.path.join(data_dir, 'finding_annotations.csv')))
+        print(f"{'loader':<14}{'seconds':>10}   ({n_rows} annotation rows, identical outputs)")
+        for name, (seconds, _) in timings.items():
+            print(f"{name:<14}{seconds:>10.3f}")
+        print(f"speedup: {timings['row by row'][0] / timings['vectorized'][0]:.1f}x")
@@ -0,0 +1,88 @@
+import json
+import time
+import tempfile
+import argparse
+import logging
+import numpy as np
+from src.processing.operations.read import read_dicom
+from src.processing.operations.normalize import minmax_normalisation
+from src.processing.operations.transform import roi_box, box_iou
+
+
+def coverage(box, reference):
+    """Fraction of the reference box inside `box`: a proxy crop must not cut the breast off."""
+    x, y, w, h = box
+    rx, ry, rw, rh = reference
+    inter_w = max(0, min(x + w, rx + rw) - max(x, rx))
+    inter_h = max(0, min(y + h, ry + rh) - max(y, ry))
+    return inter_w * inter_h / (rw * rh)
+
+
+def timed_box(image, lean, proxy_scale, margin, repeats):
+    t_start = time.perf_counter()
+    for _ in range(repeats):
+        box = roi_box(image, lean=lean, proxy_scale=proxy_scale, margin=margin)
+    return box, (time.perf_counter() - t_start) / repeats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.validate_roi",
+        description="[KAPTIOS-AROB-BREAST-DATASETS] Compare proxy ROI detection with full resolution detection")
+    parser.add_argument("--inputs", type=str, nargs='*', default=None,
+                        help="DICOM files to sample (default: synthetic mammograms)")
+    parser.add_argument("--n_samples", type=int, default=20, help="Number of files sampled from --inputs")
+    parser.add_argument("--scales", type=float, nargs='+', default=[0.5, 0.25, 0.125, 0.0625])
+    parser.add_argument("--margin", type=float, default=0.01)
+    parser.add_argument("--lean", action="store_true", help="Validate the lean pipeline mode")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed repetitions per box")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON report path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - [KAPTIOS-AROB-BREAST-DATASETS] - %(levelname)s - %(message)s'
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = args.inputs
+        if paths:
+            rng = np.random.default_rng(args.seed)
+            paths = [paths[i] for i in sorted(rng.choice(len(paths), size=min(args.n_samples, len(paths)), replace=False))]
+        else:
+            from src.utils.synthetic import write_synthetic_dataset
+            logging.info(f"Writing {args.n_samples} synthetic mammograms")
+            paths = write_synthetic_dataset(tmp_dir, args.n_samples, seed=args.seed)
+
+        results = {scale: {'iou': [], 'covered': [], 'seconds': []} for scale in args.scales}
+        full_seconds = []
+        for path in paths:
+            # Same input as crop_to_roi gets in the pipeline
+            image = minmax_normalisation(read_dicom(path, lean=args.lean), lean=args.lean)[100:-100, 100:-100]
+            reference, seconds = timed_box(image, args.lean, 1.0, args.margin, args.repeats)
+            full_seconds.append(seconds)
+            for scale in args.scales:
+                box, seconds = timed_box(image, args.lean, scale, args.margin, args.repeats)
+                results[scale]['iou'].append(box_iou(box, reference))
+                results[scale]['covered'].append(coverage(box, reference))
+                results[scale]['seconds'].append(seconds)
+
+    print(f"{'scale':>8}{'mean IoU':>10}{'min IoU':>10}{'min cover':>11}{'ms / box':>10}{'speedup':>9}")
+    print(f"{1.0:>8.4f}{1.0:>10.3f}{1.0:>10.3f}{1.0:>11.3f}{np.mean(full_seconds) * 1e3:>10.1f}{1.0:>9.1f}")
+    report = {'full_ms': float(np.mean(full_seconds) * 1e3), 'n_samples': len(paths), 'scales': {}}
+    for scale, result in results.items():
+        summary = {
+            'mean_iou': float(np.mean(result['iou'])),
+            'min_iou': float(np.min(result['iou'])),
+            'min_covered': float(np.min(result['covered'])),
+            'ms': float(np.mean(result['seconds']) * 1e3),
+            'speedup': float(np.mean(full_seconds) / np.mean(result['seconds'])),
+        }
+        report['scales'][scale] = summary
+        print(f"{scale:>8.4f}{summary['mean_iou']:>10.3f}{summary['min_iou']:>10.3f}{summary['min_covered']:>11.3f}"
+              f"{summary['ms']:>10.1f}{summary['speedup']:>9.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
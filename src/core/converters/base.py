@@ -1,69 +1,462 @@
-import math, os, gc, shutil, logging
-from typing import List, Any
+import math, os, gc, json, shutil, hashlib, logging
+import numpy as np
+from typing import List, Any, Callable, Dict, Iterator, Optional, Sequence
 from tqdm import tqdm
 from abc import ABC, abstractmethod
 from src.processing.pipeline import BasePipeline
-from src.utils.io import preload_to_local
+from .executors import ExecutorBackend, get_executor_backend
+from .stages import Stage, run_stages
+from .manifest import ConversionManifest
+from .writers import SplitWriter, H5SplitWriter, NpySplitWriter, TarShardWriter
+from src.utils.staging import StagingCache
+from src.utils.quantization import Quantizer
+from src.utils.codecs import codec_options
+from src.utils.dicom_index import SCHEDULES, schedule
 from time import perf_counter
-from concurrent.futures import ThreadPoolExecutor
+
+
+def group_rows(file_paths: Sequence[str], labels: Sequence[Sequence]) -> tuple:
+    """
+    Group the rows sharing an input file: returns the distinct files in order of first appearance, the
+    labels reordered so that the rows of each file follow each other, and the number of rows of each file.
+    """
+    rows: Dict[str, List[int]] = {}
+    for row, path in enumerate(file_paths):
+        rows.setdefault(path, []).append(row)
+    order = [row for group in rows.values() for row in group]
+    labels = [list(label) for label in labels]
+    return list(rows), [[label[row] for row in order] for label in labels], [len(group) for group in rows.values()]
+
+
+class Chunk:
+    """
+    A slice of the input file list travelling through the prefetch / process / write stages.
+
+    Each file of `paths` is processed once and gives `repeats[i]` consecutive rows of `labels`, so that
+    rows sharing an image (e.g. one row per lesion of a mammogram) share its processed output. Each row
+    is still written with its own copy of the image: every output mode and dataset reads `x` and the
+    label arrays row by row, aligned.
+    """
+    def __init__(self, idx: int, paths: List[str], labels: List[list], repeats: List[int] = None):
+        self.idx = idx
+        self.sources = paths
+        self.paths = paths
+        self.labels = labels
+        self.offsets = np.cumsum([0] + (repeats if repeats is not None else [1] * len(paths))).tolist()
+        self.images: List[Any] = []
+        self.valid_labels: List[list] = [[] for _ in labels]
+        self.n_images = 0
+        self.rows: tuple = None
+        self.checksum: str = None
+        self.t_start = perf_counter()
+
 
 class BaseConverter(ABC):
-    def __init__(self, processing_pipeline: BasePipeline, batch_size: int = 500, n_workers: int = 4, tmp_dir: str = None):
+    OUTPUT_MODES = ('batches', 'split', 'npy', 'tar')
+
+    def __init__(self, processing_pipeline: BasePipeline, batch_size: int = 500, n_workers: int = 4, tmp_dir: str = None,
+                 executor: str = 'thread', prefetch_depth: int = 1, write_depth: int = 1,
+                 tmp_budget: int = None, copy_workers: int = 8, resume: bool = False, output_mode: str = 'batches',
+                 storage_dtype: str = 'float32', value_range: tuple = (0.0, 255.0),
+                 codec: str = 'gzip', chunk_layout: str = None, shard_size: int = 1000,
+                 dicom_index: Any = None, schedule: str = 'input'):
+        """
+        Args:
+            processing_pipeline (BasePipeline): Pipeline applied to every input file.
+            batch_size (int): Number of files per chunk (and per output file).
+            n_workers (int): Number of pipeline workers.
+            tmp_dir (str, optional): Local directory the input files are staged to before processing.
+            executor (str): 'thread' or 'process' worker pool.
+            prefetch_depth (int): Number of prefetched chunks allowed to wait for processing.
+            write_depth (int): Number of processed chunks allowed to wait for writing.
+            tmp_budget (int, optional): Maximum number of bytes staged in `tmp_dir` at once.
+            copy_workers (int): Number of parallel copies into `tmp_dir`.
+            resume (bool): Skip output files that a previous run with the same settings completed.
+            output_mode (str): 'batches' writes one HDF5 file per chunk of `batch_size` files, 'split' streams
+                every image into a single HDF5 file per split as soon as it is processed, 'npy' streams them
+                into uncompressed `.npy` arrays per split, for memory-mapped reads, and 'tar' into tar shards of
+                `shard_size` samples per split, for sequential streaming reads. `codec` and `chunk_layout` only
+                apply to the HDF5 modes.
+            storage_dtype (str): Dtype images are stored as: 'float32', 'float16', 'uint16' or 'uint8'.
+                Integer dtypes are dequantized on read using the `scale` / `offset` attributes of `x`.
+            value_range (tuple): (min, max) of the pipeline output, mapped onto integer storage dtypes.
+            codec (str): Compression codec of the HDF5 datasets, e.g. 'none', 'lzf', 'gzip-1' or a filter
+                plugin such as 'zstd' when hdf5plugin is installed.
+            chunk_layout (str, optional): Chunk layout of `x`: 'auto', 'image', 'images-N' or 'tile-N'.
+                Defaults to 'auto' in batches mode and 'image' in split mode.
+            shard_size (int): Number of samples per tar shard in 'tar' mode.
+            dicom_index (pd.DataFrame, optional): Header index of the input files, see `src.utils.dicom_index`.
+                Files whose header could not be read are skipped before processing.
+            schedule (str): Processing order when `dicom_index` is given: 'input' keeps the input order,
+                'size' processes the largest images first (see `src.utils.dicom_index.schedule`).
+        """
+        if output_mode not in self.OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {output_mode}. Available: {list(self.OUTPUT_MODES)}")
         self.batch_size = batch_size
         self.n_workers = n_workers
         self.tmp_dir = tmp_dir
         self.processing_pipeline = processing_pipeline
-    
+        self.executor = executor
+        self.prefetch_depth = prefetch_depth
+        self.write_depth = write_depth
+        self.tmp_budget = tmp_budget
+        self.copy_workers = copy_workers
+        self.resume = resume
+        self.output_mode = output_mode
+        self.quantizer = Quantizer(storage_dtype, value_range)
+        codec_options(codec)  # Fail early on unknown or unavailable codecs
+        self.codec = codec
+        self.chunk_layout = chunk_layout or ('image' if output_mode == 'split' else 'auto')
+        self.shard_size = shard_size
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule: {schedule}. Available: {list(SCHEDULES)}")
+        self.dicom_index = dicom_index
+        self.schedule = schedule
+        self._backend: ExecutorBackend = None
+        self._staging: StagingCache = None
+
     @abstractmethod
     def run(self, output_dir: str):
         pass
-        
+
     @abstractmethod
-    def write(self, filename: str, batch_images: list, *args: Any, **kwargs: Any):
+    def write(self, filename: str, batch_images: Sequence[np.ndarray], *args: Any, **kwargs: Any):
         pass
-    
+
+    def label_datasets(self, n_labels: int) -> Dict[str, dict]:
+        """Names of the label datasets, mapped to the label mapping stored in their attributes."""
+        return {f"y_{i}": {} for i in range(n_labels)}
+
+    def _output_config(self) -> dict:
+        """Settings that change the content of the output files, on top of the processing pipeline."""
+        return {}
+
+    def fingerprint(self) -> str:
+        """Digest of everything that determines the output files, used to validate resumed runs."""
+        config = {
+            'converter': type(self).__name__,
+            'pipeline': self.processing_pipeline.fingerprint(),
+            'output': self._output_config(),
+            'output_mode': self.output_mode,
+            'storage': self.quantizer.attrs(),
+            'codec': self.codec,
+            'chunk_layout': self.chunk_layout,
+        }
+        if self.output_mode == 'tar':
+            config['shard_size'] = self.shard_size
+        if self.dicom_index is not None and self.schedule != 'input':
+            config['schedule'] = self.schedule
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @property
+    def stack_start(self) -> Optional[int]:
+        """
+        In 'batches' mode with a pipeline ending in fixed-shape images, the index of the first operation
+        run once on the stacked images of a chunk (see `BasePipeline.process_batch`), else None.
+        """
+        if self.output_mode != 'batches':
+            return None
+        return self.processing_pipeline.batch_start()
+
+    @property
+    def _batched_tail(self) -> bool:
+        start = self.stack_start
+        return start is not None and start < len(self.processing_pipeline.operations)
+
+    @property
+    def backend(self) -> ExecutorBackend:
+        """Worker pool running the processing pipeline, started on first use and kept across chunks."""
+        if self._backend is None:
+            if self._batched_tail:
+                # Workers stop at the fixed-shape operation, the rest runs and is quantized on the stacked chunk
+                options = {'end': self.stack_start}
+            else:
+                options = {'finalize': self.quantizer}
+            self._backend = get_executor_backend(self.executor, self.processing_pipeline, self.n_workers, **options)
+        return self._backend
+
+    @property
+    def staging(self) -> StagingCache:
+        """Cache staging input files into `tmp_dir`, or None when files are read in place."""
+        if self._staging is None and self.tmp_dir:
+            self._staging = StagingCache(self.tmp_dir, self.tmp_budget, self.copy_workers)
+        return self._staging
+
+    def close(self) -> None:
+        if self._backend is not None:
+            logging.info(f"Peak worker RSS ({self.executor}): {self._backend.peak_rss() / 1024 ** 2:.0f} MB")
+            self._backend.close()
+            self._backend = None
+        if self._staging is not None:
+            self._staging.close()
+            self._staging = None
+        if self.processing_pipeline.cache is not None:
+            self.processing_pipeline.cache.log_stats()
+        if self.processing_pipeline.profiler is not None:
+            self.processing_pipeline.profiler.log_stats()
+
     def _init(self, paths: List[str], output_dir: str) -> None:
         os.makedirs(output_dir, exist_ok=True)
-        num_batches = math.ceil(len(paths) / self.batch_size)
-        logging.info(f"Total files: {len(paths)}")
+        num_batches = math.ceil(len(set(paths)) / self.batch_size)
+        logging.info(f"Total files: {len(set(paths))}")
         logging.info(f"Processing in {num_batches} batches of {self.batch_size}")
-        logging.info(f"Using {self.n_workers} workers")
+        logging.info(f"Using {self.n_workers} {self.executor} workers")
         logging.info(f"Output directory: {output_dir}")
-    
-    def _process_batch(self, file_paths: List[str], output_dir: str) -> None:
-        num_chunks = math.ceil(len(file_paths) / self.batch_size)
+
+    def _iter_chunks(self, file_paths: Sequence[str], labels: Sequence[Sequence]) -> Iterator[Chunk]:
+        """Chunks of `batch_size` distinct files, holding every row of their files (see `group_rows`)."""
+        paths, labels, repeats = group_rows(file_paths, labels)
+        offsets = np.cumsum([0] + repeats)
+        for idx in range(math.ceil(len(paths) / self.batch_size)):
+            window = slice(idx * self.batch_size, (idx + 1) * self.batch_size)
+            rows = slice(offsets[window.start], offsets[min(window.stop, len(paths))])
+            yield Chunk(idx, paths[window], [label[rows] for label in labels], repeats[window])
+
+    def _prefetch_chunk(self, chunk: Chunk) -> Chunk:
+        if self.staging is not None:
+            # One staged path per source path, so chunk.paths stays aligned with chunk.labels
+            chunk.paths = self.staging.stage(chunk.sources)
+        return chunk
+
+    def _process_chunk(self, chunk: Chunk, sink: Callable[[Any, list], None] = None) -> Chunk:
+        """
+        Run the pipeline over the files of `chunk`.
+
+        Successfully processed images and their labels are collected in the chunk, or handed to
+        `sink(image, labels)` one by one as soon as they are ready when a sink is given. When images have
+        a fixed shape (see `stack_start`), they are collected straight into one (N, H, W) array, which the
+        remaining operations of the pipeline then process at once.
+        """
+        stacked = sink is None and self.stack_start is not None
+        # Rows of each successfully processed file, in processing order
+        repeats: List[int] = []
+        try:
+            # Staged copies are read, but the operation cache is keyed on the source files
+            results = self.backend.imap(chunk.paths, sources=chunk.sources)
+            for i, image, error in tqdm(results, total=len(chunk.paths), desc=f"Processing chunk {chunk.idx}", leave=False):
+                path = chunk.sources[i]
+                if isinstance(error, RuntimeError):
+                    logging.warning(f"Skipping {path} due to error: {error}")
+                elif error is not None:
+                    logging.error(f"Unexpected error on {path}: {error}")
+                elif image is not None:
+                    start, end = chunk.offsets[i], chunk.offsets[i + 1]
+                    chunk.n_images += end - start
+                    if sink is not None:
+                        for row in range(start, end):
+                            sink(image, [label[row] for label in chunk.labels])
+                        continue
+                    if stacked:
+                        if not repeats:
+                            chunk.images = np.empty((len(chunk.paths),) + image.shape, dtype=image.dtype)
+                        chunk.images[len(repeats)] = image
+                    else:
+                        chunk.images.extend([image] * (end - start))
+                    repeats.append(end - start)
+                    for valid, label in zip(chunk.valid_labels, chunk.labels):
+                        valid.extend(label[start:end])
+        finally:
+            if self.staging is not None:
+                self.staging.release(chunk.sources)
+        if stacked and repeats:
+            chunk.images = chunk.images[:len(repeats)]
+            if self._batched_tail:
+                chunk.images = self.quantizer(self.processing_pipeline.process_stacked(chunk.images, self.stack_start))
+            if chunk.n_images > len(repeats):
+                chunk.images = np.repeat(chunk.images, repeats, axis=0)
+        return chunk
+
+    def _chunk_filename(self, chunk: Chunk) -> str:
+        return f"batch_{chunk.idx:04d}.h5"
+
+    def _write_chunk(self, chunk: Chunk, output_dir: str, manifest: ConversionManifest) -> None:
+        filename = self._chunk_filename(chunk)
+        manifest.invalidate(filename)
+        if len(chunk.images) == 0:
+            logging.error(f"No images were processed successfully in chunk {chunk.idx}.")
+        else:
+            # Write under a temporary name, so an interrupted write never looks like a finished batch
+            path = os.path.join(output_dir, filename)
+            self.write(path + '.part', chunk.images, *chunk.valid_labels)
+            os.replace(path + '.part', path)
+        manifest.record(filename, chunk.sources, len(chunk.images))
+
+    def _process_batch(self, file_paths: Sequence[str], output_dir: str, *labels: Sequence) -> None:
+        """
+        Process `file_paths` and write the results to `output_dir`, according to `output_mode`.
+
+        Each label sequence in `labels` is aligned with `file_paths`; labels of files that fail to
+        process are dropped together with the image. A file listed in several rows is processed once and
+        written once per row, its rows grouped after the first one (see `group_rows`).
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        if self.dicom_index is not None:
+            file_paths, labels = self._schedule(file_paths, labels)
+        n_files = len(set(file_paths))
+        if n_files < len(file_paths):
+            logging.info(f"{len(file_paths)} rows reference {n_files} distinct files, each processed once")
+        if self.output_mode in ('split', 'npy', 'tar'):
+            self._process_split(file_paths, output_dir, labels)
+        else:
+            self._process_batches(file_paths, output_dir, labels)
+
+    def _share_output(self, source_dir: str, output_dir: str) -> None:
+        """
+        Make `output_dir` reference the output already converted to `source_dir` from the same files and
+        labels, instead of converting them again: every output file is linked (copied where links are not
+        supported), the single file of split mode under the name of `output_dir`.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        source_name, name = (os.path.basename(os.path.normpath(d)) for d in (source_dir, output_dir))
+        # A manifest would let a resumed run take the links for converted files
+        stale = os.path.join(output_dir, ConversionManifest.FILENAME)
+        if os.path.lexists(stale):
+            os.remove(stale)
+        for filename in sorted(os.listdir(source_dir)):
+            if filename == ConversionManifest.FILENAME or filename.endswith('.part'):
+                continue
+            target = f"{name}.h5" if filename == f"{source_name}.h5" else filename
+            path = os.path.join(output_dir, target)
+            if os.path.lexists(path):
+                os.remove(path)
+            try:
+                os.symlink(os.path.relpath(os.path.join(source_dir, filename), output_dir), path)
+            except OSError:
+                shutil.copy2(os.path.join(source_dir, filename), path)
+        logging.info(f"{output_dir} shares the output of {source_dir}")
+
+    def _schedule(self, file_paths: Sequence[str], labels: Sequence[Sequence]) -> tuple:
+        """Drop the files with an unreadable header and order the others according to `schedule`."""
+        file_paths, labels = list(file_paths), [list(label) for label in labels]
+        order, skipped = schedule(file_paths, self.dicom_index, self.schedule)
+        for position in skipped:
+            logging.warning(f"Skipping {file_paths[position]}: unreadable DICOM header")
+        return [file_paths[i] for i in order], [[label[i] for i in order] for label in labels]
+
+    def _process_batches(self, file_paths: Sequence[str], output_dir: str, labels: Sequence[Sequence]) -> None:
+        """
+        Process `file_paths` in chunks of `batch_size` and write one output file per chunk.
+
+        Prefetching, processing and writing run as overlapping stages: while chunk N is processed,
+        chunk N+1 is prefetched and chunk N-1 is written.
+
+        Completed chunks are recorded in the manifest of `output_dir`. When resuming, chunks whose
+        output file is recorded with the same inputs and settings, and still matches its checksum,
+        are skipped.
+        """
+        num_chunks = math.ceil(len(set(file_paths)) / self.batch_size)
+        manifest = ConversionManifest(output_dir, self.fingerprint())
+        if self.resume:
+            manifest.load()
+        else:
+            manifest.reset()
+
         with tqdm(total=num_chunks, desc="Processing batches") as pbar:
-            for idx in range(num_chunks):
-                batch_paths = file_paths[idx * self.batch_size:(idx + 1) * self.batch_size]
-                description_prefix = f"Chunk {idx}/{num_chunks}"
+            def pending_chunks() -> Iterator[Chunk]:
+                for chunk in self._iter_chunks(file_paths, labels):
+                    if self.resume and manifest.is_complete(self._chunk_filename(chunk), chunk.sources):
+                        logging.info(f"Chunk {chunk.idx}/{num_chunks} already converted, skipping")
+                        pbar.update()
+                        continue
+                    yield chunk
 
+            def write_stage(chunk: Chunk) -> None:
+                pbar.set_description(f"Chunk {chunk.idx}/{num_chunks} - Saving batch")
                 try:
-                    if self.tmp_dir:
-                        pbar.set_description(f"{description_prefix} - Copying to temp dir")
-                        batch_paths, _ = preload_to_local(batch_paths, custom_dir=self.tmp_dir, max_files=self.batch_size)
-
-                    pbar.set_description(f"{description_prefix} - Processing")
-                    t_start = perf_counter()
-                    with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
-                        batch_images = list(
-                            tqdm(
-                                executor.map(lambda path: self.processing_pipeline.process(path), batch_paths),
-                                total=len(batch_paths),
-                                leave=False,
-                            )
-                        )
-                    
-                    batch_images = [img for img in batch_images if img is not None]
-                    pbar.set_description(f"{description_prefix} - Saving batch to HDF5")    
-                    filename = os.path.join(output_dir, f"batch_{idx:04d}.h5")
-                    self.write(filename, batch_images)
+                    self._write_chunk(chunk, output_dir, manifest)
                 finally:
-                    if self.tmp_dir:
-                        pbar.set_description(f"{description_prefix} - Cleaning up temp dir")
-                        shutil.rmtree(self.tmp_dir)
-                    del batch_images
+                    n_images = len(chunk.images)
+                    del chunk.images
                     gc.collect()
+                    pbar.set_description(f"Chunk {chunk.idx}/{num_chunks} - {n_images} images done in {perf_counter() - chunk.t_start:.2f}s")
+                    pbar.update()
+
+            timings = run_stages(pending_chunks(), [
+                Stage('prefetch', self._prefetch_chunk, self.prefetch_depth),
+                Stage('process', self._process_chunk, self.write_depth),
+                Stage('write', write_stage),
+            ])
+        logging.info("Stage busy time: " + ", ".join(f"{name}={seconds:.2f}s" for name, seconds in timings.items()))
+
+    def _split_entry(self, filename: str, chunk: Chunk) -> str:
+        return f"{filename}[{chunk.idx:04d}]"
+
+    def _split_writer(self, output_dir: str, n_labels: int, expected_rows: int) -> SplitWriter:
+        """Writer of the output of a split: `<output_dir name>.h5`, `.npy` arrays in npy mode or shards in tar mode."""
+        overwrite = not self.resume
+        if self.output_mode == 'tar':
+            return TarShardWriter(output_dir, self.label_datasets(n_labels), shard_size=self.shard_size,
+                                  x_attrs=self.quantizer.attrs(), overwrite=overwrite)
+        if self.output_mode == 'npy':
+            return NpySplitWriter(output_dir, self.label_datasets(n_labels), expected_rows=expected_rows,
+                                  x_attrs=self.quantizer.attrs(), overwrite=overwrite)
+        filename = f"{os.path.basename(os.path.normpath(output_dir))}.h5"
+        return H5SplitWriter(os.path.join(output_dir, filename), self.label_datasets(n_labels), expected_rows=expected_rows,
+                             codec=self.codec, chunk_layout=self.chunk_layout, x_attrs=self.quantizer.attrs(),
+                             overwrite=overwrite)
+
+    def _resume_split(self, writer: SplitWriter, manifest: ConversionManifest, chunks: List[Chunk]) -> int:
+        """
+        Find the longest run of leading chunks already written to `writer` and intact, drop the rows
+        written after it, and return the number of chunks to skip.
+        """
+        filename = os.path.basename(writer.filename)
+        n_rows, n_done = 0, 0
+        for chunk in chunks:
+            entry = manifest.match(self._split_entry(filename, chunk), chunk.sources)
+            if entry is None:
+                break
+            start, end = entry['rows']
+            if start != n_rows or end > writer.n_rows or writer.rows_checksum(start, end) != entry['checksum']:
+                break
+            n_rows, n_done = end, n_done + 1
+        writer.truncate(n_rows)
+        manifest.invalidate(*[self._split_entry(filename, chunk) for chunk in chunks[n_done:]])
+        return n_done
 
-                    pbar.set_description(f"{description_prefix} - Done in {perf_counter() - t_start:.2f}s")
+    def _process_split(self, file_paths: Sequence[str], output_dir: str, labels: Sequence[Sequence]) -> None:
+        """
+        Stream every processed image of `file_paths` into a single output, see `_split_writer`.
+
+        Images are appended to the file as soon as they leave the worker pool, so memory usage does
+        not depend on `batch_size`, which only sets the prefetch granularity. Each chunk is recorded in
+        the manifest with its row range and checksum; a resumed run keeps the longest intact run of
+        leading chunks and appends the others again.
+        """
+        manifest = ConversionManifest(output_dir, self.fingerprint())
+        if self.resume:
+            manifest.load()
+        else:
+            manifest.reset()
+
+        chunks = list(self._iter_chunks(file_paths, labels))
+        writer = self._split_writer(output_dir, len(labels), expected_rows=len(file_paths))
+        filename = os.path.basename(writer.filename)
+        try:
+            n_done = self._resume_split(writer, manifest, chunks) if self.resume else 0
+            if n_done:
+                logging.info(f"{n_done}/{len(chunks)} chunks already converted, resuming at row {writer.n_rows}")
+
+            with tqdm(total=len(chunks), initial=n_done, desc=f"Streaming to {filename}") as pbar:
+                def stream_stage(chunk: Chunk) -> Chunk:
+                    writer.begin_chunk()
+                    self._process_chunk(chunk, sink=writer.append)
+                    start, end, chunk.checksum = writer.end_chunk()
+                    chunk.rows = (start, end)
+                    return chunk
+
+                def record_stage(chunk: Chunk) -> None:
+                    manifest.record(self._split_entry(filename, chunk), chunk.sources, chunk.n_images,
+                                    checksum=chunk.checksum, rows=list(chunk.rows))
+                    pbar.set_description(f"Chunk {chunk.idx}/{len(chunks)} - {chunk.n_images} images done in {perf_counter() - chunk.t_start:.2f}s")
                     pbar.update()
-                    
+
+                timings = run_stages(iter(chunks[n_done:]), [
+                    Stage('prefetch', self._prefetch_chunk, self.prefetch_depth),
+                    Stage('process', stream_stage, self.write_depth),
+                    Stage('record', record_stage),
+                ])
+        finally:
+            writer.close()
+        logging.info(f"{writer.n_rows} images written to {writer.filename}")
+        logging.info("Stage busy time: " + ", ".join(f"{name}={seconds:.2f}s" for name, seconds in timings.items()))
@@ -0,0 +1,12 @@
+from .dataframe import DataFrameH5Converter, LabelSpec
+
+class CBISH5Converter(DataFrameH5Converter):
+    """CBIS-DDSM: one label per abnormality type and pathology (see `CBISDataframeLoader.make_cls_column`)."""
+    LABELS = [
+        LabelSpec('y_pathology', 'pathology', {
+            'mass_benign': 0,
+            'mass_malignant': 1,
+            'calcification_benign': 2,
+            'calcification_malignant': 3
+        }, encode=True),
+    ]
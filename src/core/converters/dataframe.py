@@ -0,0 +1,105 @@
+import logging, json, h5py, os
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from .base import BaseConverter
+from src.processing.pipeline import BasePipeline
+from src.utils.codecs import codec_options, chunk_shape
+
+
+def label_key(value) -> str:
+    """Key of a raw label value in a label mapping: integral floats lose their '.0', strings are lower case."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip().lower()
+
+
+class LabelSpec(NamedTuple):
+    """
+    A label dataset of the output: `column` of the DataFrames, stored as int32 under `name`.
+
+    With `encode`, the column holds raw values, replaced by `mapping[label_key(value)]`; rows whose value
+    is not in the mapping are left out. Otherwise the column already holds label ids and `mapping` only
+    documents them. Either way, `mapping` is stored in the `label_mapping` attribute of the dataset.
+    """
+    name: str
+    column: str
+    mapping: Dict[str, Any]
+    encode: bool = False
+
+    def values(self, df: pd.DataFrame) -> pd.Series:
+        """Label ids of the rows of `df`, NaN where a raw value has no label."""
+        if not self.encode:
+            return df[self.column]
+        return df[self.column].map(lambda value: self.mapping.get(label_key(value), np.nan))
+
+
+class DataFrameH5Converter(BaseConverter):
+    """
+    Converts the DataFrames of any dataframe loader, described by a column spec: the column holding the
+    path of each image (`path_column`) and the label datasets to write (`labels`).
+
+    Subclasses set the spec of a dataset in `PATH_COLUMN` and `LABELS`; both can be overridden per instance.
+    """
+    PATH_COLUMN = 'absolute_path'
+    LABELS: List[LabelSpec] = []
+
+    def __init__(self, processing_pipeline: BasePipeline, *args: Any, path_column: Optional[str] = None,
+                 labels: Optional[Sequence[LabelSpec]] = None, **kwargs: Any):
+        super().__init__(processing_pipeline, *args, **kwargs)
+        self.path_column = path_column or self.PATH_COLUMN
+        self.labels = list(labels if labels is not None else self.LABELS)
+
+    def label_datasets(self, n_labels: int) -> Dict[str, dict]:
+        return {spec.name: spec.mapping for spec in self.labels}
+
+    def _output_config(self) -> dict:
+        return {'path_column': self.path_column, 'labels': [list(spec) for spec in self.labels]}
+
+    def write(self, filename: str, image_batch: Sequence[np.ndarray], *label_batches: List[int]) -> None:
+        if len(image_batch) == 0:
+            logging.warning(f"No images to write to {filename}")
+            return
+        options = codec_options(self.codec)
+        # Chunks of fixed-shape images already arrive stacked, only lists are copied
+        images = np.asarray(image_batch)
+        with h5py.File(filename, 'w') as h5_file:
+            x_dataset = h5_file.create_dataset("x", data=images, chunks=chunk_shape(self.chunk_layout, images.shape[1:], len(images)), **options)
+            x_dataset.attrs.update(self.quantizer.attrs())
+            for spec, label_batch in zip(self.labels, label_batches):
+                dataset = h5_file.create_dataset(spec.name, data=np.array(label_batch, dtype=np.int32), **options)
+                dataset.attrs['label_mapping'] = json.dumps(spec.mapping)
+
+    def run(self, dataframes: Dict[str, pd.DataFrame], output_dir: str) -> None:
+        try:
+            self._run(dataframes, output_dir)
+        finally:
+            self.close()
+
+    def _select(self, df_name: str, df: pd.DataFrame) -> tuple:
+        """Returns the paths and label columns of the rows of `df` with a path and every label."""
+        labels = [spec.values(df) for spec in self.labels]
+        valid = df[self.path_column].notna()
+        for values in labels:
+            valid &= values.notna()
+        if not valid.all():
+            logging.warning(f"Skipping {int((~valid).sum())} rows of {df_name} without an image path or a known label")
+        return df[self.path_column][valid], [values[valid] for values in labels]
+
+    def _run(self, dataframes: Dict[str, pd.DataFrame], output_dir: str) -> None:
+        # Output directory of each DataFrame already converted: loaders return the same DataFrame for
+        # splits such as 'val' and 'test', whose images are then processed and written once
+        converted: Dict[int, str] = {}
+        for df_name, df in dataframes.items():
+            save_dir = os.path.join(output_dir, df_name)
+            if id(df) in converted:
+                logging.info(f"Dataframe '{df_name}' is the dataframe of '{os.path.basename(converted[id(df)])}'")
+                self._share_output(converted[id(df)], save_dir)
+                continue
+            converted[id(df)] = save_dir
+            logging.info(f"Processing {df_name} dataframe")
+            paths, labels = self._select(df_name, df)
+            self._init(paths, save_dir)
+            logging.info(f'Saving files from {df_name} dataframe')
+            self._process_batch(paths, save_dir, *labels)
+            logging.info(f"All batches from dataframe '{df_name}' processed successfully.")
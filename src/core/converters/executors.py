@@ -0,0 +1,256 @@
+import sys
+import logging
+import multiprocessing
+import numpy as np
+from abc import ABC, abstractmethod
+from collections import deque
+from itertools import islice
+from multiprocessing import shared_memory
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from src.processing.pipeline import BasePipeline
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# (index in the submitted sequence, processed image or None, exception raised while processing or None)
+ExecutorResult = Tuple[int, Optional[np.ndarray], Optional[BaseException]]
+
+
+def peak_rss() -> int:
+    """Peak resident set size of the current process, in bytes (0 when unknown)."""
+    try:
+        # Unlike ru_maxrss, VmHWM is not inherited from the parent of a spawned process
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux, in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class ExecutorBackend(ABC):
+    """
+    Runs a processing pipeline over a sequence of inputs on a persistent worker pool.
+
+    Results are yielded in submission order, so callers can zip them back with their labels.
+    At most `max_in_flight` inputs are submitted ahead of the consumer, which keeps the number
+    of finished-but-unconsumed images bounded regardless of the sequence length.
+
+    An optional `finalize` callable is applied to every processed image inside the worker, e.g. to
+    convert it to its storage dtype before it is handed back. With `end`, workers only apply the first
+    `end` operations of the pipeline, leaving the others to the caller (see `BasePipeline.process_batch`).
+    """
+    def __init__(self, processing_pipeline: BasePipeline, n_workers: int = 4, max_in_flight: int = None,
+                 finalize: Callable = None, end: int = None):
+        self.processing_pipeline = processing_pipeline
+        self.n_workers = n_workers
+        self.max_in_flight = max_in_flight or 2 * n_workers
+        self.finalize = finalize
+        self.end = end
+        self._executor: Optional[Executor] = None
+
+    @abstractmethod
+    def _create_executor(self) -> Executor:
+        pass
+
+    @abstractmethod
+    def _submit(self, executor: Executor, item, source: Optional[str]) -> Future:
+        pass
+
+    def _result(self, future: Future) -> Optional[np.ndarray]:
+        return future.result()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._create_executor()
+        return self._executor
+
+    def imap(self, items: Iterable, sources: Optional[Iterable[str]] = None) -> Iterator[ExecutorResult]:
+        """
+        Process `items` through the pipeline and yield `(index, image, error)` in input order.
+
+        `sources` gives, for each item, the input file it was staged from, whose identity keys the
+        operation cache of the pipeline (see `BasePipeline.process`).
+
+        A failing item does not stop the iteration: its exception is returned as `error` and
+        `image` is None, leaving the decision to skip or abort to the caller.
+        """
+        executor = self.executor
+        indexed = enumerate(zip(items, sources) if sources is not None else ((item, None) for item in items))
+        pending = deque(
+            (i, self._submit(executor, *item)) for i, item in islice(indexed, self.max_in_flight)
+        )
+        try:
+            while pending:
+                i, future = pending.popleft()
+                try:
+                    image, error = self._result(future), None
+                except Exception as e:
+                    image, error = None, e
+                for j, item in islice(indexed, 1):
+                    pending.append((j, self._submit(executor, *item)))
+                yield i, image, error
+        finally:
+            # Consumer stopped early: release whatever is still in flight
+            for _, future in pending:
+                self._discard(future)
+
+    def _discard(self, future: Future) -> None:
+        future.cancel()
+
+    def peak_rss(self) -> int:
+        """Peak resident set size of a worker so far, in bytes."""
+        return peak_rss()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ThreadExecutorBackend(ExecutorBackend):
+    """
+    Runs the pipeline in a thread pool. Cheap to start, but limited by the GIL.
+
+    Workers share the memory of the main process, whose peak is reported by `peak_rss`.
+    """
+
+    def _create_executor(self) -> Executor:
+        return ThreadPoolExecutor(max_workers=self.n_workers)
+
+    def _submit(self, executor: Executor, item, source: Optional[str]) -> Future:
+        return executor.submit(_process, self.processing_pipeline, self.finalize, self.end, item, source)
+
+
+def _process(processing_pipeline: BasePipeline, finalize: Optional[Callable], end: Optional[int], item,
+             source: Optional[str] = None):
+    image = processing_pipeline.process(item, end=end, source=source)
+    if image is not None and finalize is not None:
+        image = finalize(image)
+    return image
+
+
+# Pipeline, finalize callable and number of operations installed once per worker process by the pool initializer
+_worker_pipeline: Optional[BasePipeline] = None
+_worker_finalize: Optional[Callable] = None
+_worker_end: Optional[int] = None
+
+
+def _init_process_worker(processing_pipeline: BasePipeline, finalize: Optional[Callable], end: Optional[int]) -> None:
+    global _worker_pipeline, _worker_finalize, _worker_end
+    _worker_pipeline = processing_pipeline
+    _worker_finalize = finalize
+    _worker_end = end
+
+
+def _process_to_shared_memory(item, source: Optional[str] = None) -> Tuple[Optional[Tuple[str, tuple, str]], dict]:
+    """
+    Worker side: process `item` and hand the image back through a shared memory block.
+
+    Returns the block handle (or None) together with the pipeline statistics gathered by the worker
+    and the peak memory of the worker.
+    """
+    image = _process(_worker_pipeline, _worker_finalize, _worker_end, item, source)
+    if image is None:
+        return None, _worker_stats()
+    image = np.ascontiguousarray(image)
+    shm = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+    try:
+        np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+        return (shm.name, image.shape, image.dtype.str), _worker_stats()
+    finally:
+        shm.close()
+
+
+def _worker_stats() -> dict:
+    return {**_worker_pipeline.pop_stats(), 'peak_rss': peak_rss()}
+
+
+def _read_shared_memory(name: str, shape: tuple, dtype: str) -> np.ndarray:
+    """Parent side: copy the image out of the shared memory block and release the block."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+class ProcessExecutorBackend(ExecutorBackend):
+    """
+    Runs the pipeline in a persistent process pool.
+
+    The pipeline is pickled once per worker at pool start-up. Processed images are not pickled
+    back: each worker writes its output into a shared memory block and only returns the block
+    name, shape and dtype.
+    """
+    def __init__(self, processing_pipeline: BasePipeline, n_workers: int = 4, max_in_flight: int = None,
+                 finalize: Callable = None, end: int = None, start_method: str = "spawn"):
+        super().__init__(processing_pipeline, n_workers, max_in_flight, finalize, end)
+        self.start_method = start_method
+        self._worker_peak_rss = 0
+
+    def _create_executor(self) -> Executor:
+        logging.info(f"Starting process pool with {self.n_workers} workers ({self.start_method})")
+        return ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_process_worker,
+            initargs=(self.processing_pipeline, self.finalize, self.end),
+        )
+
+    def _submit(self, executor: Executor, item, source: Optional[str]) -> Future:
+        return executor.submit(_process_to_shared_memory, item, source)
+
+    def _result(self, future: Future) -> Optional[np.ndarray]:
+        handle, stats = future.result()
+        self._worker_peak_rss = max(self._worker_peak_rss, stats.pop('peak_rss', 0))
+        self.processing_pipeline.merge_stats(stats)
+        if handle is None:
+            return None
+        return _read_shared_memory(*handle)
+
+    def peak_rss(self) -> int:
+        """Largest peak resident set size reported by a worker process so far, in bytes."""
+        return self._worker_peak_rss
+
+    def _discard(self, future: Future) -> None:
+        if not future.cancel():
+            future.add_done_callback(_release_future)
+
+
+def _release_future(future: Future) -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    handle, _ = future.result()
+    if handle is not None:
+        _read_shared_memory(*handle)
+
+
+EXECUTOR_BACKENDS = {
+    'thread': ThreadExecutorBackend,
+    'process': ProcessExecutorBackend,
+}
+
+
+def get_executor_backend(name: str, processing_pipeline: BasePipeline, n_workers: int = 4, **kwargs) -> ExecutorBackend:
+    try:
+        cls = EXECUTOR_BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown executor backend: {name}. Available: {list(EXECUTOR_BACKENDS)}")
+    return cls(processing_pipeline, n_workers, **kwargs)
@@ -0,0 +1,20 @@
+from .dataframe import DataFrameH5Converter, LabelSpec
+
+class INBreastH5Converter(DataFrameH5Converter):
+    """INbreast: BI-RADS grouped like Vindr-Mammo (3 and above suspicious), and lesion annotation status."""
+    LABELS = [
+        LabelSpec('y_birads', 'Bi-rads', {
+            '1': 1,
+            '2': 2,
+            '3': 0,
+            '4a': 0,
+            '4b': 0,
+            '4c': 0,
+            '5': 0,
+            '6': 0
+        }, encode=True),
+        LabelSpec('y_lesions', 'Lesion annotation status', {
+            '0': 0,
+            '1': 1
+        }, encode=True),
+    ]
@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+def file_checksum(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """
+    On-disk record of the output files of a conversion, used to resume interrupted runs.
+
+    The manifest lives next to the outputs (`manifest.json`) and holds one entry per output file with
+    the input paths it was built from, the fingerprint of the conversion settings, its row count and
+    its SHA-256 checksum. An output is considered complete only if all of these still match.
+
+    Args:
+        output_dir (str): Directory containing the output files.
+        fingerprint (str): Fingerprint of the pipeline and converter settings of the current run.
+    """
+    FILENAME = 'manifest.json'
+
+    def __init__(self, output_dir: str, fingerprint: str):
+        self.output_dir = output_dir
+        self.fingerprint = fingerprint
+        self.path = os.path.join(output_dir, self.FILENAME)
+        self.entries: Dict[str, dict] = {}
+
+    def load(self) -> "ConversionManifest":
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f).get('entries', {})
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+                self.entries = {}
+        return self
+
+    def save(self) -> None:
+        # Write then rename, so a crash never leaves a truncated manifest behind
+        partial = self.path + '.part'
+        with open(partial, 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'entries': self.entries}, f, indent=1)
+        os.replace(partial, self.path)
+
+    def match(self, name: str, inputs: List[str]) -> Optional[dict]:
+        """Returns the entry of `name` if it was recorded from `inputs` with the current settings."""
+        entry = self.entries.get(name)
+        if entry is None or entry.get('fingerprint') != self.fingerprint or entry.get('inputs') != list(inputs):
+            return None
+        return entry
+
+    def is_complete(self, filename: str, inputs: List[str]) -> bool:
+        """Whether `filename` was fully written from `inputs` with the current settings and is intact."""
+        entry = self.match(filename, inputs)
+        if entry is None:
+            return False
+        path = os.path.join(self.output_dir, filename)
+        if entry['n_rows'] == 0:
+            return not os.path.exists(path)
+        if not os.path.exists(path):
+            return False
+        if file_checksum(path) != entry['checksum']:
+            logging.warning(f"Checksum mismatch for {path}, it will be rewritten")
+            return False
+        return True
+
+    def record(self, name: str, inputs: List[str], n_rows: int, checksum: str = None, **extra) -> None:
+        """
+        Mark `name` as complete. Must be called once its content was fully written.
+
+        By default `name` is an output file and its checksum is computed from its content. Entries
+        covering part of a file pass their own `checksum` and location (e.g. a row range) in `extra`.
+        """
+        if checksum is None and n_rows:
+            checksum = file_checksum(os.path.join(self.output_dir, name))
+        self.entries[name] = {
+            'inputs': list(inputs),
+            'fingerprint': self.fingerprint,
+            'n_rows': n_rows,
+            'checksum': checksum,
+            'completed_at': datetime.now(timezone.utc).isoformat(),
+            **extra,
+        }
+        self.save()
+
+    def invalidate(self, *names: str) -> None:
+        if [self.entries.pop(name) for name in names if name in self.entries]:
+            self.save()
+
+    def reset(self) -> None:
+        """Forget every entry, e.g. when starting a fresh (non resumed) conversion."""
+        self.entries = {}
+        self.save()
+
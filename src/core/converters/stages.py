@@ -0,0 +1,114 @@
+import queue
+import threading
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+# Marks the end of a stage's output stream
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a streaming stage pipeline.
+
+    Args:
+        name (str): Name used in timing reports.
+        fn (callable): Function applied to every item flowing through the stage.
+        queue_depth (int): Number of finished items allowed to wait for the next stage.
+            The stage blocks once its output queue is full, which bounds memory usage.
+    """
+    def __init__(self, name: str, fn: Callable[[Any], Any], queue_depth: int = 1):
+        if queue_depth < 1:
+            raise ValueError(f"queue_depth of stage '{name}' must be >= 1, got {queue_depth}")
+        self.name = name
+        self.fn = fn
+        self.queue_depth = queue_depth
+
+
+def run_stages(items: Iterable, stages: List[Stage], poll_interval: float = 0.1) -> Dict[str, float]:
+    """
+    Stream `items` through `stages`, each stage running concurrently with the others.
+
+    Every stage except the last one runs in its own thread and hands its outputs to the next stage
+    through a bounded queue, so while item N is in stage k, item N+1 can already be in stage k-1
+    and item N-1 in stage k+1. The last stage runs in the calling thread. The first exception
+    raised by any stage stops the whole pipeline and is re-raised here.
+
+    Args:
+        items (Iterable): Inputs of the first stage.
+        stages (list): Stages to chain, in order.
+        poll_interval (float): How often blocked threads check whether the pipeline was stopped.
+
+    Returns:
+        dict: Time spent inside each stage's function, plus the total wall-clock time under 'wall'.
+    """
+    if not stages:
+        raise ValueError("At least one stage is required")
+
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    busy = {stage.name: 0.0 for stage in stages}
+    queues = [queue.Queue(maxsize=stage.queue_depth) for stage in stages[:-1]]
+
+    def put(q: queue.Queue, item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=poll_interval)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def drain(q: queue.Queue) -> Iterator:
+        while not stop.is_set():
+            try:
+                item = q.get(timeout=poll_interval)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+    def apply(stage: Stage, item: Any) -> Any:
+        t_start = perf_counter()
+        try:
+            return stage.fn(item)
+        finally:
+            busy[stage.name] += perf_counter() - t_start
+
+    def worker(stage: Stage, source: Iterable, out_q: queue.Queue) -> None:
+        try:
+            for item in source:
+                if not put(out_q, apply(stage, item)):
+                    return
+            put(out_q, _DONE)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    t_start = perf_counter()
+    threads: List[threading.Thread] = []
+    source: Iterable = items
+    for stage, out_q in zip(stages[:-1], queues):
+        thread = threading.Thread(target=worker, args=(stage, source, out_q), name=f"stage-{stage.name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+        source = drain(out_q)
+
+    try:
+        for item in source:
+            apply(stages[-1], item)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        if errors:
+            stop.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    busy['wall'] = perf_counter() - t_start
+    return busy
+
@@ -0,0 +1,455 @@
+import io
+import os
+import json
+import tarfile
+import h5py
+import hashlib
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Tuple
+from src.utils.codecs import codec_options, chunk_shape
+
+NPY_HEADER_FILENAME = "header.json"
+TAR_INDEX_FILENAME = "shards.json"
+
+
+class SplitWriter(ABC):
+    """
+    Base class of the writers streaming images and labels into a single output, one row at a time.
+
+    Rows are grouped into chunks of work (`begin_chunk` / `end_chunk`), each reported with its row
+    range and a checksum of its content, so a manifest can later verify and resume the output.
+    Subclasses store the rows (`_write_row`, `_read_rows`, `_flush`) and set `n_rows` on opening.
+    """
+    def __init__(self, filename: str, label_datasets: Dict[str, dict]):
+        self.filename = filename
+        self.label_names = list(label_datasets)
+        self.label_datasets = label_datasets
+        self.n_rows = 0
+        self._chunk_start = 0
+        self._chunk_digest = None
+        self._chunk_labels: List[list] = []
+
+    @abstractmethod
+    def _write_row(self, image: np.ndarray, labels: List[int]) -> np.dtype:
+        """Write row `n_rows` and return the storage dtype of the images."""
+        pass
+
+    @abstractmethod
+    def _read_rows(self, start: int, end: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Return the images and each label array of rows [start, end)."""
+        pass
+
+    @abstractmethod
+    def _flush(self) -> None:
+        pass
+
+    def begin_chunk(self) -> None:
+        self._chunk_start = self.n_rows
+        self._chunk_digest = hashlib.sha256()
+        self._chunk_labels = [[] for _ in self.label_names]
+
+    def append(self, image: np.ndarray, labels: List) -> None:
+        image = np.asarray(image)
+        labels = [int(label) for label in labels]
+        dtype = self._write_row(image, labels)
+        for chunk_labels, label in zip(self._chunk_labels, labels):
+            chunk_labels.append(label)
+        if self._chunk_digest is not None:
+            self._chunk_digest.update(np.ascontiguousarray(image, dtype=dtype).tobytes())
+        self.n_rows += 1
+
+    def end_chunk(self) -> Tuple[int, int, str]:
+        """Flush the rows of the current chunk and return (first row, end row, checksum)."""
+        digest = self._chunk_digest or hashlib.sha256()
+        for chunk_labels in self._chunk_labels:
+            digest.update(np.asarray(chunk_labels, dtype=np.int32).tobytes())
+        self._flush()
+        self._chunk_digest = None
+        return self._chunk_start, self.n_rows, digest.hexdigest()
+
+    def rows_checksum(self, start: int, end: int) -> str:
+        """Checksum of rows [start, end), computed the same way as by `end_chunk`."""
+        digest = hashlib.sha256()
+        if end > start:
+            images, labels = self._read_rows(start, end)
+            for image in images:
+                digest.update(np.ascontiguousarray(image).tobytes())
+            for label in labels:
+                digest.update(np.asarray(label, dtype=np.int32).tobytes())
+        return digest.hexdigest()
+
+    def truncate(self, n_rows: int) -> None:
+        """Drop every row from `n_rows` on, e.g. rows of chunks that were not completed."""
+        self.n_rows = min(self.n_rows, n_rows)
+        self._flush()
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class H5SplitWriter(SplitWriter):
+    """
+    Streams images and labels into a single HDF5 file, one row at a time.
+
+    The `x` dataset and the label datasets are chunked and resizable. They are preallocated for
+    `expected_rows` rows, grown geometrically if more rows arrive, and trimmed to the number of
+    written rows on `close`. Memory usage is therefore one image, whatever the number of rows.
+
+    Args:
+        filename (str): Output HDF5 file. An existing file is reopened and appended to.
+        label_datasets (dict): Label dataset names, mapped to the label mapping stored in their attributes.
+        expected_rows (int): Number of rows to preallocate.
+        codec (str): Compression codec of every dataset, see `src.utils.codecs.codec_options`.
+        chunk_layout (str): Chunk layout of the `x` dataset, see `src.utils.codecs.chunk_shape`.
+        x_attrs (dict, optional): Attributes of the `x` dataset, e.g. its dequantization parameters.
+        overwrite (bool): Replace an existing file instead of appending to it.
+    """
+    def __init__(self, filename: str, label_datasets: Dict[str, dict], expected_rows: int = 0,
+                 codec: str = "gzip", chunk_layout: str = "image", x_attrs: dict = None, overwrite: bool = False):
+        super().__init__(filename, label_datasets)
+        self.expected_rows = expected_rows
+        self.codec_options = codec_options(codec)
+        self.chunk_layout = chunk_layout
+        self.x_attrs = x_attrs or {}
+        self.h5_file = h5py.File(filename, 'w' if overwrite else 'a')
+        self.n_rows = int(self.h5_file.attrs.get('n_rows', 0))
+
+    def _create_datasets(self, image: np.ndarray) -> None:
+        rows = max(self.expected_rows, 1)
+        x = self.h5_file.create_dataset(
+            "x", shape=(rows,) + image.shape, maxshape=(None,) + image.shape, dtype=image.dtype,
+            chunks=chunk_shape(self.chunk_layout, image.shape) or True, **self.codec_options,
+        )
+        x.attrs.update(self.x_attrs)
+        for name, mapping in self.label_datasets.items():
+            dataset = self.h5_file.create_dataset(
+                name, shape=(rows,), maxshape=(None,), dtype=np.int32,
+                chunks=(min(rows, 4096),), **self.codec_options,
+            )
+            dataset.attrs['label_mapping'] = json.dumps(mapping)
+
+    def _datasets(self) -> List[h5py.Dataset]:
+        return [self.h5_file["x"]] + [self.h5_file[name] for name in self.label_names]
+
+    def _reserve(self, n_rows: int) -> None:
+        capacity = self.h5_file["x"].shape[0]
+        if n_rows > capacity:
+            for dataset in self._datasets():
+                dataset.resize(max(n_rows, 2 * capacity), axis=0)
+
+    def _write_row(self, image: np.ndarray, labels: List[int]) -> np.dtype:
+        if "x" not in self.h5_file:
+            self._create_datasets(image)
+        self._reserve(self.n_rows + 1)
+        self.h5_file["x"][self.n_rows] = image
+        for name, label in zip(self.label_names, labels):
+            self.h5_file[name][self.n_rows] = label
+        return self.h5_file["x"].dtype
+
+    def _read_rows(self, start: int, end: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        if "x" not in self.h5_file:
+            return [], []
+        images = (self.h5_file["x"][i] for i in range(start, end))
+        return images, [self.h5_file[name][start:end] for name in self.label_names]
+
+    def _flush(self) -> None:
+        self.h5_file.attrs['n_rows'] = self.n_rows
+        self.h5_file.flush()
+
+    def close(self) -> None:
+        if "x" in self.h5_file:
+            for dataset in self._datasets():
+                dataset.resize(self.n_rows, axis=0)
+        self.h5_file.attrs['n_rows'] = self.n_rows
+        self.h5_file.close()
+
+
+def resize_npy(path: str, n_rows: int) -> None:
+    """
+    Resizes the first axis of a C-ordered `.npy` file in place, by rewriting its shape and its length.
+
+    The new header must fit in the space of the old one, which numpy pads for the first axis to grow.
+    """
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        offset = f.tell()
+        if fortran_order:
+            raise ValueError(f"Cannot resize Fortran-ordered array {path}")
+        header_start = 8 + (2 if version == (1, 0) else 4)
+        header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                       'shape': (n_rows,) + tuple(shape[1:])})
+        if len(header) + 1 > offset - header_start:
+            raise ValueError(f"New header of {path} does not fit in the existing one")
+        f.seek(header_start)
+        f.write((header.ljust(offset - header_start - 1) + '\n').encode('latin1'))
+        f.truncate(offset + n_rows * int(np.prod(shape[1:], dtype=np.int64)) * dtype.itemsize)
+
+
+class NpySplitWriter(SplitWriter):
+    """
+    Streams images and labels into uncompressed `.npy` arrays, for memory-mapped reads.
+
+    `output_dir` receives `x.npy` with the images, one int32 `.npy` array per label, and a JSON
+    header (see `NPY_HEADER_FILENAME`) describing them together with the number of written rows.
+    Arrays are preallocated for `expected_rows` rows and written through memory maps, and trimmed to
+    the number of written rows on `close`.
+
+    Args:
+        output_dir (str): Output directory. Existing arrays are reopened and appended to.
+        label_datasets (dict): Label array names, mapped to the label mapping stored in the header.
+        expected_rows (int): Number of rows to preallocate.
+        x_attrs (dict, optional): Attributes of the images stored in the header, e.g. their dequantization parameters.
+        overwrite (bool): Replace existing arrays instead of appending to them.
+    """
+    def __init__(self, output_dir: str, label_datasets: Dict[str, dict], expected_rows: int = 0,
+                 x_attrs: dict = None, overwrite: bool = False):
+        super().__init__(os.path.join(output_dir, NPY_HEADER_FILENAME), label_datasets)
+        self.output_dir = output_dir
+        self.expected_rows = expected_rows
+        self.x_attrs = x_attrs or {}
+        self.arrays: Dict[str, np.memmap] = {}
+        if not overwrite and os.path.exists(self.filename):
+            names = ["x"] + self.label_names
+            if all(os.path.exists(self._path(name)) for name in names):
+                with open(self.filename) as f:
+                    self.n_rows = int(json.load(f)['n_rows'])
+                for name in names:
+                    path = self._path(name)
+                    resize_npy(path, max(self.expected_rows, self.n_rows, 1))
+                    self.arrays[name] = np.load(path, mmap_mode='r+')
+            # Otherwise the header was flushed before the first image: the arrays are created as on a fresh run
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.output_dir, f"{name}.npy")
+
+    def _create_arrays(self, image: np.ndarray) -> None:
+        rows = max(self.expected_rows, 1)
+        self.arrays["x"] = np.lib.format.open_memmap(self._path("x"), mode='w+', dtype=image.dtype,
+                                                     shape=(rows,) + image.shape)
+        for name in self.label_names:
+            self.arrays[name] = np.lib.format.open_memmap(self._path(name), mode='w+', dtype=np.int32, shape=(rows,))
+
+    def _reserve(self, n_rows: int) -> None:
+        capacity = self.arrays["x"].shape[0]
+        if n_rows > capacity:
+            for name in list(self.arrays):
+                self.arrays[name].flush()
+                del self.arrays[name]
+                resize_npy(self._path(name), max(n_rows, 2 * capacity))
+                self.arrays[name] = np.load(self._path(name), mmap_mode='r+')
+
+    def _write_row(self, image: np.ndarray, labels: List[int]) -> np.dtype:
+        if "x" not in self.arrays:
+            self._create_arrays(image)
+        self._reserve(self.n_rows + 1)
+        self.arrays["x"][self.n_rows] = image
+        for name, label in zip(self.label_names, labels):
+            self.arrays[name][self.n_rows] = label
+        return self.arrays["x"].dtype
+
+    def _read_rows(self, start: int, end: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        if "x" not in self.arrays:
+            return [], []
+        return self.arrays["x"][start:end], [self.arrays[name][start:end] for name in self.label_names]
+
+    def _flush(self) -> None:
+        for array in self.arrays.values():
+            array.flush()
+        header = {'n_rows': self.n_rows, 'x': {'file': "x.npy", **self.x_attrs}, 'labels': {}}
+        if "x" in self.arrays:
+            header['x'].update(shape=list(self.arrays["x"].shape[1:]), dtype=self.arrays["x"].dtype.str)
+        for name, mapping in self.label_datasets.items():
+            header['labels'][name] = {'file': f"{name}.npy", 'label_mapping': mapping}
+        with open(self.filename + '.part', 'w') as f:
+            json.dump(header, f, indent=2)
+        os.replace(self.filename + '.part', self.filename)
+
+    def close(self) -> None:
+        self._flush()
+        names = list(self.arrays)
+        self.arrays.clear()
+        for name in names:
+            resize_npy(self._path(name), self.n_rows)
+
+
+class TarShardWriter(SplitWriter):
+    """
+    Streams images and labels into fixed-size tar shards, for sequential reads from network storage.
+
+    Every sample is stored as two consecutive members sharing its row number as key: `<key>.npy`,
+    the image encoded with `np.save`, and `<key>.json`, its labels. Shards hold `shard_size` samples
+    (the last one fewer) and are listed, with their sample counts, in a JSON index (see
+    `TAR_INDEX_FILENAME`) that also stores the image attributes and the label mappings.
+
+    Args:
+        output_dir (str): Output directory. Existing shards are reopened and appended to.
+        label_datasets (dict): Label names, mapped to the label mapping stored in the index.
+        shard_size (int): Number of samples per shard.
+        x_attrs (dict, optional): Attributes of the images stored in the index, e.g. their dequantization parameters.
+        overwrite (bool): Replace existing shards instead of appending to them.
+    """
+    def __init__(self, output_dir: str, label_datasets: Dict[str, dict], shard_size: int = 1000,
+                 x_attrs: dict = None, overwrite: bool = False):
+        super().__init__(os.path.join(output_dir, TAR_INDEX_FILENAME), label_datasets)
+        if shard_size < 1:
+            raise ValueError(f"Invalid shard size: {shard_size}")
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.x_attrs = x_attrs or {}
+        self.shards: List[dict] = []
+        self._image_info: dict = {}
+        self._tar: tarfile.TarFile = None
+        # Location of the members of each row, see `_index_members`
+        self._row_members: Dict[int, Dict[str, Tuple[str, int, int]]] = None
+        if os.path.exists(self.filename):
+            with open(self.filename) as f:
+                index = json.load(f)
+            if overwrite:
+                self._remove_shards(index['shards'])
+            else:
+                self.shards = index['shards']
+                self.n_rows = int(index['n_rows'])
+                self._image_info = {key: index['x'][key] for key in ('shape', 'dtype') if key in index['x']}
+                # Resumed runs check the checksum of every chunk: locate the rows once
+                self._row_members = self._index_members()
+
+    def _shard_path(self, shard: dict) -> str:
+        return os.path.join(self.output_dir, shard['file'])
+
+    def _remove_shards(self, shards: List[dict]) -> None:
+        for shard in shards:
+            if os.path.exists(self._shard_path(shard)):
+                os.remove(self._shard_path(shard))
+
+    def _add_member(self, name: str, data: bytes) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def _write_row(self, image: np.ndarray, labels: List[int]) -> np.dtype:
+        self._row_members = None
+        if self._tar is None:
+            if self.shards and self.shards[-1]['n_samples'] < self.shard_size:
+                # The shard may lack its end-of-archive blocks, e.g. after an interrupted run
+                self._seal_shard(self.shards[-1])
+                self._tar = tarfile.open(self._shard_path(self.shards[-1]), 'a')
+            else:
+                self.shards.append({'file': f"shard-{len(self.shards):05d}.tar", 'n_samples': 0})
+                self._tar = tarfile.open(self._shard_path(self.shards[-1]), 'w')
+        key = f"{self.n_rows:09d}"
+        encoded = io.BytesIO()
+        np.save(encoded, image, allow_pickle=False)
+        self._add_member(f"{key}.npy", encoded.getvalue())
+        self._add_member(f"{key}.json", json.dumps(dict(zip(self.label_names, labels))).encode('utf-8'))
+        self._image_info = {'shape': list(image.shape), 'dtype': image.dtype.str}
+
+        self.shards[-1]['n_samples'] += 1
+        if self.shards[-1]['n_samples'] == self.shard_size:
+            self._tar.close()
+            self._tar = None
+        return image.dtype
+
+    def _close_shard(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+
+    def _members(self, shard: dict) -> Iterator[Tuple[int, str, tarfile.TarInfo, tarfile.TarFile]]:
+        """Yields (row, extension, member, open tar file) for the readable members of a shard."""
+        try:
+            with tarfile.open(self._shard_path(shard), 'r') as tar:
+                for member in tar:
+                    key, extension = member.name.split('.', 1)
+                    yield int(key), extension, member, tar
+        except (OSError, tarfile.TarError):
+            # Missing or damaged shard: its rows no longer match their checksums
+            return
+
+    def _seal_shard(self, shard: dict, end_row: int = None) -> None:
+        """Cut a shard before the members of row `end_row` (default: after its last readable member) and end the archive there."""
+        self._row_members = None
+        end = 0
+        for row, _, member, _ in self._members(shard):
+            if end_row is not None and row >= end_row:
+                break
+            end = member.offset_data + -(-member.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        with open(self._shard_path(shard), 'r+b') as f:
+            f.truncate(end)
+            f.seek(end)
+            f.write(b'\0' * (2 * tarfile.BLOCKSIZE))
+
+    def _index_members(self) -> Dict[int, Dict[str, Tuple[str, int, int]]]:
+        """Locate the readable members of every row in one pass over the shards: {row: {extension: (shard path, offset, size)}}."""
+        row_members = {}
+        for shard in self.shards:
+            for row, extension, member, _ in self._members(shard):
+                row_members.setdefault(row, {})[extension] = (self._shard_path(shard), member.offset_data, member.size)
+        return row_members
+
+    def _read_rows(self, start: int, end: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        self._close_shard()
+        if self._row_members is None:
+            self._row_members = self._index_members()
+        images, labels = [], []
+        files = {}
+        try:
+            for row in range(start, end):
+                # Members of damaged shards are missing, so their rows no longer match their checksums
+                for extension, (path, offset, size) in sorted(self._row_members.get(row, {}).items()):
+                    if path not in files:
+                        files[path] = open(path, 'rb')
+                    files[path].seek(offset)
+                    data = files[path].read(size)
+                    if extension == 'npy':
+                        images.append(np.load(io.BytesIO(data), allow_pickle=False))
+                    else:
+                        record = json.loads(data)
+                        labels.append([record[name] for name in self.label_names])
+        finally:
+            for f in files.values():
+                f.close()
+        return images, list(np.asarray(labels, dtype=np.int32).reshape(len(labels), len(self.label_names)).T)
+
+    def _flush(self) -> None:
+        if self._tar is not None:
+            self._tar.fileobj.flush()
+        index = {
+            'n_rows': self.n_rows,
+            'shard_size': self.shard_size,
+            'x': {**self.x_attrs, **self._image_info},
+            'labels': {name: {'label_mapping': mapping} for name, mapping in self.label_datasets.items()},
+            'shards': self.shards,
+        }
+        with open(self.filename + '.part', 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(self.filename + '.part', self.filename)
+
+    def truncate(self, n_rows: int) -> None:
+        if n_rows < self.n_rows:
+            self._close_shard()
+            kept, first_row = [], 0
+            for shard in self.shards:
+                if first_row >= n_rows:
+                    self._remove_shards([shard])
+                elif first_row + shard['n_samples'] > n_rows:
+                    self._seal_shard(shard, end_row=n_rows)
+                    kept.append({**shard, 'n_samples': n_rows - first_row})
+                else:
+                    kept.append(shard)
+                first_row += shard['n_samples']
+            self.shards = kept
+        super().truncate(n_rows)
+
+    def close(self) -> None:
+        self._close_shard()
+        self._flush()
@@ -1,13 +1,120 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import numpy as np
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Dict, List
 import pandas as pd
 
+SPLITS_FILENAME = 'splits.json'
+
+
 class BaseDataframeLoader(ABC):
-    def __init__(self, data_dir: str, is_train: bool = True):
+    """
+    Base class of the dataset DataFrame loaders.
+
+    Subclasses implement `_load`. With a `cache_dir`, `load` stores the DataFrames it returns as Parquet
+    files, under a fingerprint of the loader (class, `CACHE_VERSION`, `cache_params`) and of its source
+    files (`source_files`: path, size and modification time), and reads them back instead of parsing the
+    sources again as long as the fingerprint is unchanged.
+
+    Args:
+        data_dir (str): Dataset directory.
+        cache_dir (str, optional): Directory of the cached DataFrames. If None, nothing is cached.
+    """
+    # Bump when the processing of `_load` changes, to invalidate the cached DataFrames
+    CACHE_VERSION = 1
+
+    def __init__(self, data_dir: str, is_train: bool = True, cache_dir: str = None):
         self.data_dir = data_dir
         self.is_train = is_train
+        self.cache_dir = cache_dir
 
     @abstractmethod
-    def load(self) -> Dict[str, pd.DataFrame]:
+    def _load(self) -> Dict[str, pd.DataFrame]:
         """Return a dictionary with keys like 'train', 'val', and 'test'."""
-        pass
\ No newline at end of file
+        pass
+
+    def source_files(self) -> List[str]:
+        """Files `_load` reads; their changes invalidate the cache."""
+        return []
+
+    def cache_params(self) -> dict:
+        """Loader parameters changing the output of `_load`, such as label mappings or seeds (JSON serializable)."""
+        return {}
+
+    def fingerprint(self) -> str:
+        sources = []
+        for path in self.source_files():
+            stat = os.stat(path)
+            sources.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+        config = {
+            'loader': f"{type(self).__module__}.{type(self).__qualname__}",
+            'version': self.CACHE_VERSION,
+            'params': self.cache_params(),
+            'sources': sources,
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def load(self) -> Dict[str, pd.DataFrame]:
+        """Return a dictionary with keys like 'train', 'val', and 'test', from the cache when possible."""
+        if self.cache_dir is None:
+            return self._load()
+        try:
+            fingerprint = self.fingerprint()
+        except OSError:
+            # Let `_load` report the missing source
+            return self._load()
+        entry = os.path.join(self.cache_dir, f"{type(self).__name__}-{fingerprint[:16]}")
+        dataframes = self._read_cache(entry)
+        if dataframes is not None:
+            logging.info(f"DataFrames loaded from cache {entry}")
+            return dataframes
+        dataframes = self._load()
+        self._write_cache(entry, dataframes)
+        return dataframes
+
+    @staticmethod
+    def _read_cache(entry: str):
+        try:
+            with open(os.path.join(entry, SPLITS_FILENAME)) as f:
+                layout = json.load(f)
+            frames = {}
+            for filename, object_columns in layout['object_columns'].items():
+                df = pd.read_parquet(os.path.join(entry, filename))
+                # Parquet gives object columns back as strings when they hold strings, and their missing
+                # values as None where pandas readers use NaN
+                for column in object_columns:
+                    values = df[column].astype(object)
+                    df[column] = values.where(values.notna(), np.nan)
+                frames[filename] = df
+            return {split: frames[filename] for split, filename in layout['splits'].items()}
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logging.warning(f"Ignoring unreadable DataFrame cache {entry}: {e}")
+            return None
+
+    @staticmethod
+    def _write_cache(entry: str, dataframes: Dict[str, pd.DataFrame]) -> None:
+        part = entry + '.part'
+        try:
+            shutil.rmtree(part, ignore_errors=True)
+            os.makedirs(part)
+            splits, written, object_columns = {}, {}, {}
+            for split, df in dataframes.items():
+                # Splits sharing a DataFrame (e.g. 'val' and 'test') are written once
+                if id(df) not in written:
+                    filename = written[id(df)] = f"{split}.parquet"
+                    df.to_parquet(os.path.join(part, filename))
+                    object_columns[filename] = [column for column, dtype in df.dtypes.items() if dtype == object]
+                splits[split] = written[id(df)]
+            with open(os.path.join(part, SPLITS_FILENAME), 'w') as f:
+                json.dump({'splits': splits, 'object_columns': object_columns}, f)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(part, entry)
+        except Exception as e:
+            # Caching is an optimisation: e.g. columns of mixed types cannot be stored as Parquet
+            logging.warning(f"DataFrames not cached in {entry}: {e}")
+            shutil.rmtree(part, ignore_errors=True)
@@ -1,24 +1,38 @@
 import os
+import json
 import logging
 import pandas as pd
-from glob import glob
 from tqdm import tqdm
-from typing import Dict
+from typing import Dict, List
 from .base import BaseDataframeLoader
 
+LESION_FILES = [f"{desc}_case_description_{set_type}_set" for desc in ["mass", "calc"] for set_type in ["train", "test"]]
+PATH_FIELDS = ['image_file_path', 'roi_mask_file_path', 'cropped_image_file_path']
+# Size and modification time of the source csv files the corrected files were created from
+CORRECTED_STAMP_FILENAME = '.corrected_sources.json'
+
 class CBISDataframeLoader(BaseDataframeLoader):
-    def __init__(self, data_dir: str):
-        super().__init__(data_dir)
+    CACHE_VERSION = 2
+
+    def __init__(self, data_dir: str, cache_dir: str = None):
+        super().__init__(data_dir, cache_dir=cache_dir)
 
-        if len(glob(os.path.join(data_dir, '*corrected.csv'))) != 4:
-            logging.info('Corrected csv files not found. Creating ...')
+        if not self.corrected_files_up_to_date():
+            logging.info('Corrected csv files not found or outdated. Creating ...')
             self.correct_metadata_files()
             logging.info('Corrected csv files created.')
 
-    def load(self) -> Dict[str, pd.DataFrame]:
+    def source_files(self) -> List[str]:
+        return [os.path.join(self.data_dir, f"{key}_corrected.csv") for key in LESION_FILES]
+
+    def cache_params(self) -> dict:
+        return {'data_dir': self.data_dir}
+
+    def _load(self) -> Dict[str, pd.DataFrame]:
         def load_and_process(*filenames):
             dfs = [pd.read_csv(os.path.join(self.data_dir, f)) for f in filenames]
             df = pd.concat(dfs, ignore_index=True)
+            df['absolute_path'] = self.image_paths(df)
             return self.make_cls_column(df)
 
         train_files = [
@@ -39,6 +53,14 @@ class CBISDataframeLoader(BaseDataframeLoader):
             'test': test_df
         }
 
+    def image_paths(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Path of the full mammogram of each row. Corrected paths are series folders (see `correct_paths`),
+        holding the image as `1-1.dcm`; paths left uncorrected point to a file.
+        """
+        paths = os.path.join(self.data_dir, '') + df['image_file_path']
+        return paths.where(paths.str.endswith('.dcm'), paths + os.sep + '1-1.dcm')
+
     def make_cls_column(self, df: pd.DataFrame) -> pd.DataFrame:
         df['pathology'] = df['pathology'].replace('BENIGN_WITHOUT_CALLBACK', 'BENIGN')
         df['pathology'] = df['abnormality type'] + '_' + df['pathology']
@@ -64,19 +86,53 @@ class CBISDataframeLoader(BaseDataframeLoader):
         series_uid = path_segment[2]
         return study_id, series_uid
 
-    def correct_metadata_files(self):
-        metadata_df = pd.read_csv(os.path.join(self.data_dir, 'metadata.csv'))
+    def _source_stamp(self) -> dict:
+        stamp = {}
+        for filename in ['metadata.csv'] + [f"{key}.csv" for key in LESION_FILES]:
+            stat = os.stat(os.path.join(self.data_dir, filename))
+            stamp[filename] = [stat.st_size, stat.st_mtime_ns]
+        return stamp
 
-        lesion_files = {
-            f"{desc}_case_description_{set_type}_set":
-                os.path.join(self.data_dir, f"{desc}_case_description_{set_type}_set.csv")
-            for desc in ["mass", "calc"]
-            for set_type in ["train", "test"]
-        }
+    def corrected_files_up_to_date(self) -> bool:
+        """True when every corrected csv file exists and was created from the current source csv files."""
+        if not all(os.path.exists(os.path.join(self.data_dir, f"{key}_corrected.csv")) for key in LESION_FILES):
+            return False
+        try:
+            with open(os.path.join(self.data_dir, CORRECTED_STAMP_FILENAME)) as f:
+                return json.load(f) == self._source_stamp()
+        except (OSError, ValueError):
+            return False
 
-        with tqdm(total=len(lesion_files), desc='Correcting CBIS csv files') as pbar:
-            for key, path in lesion_files.items():
-                df = pd.read_csv(path)
+    def metadata_locations(self, metadata_df: pd.DataFrame) -> pd.Series:
+        """
+        Returns the normalized `File Location` of each series of `metadata.csv`, indexed by
+        (Study UID, Series UID). The first row is kept when a series appears several times.
+        """
+        metadata_df = metadata_df.drop_duplicates(['Study UID', 'Series UID'])
+        locations = metadata_df.set_index(['Study UID', 'Series UID'])['File Location']
+        return locations.map(self.normalize_and_format_path, na_action='ignore')
+
+    def correct_paths(self, df: pd.DataFrame, locations: pd.Series) -> pd.DataFrame:
+        """
+        Replaces the image paths of a case description DataFrame by the locations of their series in
+        `metadata.csv` (see `metadata_locations`). Paths whose series is not found are left as is.
+        """
+        for field in PATH_FIELDS:
+            # Paths look like <case>/<Study UID>/<Series UID>/<file>.dcm
+            segments = df[field].str.split(os.sep)
+            keys = pd.MultiIndex.from_arrays([segments.str[1], segments.str[2]])
+            located = locations.reindex(keys).to_numpy()
+            found = pd.notna(located)
+            df[field] = df[field].where(~found, located)
+        return df
+
+    def correct_metadata_files(self):
+        stamp = self._source_stamp()
+        locations = self.metadata_locations(pd.read_csv(os.path.join(self.data_dir, 'metadata.csv')))
+
+        with tqdm(total=len(LESION_FILES), desc='Correcting CBIS csv files') as pbar:
+            for key in LESION_FILES:
+                df = pd.read_csv(os.path.join(self.data_dir, f"{key}.csv"))
                 df = df.rename(columns={
                     'left or right breast': 'left_or_right_breast',
                     'image view': 'image_view',
@@ -87,14 +143,11 @@ class CBISDataframeLoader(BaseDataframeLoader):
                     'cropped image file path': 'cropped_image_file_path',
                     'ROI mask file path': 'roi_mask_file_path'
                 })
-
-                for idx, row in df.iterrows():
-                    for field in ['image_file_path', 'roi_mask_file_path', 'cropped_image_file_path']:
-                        study_id, series_uid = self.get_image_path_ids(row, field)
-                        meta = metadata_df[(metadata_df['Series UID'] == series_uid) & (metadata_df['Study UID'] == study_id)]
-                        if not meta.empty:
-                            df.at[idx, field] = self.normalize_and_format_path(meta['File Location'].values[0])
+                df = self.correct_paths(df, locations)
 
                 corrected_path = os.path.join(self.data_dir, f"{key}_corrected.csv")
                 df.to_csv(corrected_path, index=False)
-                pbar.update()
\ No newline at end of file
+                pbar.update()
+
+        with open(os.path.join(self.data_dir, CORRECTED_STAMP_FILENAME), 'w') as f:
+            json.dump(stamp, f)
\ No newline at end of file
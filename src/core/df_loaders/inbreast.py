@@ -1,21 +1,52 @@
 import pandas as pd
+import numpy as np
 import os
+from glob import glob
 from .base import BaseDataframeLoader
 from sklearn.model_selection import train_test_split
-from typing import Dict
+from typing import Dict, List
 from src.utils.errors import *
 
 class INBreastDataframeLoader(BaseDataframeLoader):
     """
     INBreast DataFrame loader.
     """
-    def __init__(self, data_dir: str):
+    CACHE_VERSION = 2
+
+    def __init__(self, data_dir: str, seed: int = 0, test_size: float = 0.2, cache_dir: str = None):
         """
         Initialize the INBreast DataFrame loader
+
+        Args:
+            seed (int): Seed of the train / test split, so that every run gives the same split.
+            test_size (float): Fraction of the images in the test split.
+        """
+        super().__init__(data_dir, cache_dir=cache_dir)
+        self.seed = seed
+        self.test_size = test_size
+
+    def source_files(self) -> List[str]:
+        files = [os.path.join(self.data_dir, 'INbreast.xls')]
+        # Adding or removing images changes the folder modification time, and the image paths
+        if os.path.isdir(os.path.join(self.data_dir, 'AllDICOMs')):
+            files.append(os.path.join(self.data_dir, 'AllDICOMs'))
+        return files
+
+    def cache_params(self) -> dict:
+        return {'data_dir': self.data_dir, 'seed': self.seed, 'test_size': self.test_size}
+
+    def image_paths(self, df: pd.DataFrame) -> pd.Series:
         """
-        super().__init__(data_dir)
- 
-    def load(self) -> Dict[str, pd.DataFrame]:
+        Path of the DICOM file of each row, NaN when missing: files of `AllDICOMs` start with the
+        `File name` of their row, e.g. `20586908_6c613a14b80a8591_MG_R_CC_ANON.dcm`.
+        """
+        files = glob(os.path.join(self.data_dir, 'AllDICOMs', '*.dcm'))
+        by_name = {os.path.basename(path).split('_', 1)[0]: path for path in files}
+        def file_name(name):
+            return str(int(name)) if isinstance(name, float) and name.is_integer() else str(name).strip()
+        return df['File name'].map(lambda name: by_name.get(file_name(name), np.nan))
+
+    def _load(self) -> Dict[str, pd.DataFrame]:
         """
         Load the INBreast DataFrame.
         """
@@ -27,7 +58,9 @@ class INBreastDataframeLoader(BaseDataframeLoader):
         df = df[df["Bi-rads"].notna()]
         df["Lesion annotation status"] = df["Lesion annotation status"].fillna(1)
         df.loc[df["Lesion annotation status"] != 1, "Lesion annotation status"] = 0
-        train, test = train_test_split(df, test_size=0.2) if len(df) > 1 else (df, df)
+        if "File name" in df.columns:
+            df["absolute_path"] = self.image_paths(df)
+        train, test = train_test_split(df, test_size=self.test_size, random_state=self.seed) if len(df) > 1 else (df, df)
         check_non_empty_df(train, 'Training Dataframe')
         check_non_empty_df(test, 'Training Dataframe')
         return {'train': train, 'val': test, 'test': test}
@@ -1,18 +1,43 @@
 import pandas as pd
+import numpy as np
 import os, ast
 from .base import BaseDataframeLoader
-from typing import Dict
+from typing import Dict, List
 from src.utils.errors import *
 
+# A list literal of single-quoted strings without quotes, commas or backslashes inside,
+# e.g. "['Mass', 'Suspicious Calcification']"
+SIMPLE_LIST_PATTERN = r"""\[\s*(?:'[^'",\\]*'(?:\s*,\s*'[^'",\\]*')*)?\s*\]"""
+
+
+def split_simple_lists(values: pd.Series) -> tuple:
+    """
+    Splits the simple string list literals of a column (see `SIMPLE_LIST_PATTERN`) with vectorized
+    string operations.
+
+    Returns:
+        (pd.Series, pd.Series): The items of the simple lists, one row per item under the index of their
+            list (empty lists have none), and the boolean mask of the simple lists. Other values are left
+            to `ast.literal_eval`.
+    """
+    if not (pd.api.types.is_string_dtype(values) or pd.api.types.is_object_dtype(values)):
+        return pd.Series([], dtype=object), pd.Series(False, index=values.index)
+    simple = values.str.fullmatch(SIMPLE_LIST_PATTERN).fillna(False).astype(bool)
+    items = values[simple].str.slice(1, -1).str.split(',').explode().str.strip()
+    # An empty list leaves a single empty string, a list item keeps its quotes
+    items = items[items.str.len() > 0].str.slice(1, -1)
+    return items, simple
+
+
 class VindrDataframeLoader(BaseDataframeLoader):
     """
     Vindr-Mammo DataFrame loader.
     """
-    def __init__(self, data_dir: str, birads_mapping: dict = None, lesions_mapping: dict = None):
+    def __init__(self, data_dir: str, birads_mapping: dict = None, lesions_mapping: dict = None, cache_dir: str = None):
         """
         Initialize the Vindr-Mammo DataFrame loader
         """
-        super().__init__(data_dir)
+        super().__init__(data_dir, cache_dir=cache_dir)
 
         self.birads_mapping = {
             'bi-rads_1': '1',
@@ -50,8 +75,43 @@ class VindrDataframeLoader(BaseDataframeLoader):
     def _construct_image_path(self, row: pd.Series) -> str:
         path = os.path.join(self.data_dir, 'images', row['study_id'], row['image_id'] + '.dicom')
         return path
+
+    def construct_image_paths(self, df: pd.DataFrame) -> pd.Series:
+        """Column-wise `_construct_image_path`."""
+        return os.path.join(self.data_dir, 'images', '') + df['study_id'] + os.sep + df['image_id'] + '.dicom'
+
+    def format_categories(self, values: pd.Series) -> pd.Series:
+        """
+        Parses and formats a column of finding category list literals, like `ast.literal_eval` then
+        `format_category_list` on each row, and returns the categories exploded: one row per category,
+        under the index of its row.
+        """
+        categories, simple = split_simple_lists(values)
+        categories = categories.str.lower().str.replace(' ', '_', regex=False)
+        if not simple.all():
+            others = values[~simple].apply(ast.literal_eval).apply(self.format_category_list).explode()
+            categories = pd.concat([categories, others.dropna()])
+        return categories
+
+    def match_categories(self, categories: pd.Series, index: pd.Index, target_categories: list) -> pd.Series:
+        """
+        Returns, for each row of `index`, the first of `target_categories` found among its exploded
+        `categories` (see `format_categories`), or NaN. Column-wise `replace_categories`.
+        """
+        matched = pd.Series(np.nan, index=index, dtype=object)
+        for target in reversed(target_categories):
+            found = categories.index[(categories == target).to_numpy()]
+            matched[index.isin(found)] = target
+        return matched
         
-    def load(self) -> Dict[str, pd.DataFrame]:
+    def source_files(self) -> List[str]:
+        return [os.path.join(self.data_dir, 'finding_annotations.csv')]
+
+    def cache_params(self) -> dict:
+        return {'data_dir': self.data_dir, 'birads_mapping': self.birads_mapping,
+                'lesions_mapping': self.lesions_mapping}
+
+    def _load(self) -> Dict[str, pd.DataFrame]:
         """
         Load the Vindr-Mammo DataFrame.
         """
@@ -60,21 +120,20 @@ class VindrDataframeLoader(BaseDataframeLoader):
         df_find = pd.read_csv(filepath)
         check_required_columns(df_find, {'study_id', 'image_id', 'finding_categories', 'breast_birads', 'split'})
 
-        df_find['finding_categories'] = df_find['finding_categories'].apply(ast.literal_eval)
-        df_find['finding_categories'] = df_find['finding_categories'].apply(self.format_category_list)
-        df_find['breast_birads'] = df_find['breast_birads'].apply(self.format_char)
+        categories = self.format_categories(df_find['finding_categories'])
+        df_find['breast_birads'] = df_find['breast_birads'].str.lower().str.replace(' ', '_', regex=False)
         df_find['breast_birads'] = df_find['breast_birads'].replace(self.birads_mapping)
-        df_find.drop_duplicates(subset='image_id', keep=False, inplace=True)
+        df_find = df_find[~df_find.duplicated(subset='image_id', keep=False)]
 
         # Replace and filter finding categories
         # target_categories = ['mass', 'no_finding', 'suspicious_calcifications']
         target_categories = ['mass', 'no_finding']
-        self.replace_categories(df_find, 'finding_categories', target_categories)
-        df_find = df_find[df_find['finding_categories'].isin(target_categories)]
-        df_find['finding_categories'] = df_find['finding_categories'].replace(self.lesions_mapping)
+        matched = self.match_categories(categories, df_find.index, target_categories)
+        df_find = df_find[matched.notna()].copy()
+        df_find['finding_categories'] = matched[matched.notna()].replace(self.lesions_mapping)
 
         # Add absolute path
-        df_find['absolute_path'] = df_find.apply(self._construct_image_path, axis=1)
+        df_find['absolute_path'] = self.construct_image_paths(df_find)
         
         train_df = df_find[df_find['split'] == 'training']
         test_df = df_find[df_find['split'] == 'test']
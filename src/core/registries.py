@@ -2,6 +2,8 @@ from typing import Dict, Type, TypeVar, Any
 from src.core.df_loaders import BaseDataframeLoader, VindrDataframeLoader, CBISDataframeLoader, INBreastDataframeLoader
 from src.core.converters.base import BaseConverter
 from src.core.converters.vindr import VindrH5Converter
+from src.core.converters.cbis import CBISH5Converter
+from src.core.converters.inbreast import INBreastH5Converter
 
 T = TypeVar('T')
 
@@ -33,4 +35,6 @@ register_loader("vindr")(VindrDataframeLoader)
 register_loader("cbis")(CBISDataframeLoader)
 register_loader("inbreast")(INBreastDataframeLoader)
 
-register_converter("vindr")(VindrH5Converter)
\ No newline at end of file
+register_converter("vindr")(VindrH5Converter)
+register_converter("cbis")(CBISH5Converter)
+register_converter("inbreast")(INBreastH5Converter)
\ No newline at end of file
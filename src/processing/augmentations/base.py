@@ -3,38 +3,62 @@ import cv2
 import albumentations as A
 
 from abc import ABC, abstractmethod
-from typing import List
+from glob import glob
+from typing import Dict, List
+from .engine import AugmentationEngine, AugmentationTask, image_seed
+
+
+def build_pipeline(augmentation_type: str = "both") -> A.Compose:
+    """Augmentation pipeline of the augmentors: 'geometric', 'photometric' or 'both' transforms."""
+    geometric_pipeline = [
+        # Horizontal, vertical or both flips
+        A.OneOf([
+            A.HorizontalFlip(p=1),
+            A.VerticalFlip(p=1),
+            A.Sequential([A.HorizontalFlip(p=1), A.VerticalFlip(p=1)], p=1),
+        ], p=1),
+        A.ElasticTransform(p=0.3),
+        A.Rotate(limit=90, border_mode=cv2.BORDER_CONSTANT, p=0.5),
+    ]
+    photometric_pipeline = [
+        A.RandomBrightnessContrast(brightness_limit=0.1, contrast_limit=0.1, p=1),
+        A.GaussianBlur(blur_limit=(1, 3), p=0.5),
+    ]
+    if augmentation_type == 'geometric':
+        return A.Compose(geometric_pipeline)
+    elif augmentation_type == 'photometric':
+        return A.Compose(photometric_pipeline)
+    return A.Compose(geometric_pipeline + photometric_pipeline)
+
 
 class AugmentorBase(ABC):
-    def __init__(self, data_dir: str, augmentation_type: str = "both"):
+    """
+    Base class of the augmentors of a dataset of PNG images stored as `<data_dir>/<class>/*.png`.
+
+    Augmentations run on an `AugmentationEngine` of `n_workers` workers; every image is augmented with
+    a seed derived from `seed` and its path, so two runs with the same seed write the same images.
+    """
+    def __init__(self, data_dir: str, augmentation_type: str = "both", seed: int = 0, n_workers: int = 4,
+                 executor: str = 'process'):
         self.data_dir = data_dir
+        self.seed = seed
         self.augmentation_pipeline = self._build_pipeline(augmentation_type)
+        self.engine = AugmentationEngine(self.augmentation_pipeline, n_workers=n_workers, executor=executor)
 
     def _build_pipeline(self, augmentation_type: str) -> A.Compose:
-        geometric_pipeline = [
-            A.Flip(p=1),
-            A.ElasticTransform(p=0.3),
-            A.Rotate(limit=90, border_mode=cv2.BORDER_CONSTANT, p=0.5),
-        ]
-        photometric_pipeline = [
-            A.RandomBrightnessContrast(brightness_limit=0.1, contrast_limit=0.1, p=1),
-            A.GaussianBlur(blur_limit=(1, 3), p=0.5),
-        ]
-        if augmentation_type == 'geometric':
-            return A.Compose(geometric_pipeline)
-        elif augmentation_type == 'photometric':
-            return A.Compose(photometric_pipeline)
-        return A.Compose(geometric_pipeline + photometric_pipeline)
+        return build_pipeline(augmentation_type)
 
     @abstractmethod
     def run(self):
         pass
 
-    def _augment_image(image_path: str, n_augment: int, pipeline: A.BasicTransform) -> List:
-        image = cv2.imread(image_path)
-        return [pipeline(image=image)['image'] for _ in range(n_augment)]
+    def class_tasks(self, class_name: str, n_augment: int) -> List[AugmentationTask]:
+        """One task per original image of `class_name`, writing its augmentations next to it."""
+        cls_path = os.path.join(self.data_dir, str(class_name))
+        # Augmentations of a previous run are not augmented again
+        images = sorted(path for path in glob(os.path.join(cls_path, '*.png')) if not os.path.basename(path).startswith('aug_'))
+        return [AugmentationTask(img_path, cls_path, idx, n_augment, image_seed(self.seed, os.path.relpath(img_path, self.data_dir)))
+                for idx, img_path in enumerate(images)]
 
-    def _save_augmented_images(self, images: List, output_dir: str, base_idx: int):
-        for j, augmented_image in enumerate(images):
-            output_path = os.path.join(output_dir, f"aug_{base_idx}_{j}.png")
-            cv2.imwrite(output_path, augmented_image)
\ No newline at end of file
+    def augment(self, tasks: List[AugmentationTask], desc: str = "Augmenting") -> Dict[str, float]:
+        return self.engine.run(tasks, desc=desc)
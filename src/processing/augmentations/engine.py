@@ -0,0 +1,134 @@
+import os
+import copy
+import zlib
+import random
+import logging
+import threading
+import multiprocessing
+import cv2
+import numpy as np
+import albumentations as A
+
+from tqdm import tqdm
+from time import perf_counter
+from typing import Dict, NamedTuple, Optional, Sequence
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class AugmentationTask(NamedTuple):
+    """`n_augment` augmentations of the image at `image_path`, written to `output_dir` as `aug_<base_idx>_<j>.png`."""
+    image_path: str
+    output_dir: str
+    base_idx: int
+    n_augment: int
+    seed: int
+
+
+def image_seed(run_seed: int, key: str) -> int:
+    """
+    Seed of the augmentations of one image, derived from the seed of the run and a key identifying the
+    image (e.g. its path relative to the dataset), so that it does not depend on the other images of the run.
+    """
+    return int(np.random.SeedSequence([run_seed, zlib.crc32(key.encode('utf-8'))]).generate_state(1)[0])
+
+
+def seed_pipeline(pipeline: A.Compose, seed: int) -> None:
+    if hasattr(pipeline, 'set_random_seed'):
+        pipeline.set_random_seed(seed)
+    else:
+        # Albumentations < 2 draws from the global generators
+        random.seed(seed)
+        np.random.seed(seed)
+
+
+def augment_task(pipeline: A.Compose, task: AugmentationTask) -> int:
+    """Augment and write the image of `task`; returns the number of written images (0 when unreadable)."""
+    image = cv2.imread(task.image_path)
+    if image is None:
+        logging.warning(f"Skipping unreadable image {task.image_path}")
+        return 0
+    seed_pipeline(pipeline, task.seed)
+    for j in range(task.n_augment):
+        output_path = os.path.join(task.output_dir, f"aug_{task.base_idx}_{j}.png")
+        cv2.imwrite(output_path, pipeline(image=image)['image'])
+    return task.n_augment
+
+
+# Pipeline installed once per worker process by the pool initializer
+_worker_pipeline: Optional[A.Compose] = None
+
+
+def _init_process_worker(pipeline: A.Compose) -> None:
+    global _worker_pipeline
+    _worker_pipeline = pipeline
+    # Parallelism comes from the pool: OpenCV threads would only compete with the other workers
+    cv2.setNumThreads(1)
+
+
+def _augment_in_worker(task: AugmentationTask) -> int:
+    return augment_task(_worker_pipeline, task)
+
+
+class AugmentationEngine:
+    """
+    Runs augmentation tasks on a worker pool, one task (image) at a time.
+
+    Each task seeds the pipeline with its own seed (see `image_seed`) before augmenting its image, so the
+    output does not depend on the number of workers nor on the order in which they pick the tasks.
+
+    Args:
+        pipeline (A.Compose): Augmentation pipeline, e.g. from `AugmentorBase._build_pipeline`.
+        n_workers (int): Number of workers.
+        executor (str): 'process' pool, or 'thread' pool where each worker uses its own copy of the pipeline
+            (reproducible with albumentations >= 2 only, older versions draw from the global generators).
+        start_method (str): Start method of the worker processes.
+    """
+    EXECUTORS = ('thread', 'process')
+
+    def __init__(self, pipeline: A.Compose, n_workers: int = 4, executor: str = 'process', start_method: str = 'spawn'):
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown executor: {executor}. Available: {list(self.EXECUTORS)}")
+        self.pipeline = pipeline
+        self.n_workers = n_workers
+        self.executor = executor
+        self.start_method = start_method
+        self._local = threading.local()
+
+    def _create_executor(self) -> Executor:
+        if self.executor == 'process':
+            return ProcessPoolExecutor(max_workers=self.n_workers, mp_context=multiprocessing.get_context(self.start_method),
+                                       initializer=_init_process_worker, initargs=(self.pipeline,))
+        return ThreadPoolExecutor(max_workers=self.n_workers)
+
+    def _augment_in_thread(self, task: AugmentationTask) -> int:
+        # Transforms hold their random state: threads must not share a pipeline
+        if not hasattr(self._local, 'pipeline'):
+            self._local.pipeline = copy.deepcopy(self.pipeline)
+        return augment_task(self._local.pipeline, task)
+
+    def run(self, tasks: Sequence[AugmentationTask], desc: str = "Augmenting") -> Dict[str, float]:
+        """
+        Run `tasks` and return the number of source images, of written augmentations, the elapsed seconds and
+        the throughput in augmented images per second.
+        """
+        tasks = list(tasks)
+        t_start = perf_counter()
+        n_augmented = 0
+        if tasks:
+            with self._create_executor() as executor:
+                if self.executor == 'process':
+                    results = executor.map(_augment_in_worker, tasks, chunksize=max(1, len(tasks) // (8 * self.n_workers)))
+                else:
+                    results = executor.map(self._augment_in_thread, tasks)
+                for written in tqdm(results, total=len(tasks), desc=desc):
+                    n_augmented += written
+        seconds = perf_counter() - t_start
+        stats = {
+            'images': len(tasks),
+            'augmented': n_augmented,
+            'seconds': seconds,
+            'augmented_per_sec': n_augmented / seconds if seconds > 0 else 0.0,
+        }
+        logging.info(f"{n_augmented} augmented images from {len(tasks)} images in {seconds:.2f}s "
+                     f"({stats['augmented_per_sec']:.1f} images/s, {self.n_workers} {self.executor} workers)")
+        return stats
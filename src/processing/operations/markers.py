@@ -0,0 +1,31 @@
+import functools
+from typing import Callable
+
+
+def batchable(operation: Callable) -> Callable:
+    """
+    Marks an operation that also accepts a stack of images, (N, H, W), and processes each image of the
+    stack as it would process it alone. See `BasePipeline.process_batch`.
+    """
+    operation.batchable = True
+    return operation
+
+
+def fixed_shape(operation: Callable) -> Callable:
+    """Marks an operation whose outputs have the same shape whatever the input, so they can be stacked."""
+    operation.fixed_shape = True
+    return operation
+
+
+def _marked(operation: Callable, marker: str) -> bool:
+    if isinstance(operation, functools.partial):
+        return _marked(operation.func, marker)
+    return getattr(operation, marker, False)
+
+
+def is_batchable(operation: Callable) -> bool:
+    return _marked(operation, 'batchable')
+
+
+def is_fixed_shape(operation: Callable) -> bool:
+    return _marked(operation, 'fixed_shape')
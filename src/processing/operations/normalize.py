@@ -1,17 +1,39 @@
 import numpy as np
 import cv2
+from .markers import batchable
 
-def clahe(img, clip=4.0): #1.5
+# Lean mode: images are kept as uint16 spanning this whole range until `lean_to_float`
+LEAN_MAX = np.iinfo(np.uint16).max
+
+
+def _shift_to_zero(img):
+    """Returns a new float array `img - min(img)`, to be scaled in place."""
+    img = img - np.min(img)
+    if img.dtype.kind != 'f':
+        # Same dtype as an out-of-place division would give
+        img = img.astype(np.float64)
+    return img
+
+
+def clahe(img, clip=4.0, lean=False): #1.5
     """
     Image enhancement using CLAHE. Converts float image to uint8.
+
+    In lean mode, `img` is a uint16 image already min-max normalised by `minmax_normalisation`, which
+    is scaled to uint8 directly instead of computing its min and max again.
     """
-    img = img - np.min(img)
-    if np.max(img) != 0:
-        img = img / np.max(img)
-    img = (img * 255).astype(np.uint8)
+    if lean:
+        img = cv2.convertScaleAbs(img, alpha=255 / LEAN_MAX)
+    else:
+        img = _shift_to_zero(img)
+        img_max = np.max(img)
+        if img_max != 0:
+            img /= img_max
+        img *= 255
+        img = img.astype(np.uint8)
 
     clahe = cv2.createCLAHE(clipLimit=clip, tileGridSize=(18,18))
-    cl = clahe.apply(img)
+    cl = clahe.apply(img, dst=img)
     return cl
 
 # Gabor filters to extract features
@@ -20,19 +42,40 @@ def apply_gabor(image, theta=0):
   filtered = cv2.filter2D(image, cv2.CV_8UC3, kernel)
   return filtered
 
-def minmax_normalisation(img, rangemax = 255): #1.5
+def minmax_normalisation(img, rangemax = 255, lean = False): #1.5
     """
     Image enhancement using min-max normalization.
+
+    The input is left untouched and a single output buffer is allocated and scaled in place.
+
+    In lean mode, the image is instead mapped onto the whole uint16 range in one pass, in place for
+    uint16 inputs, and `rangemax` is applied by `lean_to_float` at the end of the pipeline. This keeps
+    images at 2 bytes per pixel through the pipeline and lets `crop_to_roi` reuse the normalisation.
     """
-    img = img - np.min(img)
-    if np.max(img) != 0:
-        img = img / np.max(img)
+    if lean:
+        out = img if img.dtype == np.uint16 else None
+        return cv2.normalize(img, out, 0, LEAN_MAX, cv2.NORM_MINMAX, dtype=cv2.CV_16U)
+    img = _shift_to_zero(img)
+    img_max = np.max(img)
+    if img_max != 0:
+        img /= img_max
     else:
         print("Warning: Image.max() = 0, returning uncorrect array.")
-    img = (img * rangemax)
+    img *= rangemax
     return img
 
 
+@batchable
+def lean_to_float(img, rangemax = 255):
+    """
+    Final stage of a lean pipeline: converts a uint16 image normalised by `minmax_normalisation(lean=True)`
+    to float32 in [0, rangemax].
+    """
+    out = img.astype(np.float32)
+    out *= rangemax / LEAN_MAX
+    return out
+
+
 
 def truncate_normalization(image_mask: tuple):
     """Normalize an image within a given ROI mask
@@ -1,20 +1,40 @@
 from pydicom import dcmread
+from pydicom.dataset import Dataset
+from pydicom.pixels import pixel_array
 import numpy as np
 
-def read_dicom(path: str):
+def read_dicom(path: str, lean: bool = False):
     """Read a dicom file and return its np.array representation;
-    The method applies a VOI lookup table and invert pixels intensities when the PhotometricInterpretation of
-    a file is found to be 'MONOCHROME1'.
+    The method inverts pixels intensities when the PhotometricInterpretation of a file is found to be
+    'MONOCHROME1' (0 is white), so that higher values are always brighter.
 
     Args:
         path (str): Path to dicom file
+        lean (bool): Keep the stored integer dtype (e.g. uint16) instead of converting to float32, which
+            halves the memory of the image, and decode the pixel data straight from the file instead of
+            holding the encoded and decoded pixels at once. See `minmax_normalisation`.
 
     Returns:
         np.array: The loaded image as np.array
     """
     try:
-        ds = dcmread(path)
-        img2d = ds.pixel_array
-        return img2d.astype(np.float32)
+        if lean:
+            ds = Dataset()
+            img2d = pixel_array(path, ds_out=ds)
+        else:
+            ds = dcmread(path)
+            img2d = ds.pixel_array.astype(np.float32)
     except FileNotFoundError as e:
         raise RuntimeError(f"File not found: {path}") from e
+    if ds.get('PhotometricInterpretation', '') == 'MONOCHROME1':
+        # Invert within the range of the stored values, known from the header already read
+        bits_stored = int(ds.get('BitsStored', ds.BitsAllocated))
+        if int(ds.get('PixelRepresentation', 0)) == 1:
+            low, high = -(2 ** (bits_stored - 1)), 2 ** (bits_stored - 1) - 1
+        else:
+            low, high = 0, 2 ** bits_stored - 1
+        if img2d.dtype.kind in 'iu':
+            # Values outside of BitsStored would wrap around
+            np.clip(img2d, low, high, out=img2d)
+        np.subtract(low + high, img2d, out=img2d)
+    return img2d
@@ -1,32 +1,86 @@
 import cv2
 import numpy as np
 from .normalize import clahe
+from .markers import fixed_shape
 
 
-def crop_to_roi(image: np.array):
-    """Crop mammogram to breast region.
+def roi_box(image: np.array, lean: bool = False, proxy_scale: float = 1.0, margin: float = 0.01):
+    """Find the bounding box of the breast region.
 
     Args:
-        img_list (list): List of original image as uint8 np.arrays
+        image (np.array): Mammogram, e.g. from `minmax_normalisation`
+        lean (bool): `image` is a uint16 image from `minmax_normalisation(lean=True)`
+        proxy_scale (float): Scale of the proxy image the detection runs on, e.g. 1/8. The box found on
+            the proxy is mapped back to `image` and widened by `margin`. 1 runs on `image` itself.
+        margin (float): Fraction of the image size added on each side of a box found on a proxy, to
+            make up for the details lost by downscaling
 
     Returns:
-        tuple (list, list): (cropped_images, rois)
+        tuple: (x, y, w, h) of the box, in `image` coordinates
     """
-    original_image = image[100:-100, 100:-100]
-    image = clahe(original_image, 1.0)
+    if not 0 < proxy_scale <= 1:
+        raise ValueError(f"proxy_scale must be in (0, 1], got {proxy_scale}")
+    proxy = image
+    if proxy_scale < 1:
+        height, width = image.shape[:2]
+        size = (max(1, round(width * proxy_scale)), max(1, round(height * proxy_scale)))
+        proxy = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    enhanced = clahe(proxy, 1.0, lean=lean)
 
+    # Threshold in place: the enhanced image is not needed afterwards
     _, breast_mask = cv2.threshold(
-        image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=enhanced)
 
     cnts, _ = cv2.findContours(
         breast_mask.astype(
-            np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            np.uint8, copy=False), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
     )
     cnt = max(cnts, key=cv2.contourArea)
     x, y, w, h = cv2.boundingRect(cnt)
+    if proxy is image:
+        return x, y, w, h
+
+    # Map back to full resolution, rounding outwards, and widen by the margin
+    height, width = image.shape[:2]
+    scale_y, scale_x = height / proxy.shape[0], width / proxy.shape[1]
+    pad_y, pad_x = margin * height, margin * width
+    top = max(0, int(np.floor(y * scale_y - pad_y)))
+    left = max(0, int(np.floor(x * scale_x - pad_x)))
+    bottom = min(height, int(np.ceil((y + h) * scale_y + pad_y)))
+    right = min(width, int(np.ceil((x + w) * scale_x + pad_x)))
+    return left, top, right - left, bottom - top
+
+
+def box_iou(box_a: tuple, box_b: tuple) -> float:
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = inter_w * inter_h
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def crop_to_roi(image: np.array, lean: bool = False, proxy_scale: float = 1.0, margin: float = 0.01):
+    """Crop mammogram to breast region.
+
+    Args:
+        img_list (list): List of original image as uint8 np.arrays
+        lean (bool): `image` is a uint16 image from `minmax_normalisation(lean=True)`, whose
+            normalisation is reused to build the mask.
+        proxy_scale (float): Detect the region on a proxy downscaled by this factor, see `roi_box`.
+        margin (float): Margin around a region detected on a proxy, see `roi_box`.
+
+    Returns:
+        tuple (list, list): (cropped_images, rois)
+    """
+    original_image = image[100:-100, 100:-100]
+    x, y, w, h = roi_box(original_image, lean=lean, proxy_scale=proxy_scale, margin=margin)
     return original_image[y: y + h, x: x + w]
 
 
+@fixed_shape
 def resize(image: np.array, new_size=224): #1024
     try:
         return cv2.resize(
@@ -1,4 +1,36 @@
-from typing import List, Callable
+import json
+import hashlib
+import functools
+import numpy as np
+from typing import List, Callable, Iterable, Optional, Sequence, Union
+from .cache import OperationCache, file_identity
+from .profiling import OperationProfiler
+from src.processing.operations.markers import is_batchable, is_fixed_shape
+
+
+def describe_operation(operation: Callable) -> str:
+    """
+    Returns a stable, human readable description of an operation.
+
+    Functions are described by their qualified name, `functools.partial` objects also include their
+    bound arguments, and other callables include their attributes.
+    """
+    if isinstance(operation, functools.partial):
+        args = [repr(arg) for arg in operation.args]
+        args += [f"{key}={value!r}" for key, value in sorted(operation.keywords.items())]
+        return f"{describe_operation(operation.func)}({', '.join(args)})"
+    name = getattr(operation, '__qualname__', None)
+    if name is not None:
+        return f"{getattr(operation, '__module__', None)}.{name}"
+    attributes = ", ".join(f"{key}={value!r}" for key, value in sorted(vars(operation).items()))
+    return f"{type(operation).__module__}.{type(operation).__qualname__}({attributes})"
+
+
+def operation_name(operation: Callable) -> str:
+    if isinstance(operation, functools.partial):
+        return operation_name(operation.func)
+    return getattr(operation, '__name__', type(operation).__name__)
+
 
 class BasePipeline:
     def __init__(self):
@@ -6,7 +38,10 @@ class BasePipeline:
         Initializes the Pipeline with an empty list of operations.
         """
         self.operations: List[Callable] = []
-        
+        self.cache: OperationCache = None
+        self.cache_checkpoints: List[Union[int, str]] = []
+        self.profiler: OperationProfiler = None
+
     def add_operation(self, operation: Callable):
         """
         Adds a pre-processing operation to the pipeline.
@@ -18,19 +53,157 @@ class BasePipeline:
             raise ValueError("The operation must be a callable function.")
         self.operations.append(operation)
 
-    def process(self, image):
+    def fingerprint(self, n_operations: int = None) -> str:
+        """
+        Returns a digest identifying the pipeline configuration.
+
+        Two pipelines with the same operations, in the same order and with the same bound arguments,
+        share the same fingerprint.
+
+        Parameters:
+        n_operations (int, optional): Only fingerprint the first `n_operations` operations.
+        """
+        operations = self.operations if n_operations is None else self.operations[:n_operations]
+        description = json.dumps([describe_operation(operation) for operation in operations])
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+    def enable_cache(self, cache: OperationCache, checkpoints: Iterable[Union[int, str]] = None):
+        """
+        Memoizes intermediate outputs of the pipeline in `cache`.
+
+        The output of each checkpoint operation is stored under the identity of the input file (path,
+        size, modification time) and the fingerprint of the operations up to the checkpoint. Processing
+        a file then resumes after the last checkpoint found in the cache, so changing the operations
+        after a checkpoint does not invalidate it.
+
+        Parameters:
+        cache (OperationCache): Cache storing the intermediate outputs.
+        checkpoints (iterable, optional): Indices or names of the operations whose output is stored.
+            Defaults to every operation.
+        """
+        self.cache = cache
+        self.cache_checkpoints = list(checkpoints) if checkpoints is not None else list(range(len(self.operations)))
+
+    def enable_profiling(self, profiler: OperationProfiler = None):
+        """
+        Records the wall time, CPU time and output size of every operation call in `profiler`.
+
+        Operations run by `process_stacked` are recorded once per stack.
+
+        Parameters:
+        profiler (OperationProfiler, optional): Profiler collecting the samples. Defaults to a new one.
+        """
+        self.profiler = profiler if profiler is not None else OperationProfiler()
+
+    def _checkpoint_indices(self) -> List[int]:
+        names = [operation_name(operation) for operation in self.operations]
+        indices = set()
+        for checkpoint in self.cache_checkpoints:
+            if isinstance(checkpoint, str):
+                if checkpoint not in names:
+                    raise ValueError(f"Unknown cache checkpoint: {checkpoint}. Operations: {names}")
+                indices.add(names.index(checkpoint))
+            elif 0 <= checkpoint < len(self.operations):
+                indices.add(checkpoint)
+        return sorted(indices)
+
+    def pop_stats(self) -> dict:
+        """Returns the statistics accumulated since the last call, to be merged in another process."""
+        stats = {}
+        if self.cache is not None:
+            stats['cache'] = self.cache.pop_counters()
+        if self.profiler is not None:
+            stats['profile'] = self.profiler.pop_samples()
+        return stats
+
+    def merge_stats(self, stats: dict) -> None:
+        if self.cache is not None and 'cache' in stats:
+            self.cache.merge_counters(stats['cache'])
+        if self.profiler is not None and 'profile' in stats:
+            self.profiler.merge_samples(stats['profile'])
+
+    def _apply(self, i: int, image):
+        operation = self.operations[i]
+        try:
+            if self.profiler is None:
+                return operation(image)
+            return self.profiler.call(operation_name(operation), operation, image)
+        except Exception as e:
+            raise RuntimeError(f"Operation {i} ({operation_name(operation)}) failed: {e}")
+
+    def _restore_from_cache(self, path: str, end: int, source: Optional[str] = None):
+        """Returns (index of the next operation to run, cache keys of the checkpoints, image)."""
+        try:
+            identity = file_identity(source if source is not None else path)
+        except OSError:
+            # Let the first operation report the missing file
+            return 0, {}, path
+        keys = {index: OperationCache.key(identity, self.fingerprint(index + 1))
+                for index in self._checkpoint_indices() if index < end}
+        if not keys:
+            return 0, keys, path
+        longest_first = sorted(keys, reverse=True)
+        position, cached = self.cache.lookup([keys[index] for index in longest_first])
+        if cached is None:
+            return 0, keys, path
+        return longest_first[position] + 1, keys, cached
+
+    def process(self, image, end: Optional[int] = None, source: Optional[str] = None):
         """
         Processes an image through the pipeline.
 
         Parameters:
         image: The input image to be processed.
+        end (int, optional): Only apply the first `end` operations, e.g. `batch_start()`.
+        source (str, optional): File `image` was copied from, e.g. when staged to a local directory. The
+            cache is keyed on its identity, so staged and unstaged runs share their entries.
 
         Returns:
         The processed image after applying all operations in the pipeline.
         """
-        for i, operation in enumerate(self.operations):
-            try:
-                image = operation(image)
-            except Exception as e:
-                raise RuntimeError(f"Operation {i} ({operation.__name__}) failed: {e}")
+        end = len(self.operations) if end is None else end
+        start, cache_keys = 0, {}
+        if self.cache is not None and isinstance(image, str):
+            start, cache_keys, image = self._restore_from_cache(image, end, source)
+
+        for i in range(start, end):
+            image = self._apply(i, image)
+            if i in cache_keys and image is not None:
+                self.cache.put(cache_keys[i], image)
         return image
+
+    def batch_start(self) -> Optional[int]:
+        """
+        Returns the index of the first operation run on stacked images by `process_batch`, i.e. the
+        one following the first fixed-shape operation, or None when outputs may differ in shape.
+        """
+        for i, operation in enumerate(self.operations):
+            if is_fixed_shape(operation):
+                return i + 1
+        return None
+
+    def process_stacked(self, images: np.ndarray, start: int) -> np.ndarray:
+        """
+        Applies the operations from `start` on to a stack of images, (N, H, W).
+
+        Batchable operations run once on the whole stack, the others on each image in turn.
+        """
+        for i in range(start, len(self.operations)):
+            if is_batchable(self.operations[i]):
+                images = self._apply(i, images)
+            else:
+                images = np.stack([self._apply(i, image) for image in images])
+        return images
+
+    def process_batch(self, images: Sequence) -> np.ndarray:
+        """
+        Processes several images through the pipeline and returns them stacked, (N, H, W).
+
+        Operations run on each image up to the first fixed-shape one (see `batch_start`), then once on
+        the stacked outputs, so operations declared `batchable` are vectorized over the whole batch.
+        A pipeline without fixed-shape operation processes every image on its own before stacking.
+        """
+        start = self.batch_start()
+        if start is None:
+            return np.stack([self.process(image) for image in images])
+        return self.process_stacked(np.stack([self.process(image, end=start) for image in images]), start)
@@ -1,16 +1,36 @@
+from functools import partial
 from .base import BasePipeline
 from src.processing.operations.read import read_dicom
 from src.processing.operations.transform import crop_to_roi, resize, build_pyramid
-from src.processing.operations.normalize import truncate_normalization, clahe, minmax_normalisation, apply_gabor
+from src.processing.operations.normalize import truncate_normalization, clahe, minmax_normalisation, apply_gabor, lean_to_float
 
 class BreastImageProcessingPipeline(BasePipeline):
-    def __init__(self):
+    def __init__(self, lean: bool = False, roi_scale: float = 1.0):
+        """
+        Args:
+            lean (bool): Keep images as uint16 until the final stage and normalise them in place, which
+                roughly halves the memory of every image in flight. Outputs differ from the default
+                pipeline by the uint16 rounding, and the breast mask is computed without renormalising
+                the cropped image.
+            roi_scale (float): Detect the breast region on a proxy image downscaled by this factor (e.g.
+                1/8) instead of the full resolution image, see `crop_to_roi`.
+        """
         super().__init__()
+        roi_options = {'proxy_scale': roi_scale} if roi_scale != 1 else {}
+        if lean:
+            self.operations = [
+                partial(read_dicom, lean=True),
+                partial(minmax_normalisation, lean=True),
+                partial(crop_to_roi, lean=True, **roi_options),
+                resize,
+                lean_to_float,
+            ]
+            return
         self.operations = [
             read_dicom,
             minmax_normalisation, 
             #apply_gabor,
-            crop_to_roi,
+            partial(crop_to_roi, **roi_options) if roi_options else crop_to_roi,
             resize,
             #clahe,
         ]
@@ -0,0 +1,150 @@
+import os
+import glob
+import hashlib
+import logging
+import tempfile
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+def file_identity(path: str) -> Tuple[str, int, int]:
+    """Returns (absolute path, size, modification time) of a file; changes whenever the file is rewritten."""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+class OperationCache:
+    """
+    Content-addressed on-disk cache of intermediate pipeline outputs.
+
+    Entries are `.npy` files named after a digest of the input file identity and the fingerprint of
+    the operations that produced them, so changing an input file or any operation of the prefix
+    naturally misses the cache. When the cache grows over `max_bytes`, the least recently used
+    entries are evicted.
+
+    Args:
+        cache_dir (str): Directory holding the cached arrays.
+        max_bytes (int, optional): Size budget of the cache. If None, the cache is unbounded.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._used_bytes: Optional[int] = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        # Workers start with fresh counters; the size estimate is rebuilt lazily from disk
+        state = self.__dict__.copy()
+        state.update(hits=0, misses=0, writes=0, evictions=0, _used_bytes=None)
+        return state
+
+    @staticmethod
+    def key(identity: tuple, fingerprint: str) -> str:
+        return hashlib.sha256(repr((identity, fingerprint)).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        path = self._path(key)
+        try:
+            array = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        try:
+            # Refresh the modification time: it is the recency used for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return array
+
+    def lookup(self, keys: List[str]) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Returns the position in `keys` of the first cached entry and its array, or (-1, None).
+
+        Counts as a single hit or miss, however many keys are tried.
+        """
+        for position, key in enumerate(keys):
+            array = self.get(key)
+            if array is not None:
+                self.hits += 1
+                return position, array
+        self.misses += 1
+        return -1, None
+
+    def put(self, key: str, array: np.ndarray) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, partial = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.asarray(array), allow_pickle=False)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        self.writes += 1
+        if self.max_bytes is not None:
+            self._used_bytes = (self._used_bytes if self._used_bytes is not None else self.size()) + os.path.getsize(path)
+            if self._used_bytes > self.max_bytes:
+                self.evict()
+
+    def _entries(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, '*', '*.npy')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in 90% of its budget."""
+        entries = sorted(self._entries())
+        used = sum(size for _, size, _ in entries)
+        target = 0.9 * self.max_bytes
+        for _, size, path in entries:
+            if used <= target:
+                break
+            try:
+                os.remove(path)
+                used -= size
+                self.evictions += 1
+            except OSError:
+                pass
+        self._used_bytes = used
+
+    def pop_counters(self) -> dict:
+        """Returns the counters accumulated since the last call and resets them."""
+        counters = {'hits': self.hits, 'misses': self.misses, 'writes': self.writes, 'evictions': self.evictions}
+        self.hits = self.misses = self.writes = self.evictions = 0
+        return counters
+
+    def merge_counters(self, counters: dict) -> None:
+        """Adds counters popped from another copy of the cache, e.g. in a worker process."""
+        for name, value in counters.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'writes': self.writes,
+            'evictions': self.evictions,
+        }
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        logging.info(f"Operation cache: {stats['hits']} hits, {stats['misses']} misses "
+                     f"({100 * stats['hit_rate']:.1f}% hit rate), {stats['writes']} writes, {stats['evictions']} evictions")
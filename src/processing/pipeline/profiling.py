@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import logging
+import threading
+import tracemalloc
+import numpy as np
+from typing import Any, Callable, Dict, List
+
+PERCENTILES = (50, 90, 99)
+# Per call: wall time (s), CPU time of the calling thread (s), output size (bytes), traced memory peak (bytes)
+FIELDS = ('wall_s', 'cpu_s', 'output_bytes', 'peak_bytes')
+
+
+def output_size(output: Any) -> int:
+    """Size in bytes of an operation output: arrays, tuples of arrays (e.g. image and mask), else 0."""
+    if isinstance(output, (tuple, list)):
+        return sum(output_size(item) for item in output)
+    return int(getattr(output, 'nbytes', 0))
+
+
+class OperationProfiler:
+    """
+    Records the wall time, CPU time and output size of every operation call of a pipeline.
+
+    With `trace_memory`, `tracemalloc` also records the peak of memory allocated by Python during each
+    call. Tracing slows down allocations, and its peak is shared by all threads of a process, so
+    peaks measured with a thread pool include the allocations of concurrent operations.
+
+    Samples are kept per operation name. Like the counters of `OperationCache`, they are popped in
+    worker processes and merged into the profiler of the main process, see `BasePipeline.pop_stats`.
+
+    Args:
+        trace_memory (bool): Also record the traced memory peak of each call.
+    """
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.samples: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Workers start with no samples; locks cannot be pickled
+        state = self.__dict__.copy()
+        state.update(samples={}, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def call(self, name: str, operation: Callable, image):
+        """Returns `operation(image)`, recording the call under `name`."""
+        peak_bytes = 0
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        output = operation(image)
+        wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+        if self.trace_memory:
+            peak_bytes = max(tracemalloc.get_traced_memory()[1] - traced_before, 0)
+        with self._lock:
+            self.samples.setdefault(name, []).append((wall, cpu, output_size(output), peak_bytes))
+        return output
+
+    def pop_samples(self) -> Dict[str, List[tuple]]:
+        """Returns the samples recorded since the last call and forgets them."""
+        with self._lock:
+            samples, self.samples = self.samples, {}
+        return samples
+
+    def merge_samples(self, samples: Dict[str, List[tuple]]) -> None:
+        """Adds samples popped from another copy of the profiler, e.g. in a worker process."""
+        with self._lock:
+            for name, values in samples.items():
+                self.samples.setdefault(name, []).extend(values)
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Per operation: number of calls, then total, mean, percentiles and maximum of each field.
+        Operations are listed in the order they were first recorded.
+        """
+        with self._lock:
+            samples = {name: np.asarray(values, dtype=np.float64) for name, values in self.samples.items()}
+        stats = {}
+        for name, values in samples.items():
+            stats[name] = {'calls': len(values)}
+            for column, field in enumerate(FIELDS):
+                if field == 'peak_bytes' and not self.trace_memory:
+                    continue
+                column_values = values[:, column]
+                summary = {'total': float(column_values.sum()), 'mean': float(column_values.mean())}
+                summary.update({f"p{q}": float(value) for q, value in
+                                zip(PERCENTILES, np.percentile(column_values, PERCENTILES))})
+                summary['max'] = float(column_values.max())
+                stats[name][field] = summary
+        return stats
+
+    def dump(self, filename: str) -> None:
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filename, 'w') as f:
+            json.dump(self.stats(), f, indent=2)
+
+    def log_stats(self) -> None:
+        for name, stats in self.stats().items():
+            wall = stats['wall_s']
+            logging.info(f"Profile {name}: {stats['calls']} calls, {wall['total']:.2f}s total, "
+                         f"p50 {1000 * wall['p50']:.1f}ms, p99 {1000 * wall['p99']:.1f}ms, "
+                         f"cpu {stats['cpu_s']['total']:.2f}s")
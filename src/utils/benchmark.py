@@ -0,0 +1,134 @@
+import os
+import json
+import tempfile
+import numpy as np
+import pandas as pd
+from functools import partial
+from time import perf_counter
+from typing import Callable, Dict, List, Sequence, Tuple
+from src.processing.operations.read import read_dicom
+from src.processing.operations.normalize import (clahe, apply_gabor, minmax_normalisation, lean_to_float,
+                                                 truncate_normalization)
+from src.processing.operations.transform import roi_box, crop_to_roi, resize, build_pyramid
+
+# Input of each benchmarked operation, built once per file by `operation_inputs`
+INPUT_STAGES = ('path', 'raw', 'raw_lean', 'normalized', 'normalized_lean', 'clahe', 'image_mask', 'cropped',
+                'resized', 'resized_lean')
+
+# (name, operation, input stage): every operation of `src.processing.operations`, in its usual pipeline position
+OPERATION_CASES: List[Tuple[str, Callable, str]] = [
+    ('read_dicom', read_dicom, 'path'),
+    ('read_dicom[lean]', partial(read_dicom, lean=True), 'path'),
+    ('minmax_normalisation', minmax_normalisation, 'raw'),
+    ('minmax_normalisation[lean]', partial(minmax_normalisation, lean=True), 'raw_lean'),
+    ('clahe', clahe, 'normalized'),
+    ('clahe[lean]', partial(clahe, lean=True), 'normalized_lean'),
+    ('apply_gabor', apply_gabor, 'clahe'),
+    ('truncate_normalization', truncate_normalization, 'image_mask'),
+    ('roi_box', roi_box, 'normalized'),
+    ('crop_to_roi', crop_to_roi, 'normalized'),
+    ('crop_to_roi[lean]', partial(crop_to_roi, lean=True), 'normalized_lean'),
+    ('crop_to_roi[proxy 1/8]', partial(crop_to_roi, proxy_scale=0.125), 'normalized'),
+    ('resize', resize, 'cropped'),
+    ('build_pyramid', partial(build_pyramid, image_size=256), 'cropped'),
+    ('lean_to_float', lean_to_float, 'resized_lean'),
+]
+
+
+def operation_inputs(path: str) -> Dict[str, object]:
+    """Returns the input of every stage of `INPUT_STAGES` for the DICOM file `path`."""
+    raw = read_dicom(path)
+    raw_lean = read_dicom(path, lean=True)
+    normalized = minmax_normalisation(raw.copy())
+    normalized_lean = minmax_normalisation(raw_lean.copy(), lean=True)
+    cropped = crop_to_roi(normalized)
+    return {
+        'path': path,
+        'raw': raw,
+        'raw_lean': raw_lean,
+        'normalized': normalized,
+        'normalized_lean': normalized_lean,
+        'clahe': clahe(normalized.copy()),
+        'image_mask': (normalized, (normalized > normalized.mean()).astype(np.uint8)),
+        'cropped': cropped,
+        'resized': resize(cropped),
+        'resized_lean': resize(crop_to_roi(normalized_lean.copy(), lean=True)),
+    }
+
+
+def _fresh(value):
+    """Copies array inputs, as some operations work in place."""
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_fresh(item) for item in value)
+    return value
+
+
+def benchmark_operations(paths: Sequence[str], repeats: int = 3,
+                         cases: Sequence[Tuple[str, Callable, str]] = OPERATION_CASES) -> Dict[str, float]:
+    """
+    Times each operation of `cases` on every file of `paths`, and returns its throughput in images/s.
+
+    Inputs are prepared (and copied) outside of the timed calls. The throughput is the best of `repeats`
+    passes over the files.
+    """
+    inputs = [operation_inputs(path) for path in paths]
+    results = {}
+    for name, operation, stage in cases:
+        best = float('inf')
+        for _ in range(repeats):
+            elapsed = 0.0
+            for stages in inputs:
+                value = _fresh(stages[stage])
+                t_start = perf_counter()
+                operation(value)
+                elapsed += perf_counter() - t_start
+            best = min(best, elapsed)
+        results[name] = len(inputs) / best if best > 0 else float('inf')
+    return results
+
+
+def benchmark_converter(paths: Sequence[str], batch_size: int = 8, n_workers: int = 2, executor: str = 'thread',
+                        lean: bool = False, repeats: int = 1) -> float:
+    """Returns the end-to-end throughput of `VindrH5Converter.run` over `paths`, in images/s (best of `repeats`)."""
+    from src.core.converters.vindr import VindrH5Converter
+    from src.processing.pipeline import BreastImageProcessingPipeline
+    df = pd.DataFrame({'absolute_path': list(paths), 'breast_birads': '1', 'finding_categories': '0'})
+    best = float('inf')
+    for _ in range(repeats):
+        converter = VindrH5Converter(BreastImageProcessingPipeline(lean=lean), batch_size, n_workers,
+                                     executor=executor)
+        with tempfile.TemporaryDirectory() as output_dir:
+            t_start = perf_counter()
+            converter.run({'benchmark': df}, output_dir)
+            best = min(best, perf_counter() - t_start)
+    return len(paths) / best
+
+
+def compare_to_baseline(results: Dict[str, float], baseline: Dict[str, float], tolerance: float = 0.3) -> List[dict]:
+    """
+    Returns the benchmarks of `baseline` whose throughput in `results` dropped by more than `tolerance`
+    (a fraction of the baseline), or that are missing from `results`.
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        current = results.get(name)
+        if current is None or current < expected * (1 - tolerance):
+            regressions.append({'name': name, 'baseline': expected, 'current': current,
+                                'ratio': current / expected if current is not None and expected else None})
+    return regressions
+
+
+def load_baseline(filename: str) -> dict:
+    """Returns the baseline saved by `save_baseline`: {'config': ..., 'results': {name: images/s}}."""
+    with open(filename) as f:
+        return json.load(f)
+
+
+def save_baseline(filename: str, config: dict, results: Dict[str, float]) -> None:
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename, 'w') as f:
+        json.dump({'config': config, 'results': results}, f, indent=2, sort_keys=True)
@@ -0,0 +1,143 @@
+import os
+import re
+import h5py
+import tempfile
+import numpy as np
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import hdf5plugin
+except ImportError:  # Filter plugins are optional
+    hdf5plugin = None
+
+DEFAULT_GZIP_LEVEL = 4
+
+
+def _plugin_codecs() -> Dict[str, callable]:
+    if hdf5plugin is None:
+        return {}
+    return {
+        'lz4': lambda level: hdf5plugin.LZ4(),
+        'zstd': lambda level: hdf5plugin.Zstd(clevel=level or 3),
+        'blosc-lz4': lambda level: hdf5plugin.Blosc(cname='lz4', clevel=level or 5, shuffle=hdf5plugin.Blosc.SHUFFLE),
+        'blosc-zstd': lambda level: hdf5plugin.Blosc(cname='zstd', clevel=level or 5, shuffle=hdf5plugin.Blosc.SHUFFLE),
+        'bitshuffle-lz4': lambda level: hdf5plugin.Bitshuffle(cname='lz4'),
+    }
+
+
+def available_codecs() -> List[str]:
+    """Codec names accepted by `codec_options`. Filter plugins are listed only when hdf5plugin is installed."""
+    return ['none', 'lzf', 'gzip'] + list(_plugin_codecs())
+
+
+def codec_options(codec: str) -> dict:
+    """
+    Returns the `create_dataset` keyword arguments of a codec.
+
+    Args:
+        codec (str): 'none', 'lzf', 'gzip' or a filter plugin name (see `available_codecs`), optionally
+            followed by a compression level, e.g. 'gzip-1' or 'zstd-9'.
+
+    Returns:
+        dict: Keyword arguments for `h5py.Group.create_dataset`.
+    """
+    match = re.fullmatch(r'([a-z0-9-]+?)(?:-(\d+))?', codec.lower())
+    if match is None:
+        raise ValueError(f"Invalid codec: {codec}")
+    name, level = match.group(1), int(match.group(2)) if match.group(2) else None
+    if name == 'none':
+        return {}
+    if name == 'lzf':
+        return {'compression': 'lzf'}
+    if name == 'gzip':
+        return {'compression': 'gzip', 'compression_opts': DEFAULT_GZIP_LEVEL if level is None else level}
+    plugins = _plugin_codecs()
+    if name in plugins:
+        return dict(plugins[name](level))
+    hint = " (filter plugins require hdf5plugin)" if hdf5plugin is None else ""
+    raise ValueError(f"Unknown codec: {codec}. Available: {available_codecs()}{hint}")
+
+
+def chunk_shape(layout: Optional[str], image_shape: Tuple[int, ...], n_images: int = None) -> Optional[Tuple[int, ...]]:
+    """
+    Returns the HDF5 chunk shape of an image dataset.
+
+    Args:
+        layout (str, optional): 'image' for one image per chunk, 'images-N' for N images per chunk,
+            'tile-N' for NxN tiles of one image, or 'auto' / None to let h5py choose.
+        image_shape (tuple): Shape of one image.
+        n_images (int, optional): Number of images of a fixed-size dataset, which chunks cannot exceed.
+    """
+    if layout in (None, 'auto'):
+        return None
+    if layout == 'image':
+        return (1,) + tuple(image_shape)
+    match = re.fullmatch(r'(images|tile)-(\d+)', layout)
+    if match is None:
+        raise ValueError(f"Invalid chunk layout: {layout}. Expected 'auto', 'image', 'images-N' or 'tile-N'")
+    size = int(match.group(2))
+    if match.group(1) == 'images':
+        return (max(1, min(size, n_images or size)),) + tuple(image_shape)
+    return (1,) + tuple(min(size, dim) for dim in image_shape[:2]) + tuple(image_shape[2:])
+
+
+def benchmark_layout(images: np.ndarray, codec: str, layout: str, n_reads: int = 200, seed: int = 0) -> dict:
+    """
+    Writes `images` with the given codec and chunk layout to a temporary file and measures it.
+
+    Returns:
+        dict: Codec, layout, file size, write time and latency percentiles of random single-image reads.
+    """
+    fd, path = tempfile.mkstemp(suffix='.h5')
+    os.close(fd)
+    try:
+        t_start = perf_counter()
+        with h5py.File(path, 'w') as f:
+            f.create_dataset('x', data=images, chunks=chunk_shape(layout, images.shape[1:], len(images)),
+                             **codec_options(codec))
+        write_time = perf_counter() - t_start
+        size = os.path.getsize(path)
+
+        indices = np.random.default_rng(seed).integers(0, len(images), size=n_reads)
+        latencies = []
+        # No chunk cache: every read pays the decompression of its chunks, as in a shuffled training epoch
+        with h5py.File(path, 'r', rdcc_nbytes=0) as f:
+            x = f['x']
+            for i in indices:
+                t_start = perf_counter()
+                x[i]
+                latencies.append(perf_counter() - t_start)
+        latencies = np.array(latencies) * 1e3
+        return {
+            'codec': codec,
+            'layout': layout,
+            'size_mb': size / 1024 ** 2,
+            'ratio': images.nbytes / size,
+            'write_s': write_time,
+            'read_p50_ms': float(np.percentile(latencies, 50)),
+            'read_p95_ms': float(np.percentile(latencies, 95)),
+        }
+    finally:
+        os.remove(path)
+
+
+def autotune(images: np.ndarray, codecs: Sequence[str], layouts: Sequence[str], n_reads: int = 200) -> List[dict]:
+    """Benchmarks every codec / layout combination on `images`, fastest random reads first."""
+    results = [benchmark_layout(images, codec, layout, n_reads) for codec in codecs for layout in layouts]
+    return sorted(results, key=lambda result: result['read_p50_ms'])
+
+
+def recommend(results: List[dict]) -> Dict[str, dict]:
+    """
+    Picks the fastest-reading, the smallest and a balanced setting from `autotune` results.
+
+    The balanced setting minimises the product of read latency and file size, each relative to the best.
+    """
+    best_read = min(result['read_p50_ms'] for result in results)
+    best_size = min(result['size_mb'] for result in results)
+    return {
+        'fastest_reads': min(results, key=lambda result: result['read_p50_ms']),
+        'smallest': min(results, key=lambda result: result['size_mb']),
+        'balanced': min(results, key=lambda result: (result['read_p50_ms'] / best_read) * (result['size_mb'] / best_size)),
+    }
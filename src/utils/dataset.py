@@ -1,49 +1,427 @@
+import io
 import os
+import json
+import tarfile
 import h5py
 import torch
-from torch.utils.data import Dataset
+import logging
+from collections import OrderedDict
+from torch.utils.data import Dataset, IterableDataset, get_worker_info
 import numpy as np
 from glob import glob
+from src.utils.quantization import dequantization_params
+from src.core.converters.writers import NPY_HEADER_FILENAME, TAR_INDEX_FILENAME
+from src.utils.samplers import shuffle_buffer
+
+INDEX_CACHE_FILENAME = '.h5_index.json'
+# Sample label keys of the label datasets
+LABEL_KEYS = {'y_birads': 'birads', 'y_lesions': 'lesion'}
+
+
+def label_key(name):
+    return LABEL_KEYS.get(name, name[2:] if name.startswith('y_') else name)
+
+
+def storage_tensor(image):
+    """Tensor of a stored image: uint16, which most torch operations and collation do not support, is widened to int32."""
+    if image.dtype == np.uint16:
+        image = image.astype(np.int32)
+    return torch.from_numpy(image)
+
+
+def scan_chunk_files(chunk_files, cache_path=None):
+    """
+    Returns the number of samples and the dequantization parameters of every HDF5 file.
+
+    When `cache_path` is given, the metadata of files whose size and modification time did not
+    change is read from that JSON file instead of opening them, and the cache is refreshed.
+    """
+    cached = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+
+    entries, changed = {}, False
+    for file in chunk_files:
+        stat = os.stat(file)
+        name = os.path.basename(file)
+        entry = cached.get(name)
+        if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            with h5py.File(file, 'r') as f:
+                scale, offset = dequantization_params(f['x'].attrs)
+                # Split files are preallocated: only the first `n_rows` rows were written
+                n_samples = min(int(f.attrs.get('n_rows', f['x'].shape[0])), int(f['x'].shape[0]))
+                entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                         'n_samples': n_samples, 'scale': scale, 'offset': offset}
+            changed = True
+        entries[name] = entry
+
+    if cache_path and (changed or len(entries) != len(cached)):
+        try:
+            with open(cache_path, 'w') as f:
+                json.dump(entries, f)
+        except OSError as e:
+            logging.debug(f"Could not write index cache {cache_path}: {e}")
+    return [entries[os.path.basename(file)] for file in chunk_files]
+
+
+def _read_runs(dataset, rows, n_rows=None):
+    """
+    Groups sorted, unique `rows` of an h5py dataset into contiguous slices to read.
+
+    Each run spans consecutive HDF5 chunks holding requested rows, so every chunk is decompressed
+    once. Slices are much faster than h5py fancy indexing, which selects rows one by one. Slices stop
+    at `n_rows` (default: the length of the dataset), the rows actually written.
+
+    Yields:
+        (start, end, selected): slice bounds and the positions in `rows` of the rows it contains.
+    """
+    chunk_rows = dataset.chunks[0] if dataset.chunks else 1
+    chunk_ids = rows // chunk_rows
+    breaks = np.flatnonzero(np.diff(chunk_ids) > 1) + 1
+    for selected in np.split(np.arange(len(rows)), breaks):
+        start = int(chunk_ids[selected[0]] * chunk_rows)
+        end = int(min((chunk_ids[selected[-1]] + 1) * chunk_rows, dataset.shape[0] if n_rows is None else n_rows))
+        yield start, end, selected
+
 
 class HDF5ChunkedDataset(Dataset):
-    def __init__(self, root_dir, transform=None):
+    def __init__(self, root_dir, transform=None, dequantize=True, cache_index=True, max_open_files=128):
         """
         PyTorch Dataset for reading chunked HDF5 files.
 
+        Files are opened lazily and kept open, separately in every process: handles inherited from a
+        parent process (e.g. by forked DataLoader workers) are never used, each worker reopens its own.
+
         Args:
             root_dir (str): Path to directory containing HDF5 chunks.
             transform (callable, optional): Optional transform to apply to each sample.
+            dequantize (bool): Convert images stored as integers back to float32 using the `scale` and
+                `offset` attributes of `x`. If False, images keep their storage dtype (uint16 as int32, see
+                `storage_tensor`), e.g. to dequantize whole batches on the GPU.
+            cache_index (bool): Cache the sample counts of the files in `root_dir`, so later datasets
+                only open files that changed.
+            max_open_files (int): Maximum number of files kept open per process.
         """
         self.chunk_files = sorted(glob(os.path.join(root_dir, '*.h5')))
         self.transform = transform
-        self.index_map = []
+        self.dequantize = dequantize
+        self.max_open_files = max_open_files
+
+        # Pre-scan dataset sizes and dequantization parameters
+        cache_path = os.path.join(root_dir, INDEX_CACHE_FILENAME) if cache_index else None
+        metadata = scan_chunk_files(self.chunk_files, cache_path)
+        self.chunk_sizes = [entry['n_samples'] for entry in metadata]
+        self.chunk_dequantization = [(entry['scale'], entry['offset']) for entry in metadata]
+        # Sample `idx` lives in file `i` such that chunk_offsets[i] <= idx < chunk_offsets[i + 1]
+        self.chunk_offsets = np.concatenate([[0], np.cumsum(self.chunk_sizes, dtype=np.int64)])
+
+        self._handles = OrderedDict()
+        self._pid = os.getpid()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_handles'] = OrderedDict()
+        return state
+
+    def __len__(self):
+        return int(self.chunk_offsets[-1])
+
+    def locate(self, idx):
+        """Returns (file index, row index in that file) of sample `idx`."""
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"Index {idx} out of range for dataset of size {len(self)}")
+        chunk_idx = int(np.searchsorted(self.chunk_offsets, idx, side='right')) - 1
+        return chunk_idx, int(idx - self.chunk_offsets[chunk_idx])
+
+    def _datasets(self, chunk_idx):
+        """Returns the open `x` dataset of a file and its label datasets (`y_*`) by name, opening it if needed."""
+        if self._pid != os.getpid():
+            # Forked: drop the parent's handles without touching them
+            self._handles = OrderedDict()
+            self._pid = os.getpid()
 
-        # Pre-scan dataset sizes
-        self.chunk_sizes = []
-        for chunk_idx, file in enumerate(self.chunk_files):
+        datasets = self._handles.get(chunk_idx)
+        if datasets is None:
+            while len(self._handles) >= self.max_open_files:
+                _, (old_file, *_) = self._handles.popitem(last=False)
+                old_file.close()
+            f = h5py.File(self.chunk_files[chunk_idx], 'r')
+            # Label datasets depend on the converter, e.g. y_birads / y_lesions or y_pathology
+            datasets = (f, f['x'], {name: f[name] for name in f if name.startswith('y_')})
+            self._handles[chunk_idx] = datasets
+        else:
+            self._handles.move_to_end(chunk_idx)
+        return datasets[1:]
+
+    def read_labels(self, name='y_birads'):
+        """Returns the label dataset `name` of every sample, without reading any image."""
+        labels = []
+        for file in self.chunk_files:
             with h5py.File(file, 'r') as f:
-                n_samples = f['x'].shape[0]
-                self.chunk_sizes.append(n_samples)
-                self.index_map.extend([(chunk_idx, i) for i in range(n_samples)])
+                labels.append(f[name][:])
+        return np.concatenate(labels) if labels else np.empty(0, dtype=np.int32)
+
+    def close(self):
+        if self._pid == os.getpid():
+            for f, *_ in self._handles.values():
+                f.close()
+        self._handles = OrderedDict()
+
+    def _sample(self, chunk_idx, image, labels):
+        # Convert to torch tensor, dequantizing integer storage
+        if self.dequantize:
+            image = storage_tensor(image).to(torch.float32).unsqueeze(0)  # Assuming grayscale
+            scale, offset = self.chunk_dequantization[chunk_idx]
+            if scale != 1.0:
+                image.mul_(scale)
+            if offset != 0.0:
+                image.add_(offset)
+        else:
+            image = storage_tensor(image).unsqueeze(0)
+        if self.transform:
+            image = self.transform(image)
+
+        return image, {label_key(name): torch.tensor(label, dtype=torch.long) for name, label in labels.items()}
+
+    def __getitem__(self, idx):
+        chunk_idx, local_idx = self.locate(idx)
+        x, labels = self._datasets(chunk_idx)
+        return self._sample(chunk_idx, x[local_idx], {name: dataset[local_idx] for name, dataset in labels.items()})
+
+    def __getitems__(self, indices):
+        """
+        Reads a batch of samples, with one h5py call per file instead of one per sample.
+
+        Used by DataLoader in place of `__getitem__`. Returns the samples in the order of `indices`.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        indices = np.where(indices < 0, indices + len(self), indices)
+        if len(indices) and (indices.min() < 0 or indices.max() >= len(self)):
+            raise IndexError(f"Indices out of range for dataset of size {len(self)}")
+        chunk_indices = np.searchsorted(self.chunk_offsets, indices, side='right') - 1
+
+        samples = [None] * len(indices)
+        for chunk_idx in np.unique(chunk_indices):
+            positions = np.flatnonzero(chunk_indices == chunk_idx)
+            local_indices = indices[positions] - self.chunk_offsets[chunk_idx]
+            # h5py needs increasing, unique indices
+            rows, inverse = np.unique(local_indices, return_inverse=True)
+            x, label_datasets = self._datasets(int(chunk_idx))
+            images = np.concatenate([x[start:end][rows[selected] - start] for start, end, selected in _read_runs(x, rows, self.chunk_sizes[int(chunk_idx)])])
+            labels = {name: dataset[rows[0]:rows[-1] + 1] for name, dataset in label_datasets.items()}
+            for position, row in zip(positions, inverse):
+                local_idx = rows[row] - rows[0]
+                samples[position] = self._sample(int(chunk_idx), images[row], {name: values[local_idx] for name, values in labels.items()})
+        return samples
+
+
+class AugmentedDataset(Dataset):
+    def __init__(self, dataset, pipeline=None, label='y_birads', value_range=(0.0, 255.0), transform=None, seed=0):
+        """
+        Applies an albumentations pipeline to the images of `dataset` as they are read, e.g. in the
+        DataLoader workers, instead of writing augmented copies of them. Combined with a
+        `ClassBalancedSampler` over `class_counts`, minority classes are oversampled with new
+        augmentations every time.
+
+        Args:
+            dataset (HDF5ChunkedDataset): Dataset of dequantized images, without transform.
+            pipeline (A.Compose, optional): Augmentation pipeline. Defaults to all the transforms of the
+                augmentors, see `src.processing.augmentations.base.build_pipeline`.
+            label (str): Label dataset the classes are read from, e.g. 'y_birads' or 'y_lesions'.
+            value_range (tuple): (min, max) of the stored images, mapped onto [0, 1] for the pipeline.
+            transform (callable, optional): Optional transform applied to each augmented image.
+            seed (int): Base seed of the augmentations, combined with the torch seed of each process.
+        """
+        if pipeline is None:
+            from src.processing.augmentations.base import build_pipeline
+            pipeline = build_pipeline()
+        self.dataset = dataset
+        self.pipeline = pipeline
+        self.label = label
+        self.value_range = value_range
+        self.transform = transform
+        self.seed = seed
+        self._labels = None
+        self._seeded_pid = None
+
+    def labels(self):
+        if self._labels is None:
+            self._labels = self.dataset.read_labels(self.label)
+        return self._labels
+
+    def class_counts(self):
+        """Number of samples of each class of `label`."""
+        classes, counts = np.unique(self.labels(), return_counts=True)
+        return {int(cls): int(count) for cls, count in zip(classes, counts)}
 
     def __len__(self):
-        return len(self.index_map)
+        return len(self.dataset)
+
+    def _augment(self, sample):
+        if self._seeded_pid != os.getpid():
+            # DataLoader workers get a different torch seed every epoch
+            from src.processing.augmentations.engine import seed_pipeline
+            seed_pipeline(self.pipeline, int(np.random.SeedSequence([self.seed, torch.initial_seed()]).generate_state(1)[0]))
+            self._seeded_pid = os.getpid()
+        image, labels = sample
+        low, high = self.value_range
+        array = (image.numpy().astype(np.float32, copy=False) - low) / (high - low)
+        augmented = self.pipeline(image=array.reshape(array.shape[-2:]))['image']
+        image = torch.from_numpy(np.ascontiguousarray(augmented) * (high - low) + low).reshape(image.shape)
+        if self.transform:
+            image = self.transform(image)
+        return image, labels
 
     def __getitem__(self, idx):
-        chunk_idx, local_idx = self.index_map[idx]
-        file_path = self.chunk_files[chunk_idx]
+        return self._augment(self.dataset[idx])
+
+    def __getitems__(self, indices):
+        return [self._augment(sample) for sample in self.dataset.__getitems__(indices)]
+
+
+class MemmapDataset(Dataset):
+    def __init__(self, root_dir, transform=None, dequantize=True):
+        """
+        PyTorch Dataset reading the uncompressed `.npy` arrays written by the 'npy' output mode.
 
-        with h5py.File(file_path, 'r') as f:
-            image = f['x'][local_idx]
-            birads = f['y_birads'][local_idx]
-            lesion = f['y_lesions'][local_idx]
+        Images are memory-mapped, so DataLoader workers share the OS page cache instead of each
+        decompressing and copying images, and returned tensors are views of the mapped file. The
+        mapping is copy-on-write: in-place transforms never modify the file. Labels are loaded in memory.
 
-        # Normalize or convert to torch tensor
-        image = torch.tensor(image, dtype=torch.float32).unsqueeze(0)  # Assuming grayscale
-        birads = torch.tensor(birads, dtype=torch.long)
-        lesion = torch.tensor(lesion, dtype=torch.long)
+        Args:
+            root_dir (str): Directory of the arrays and their JSON header.
+            transform (callable, optional): Optional transform to apply to each sample.
+            dequantize (bool): Convert images stored as integers back to float32 (which copies them).
+                If False, images keep their storage dtype and are returned without any copy, except uint16
+                images, returned as int32 (see `storage_tensor`).
+        """
+        self.root_dir = root_dir
+        self.transform = transform
+        self.dequantize = dequantize
+        with open(os.path.join(root_dir, NPY_HEADER_FILENAME)) as f:
+            self.header = json.load(f)
+        self.n_rows = int(self.header['n_rows'])
+        self.scale, self.offset = dequantization_params(self.header['x'])
+        self.labels = {
+            label_key(name): torch.from_numpy(np.load(os.path.join(root_dir, spec['file']))[:self.n_rows].astype(np.int64))
+            for name, spec in self.header['labels'].items()
+        }
+        self._images = None
+        self._pid = None
+
+    def __getstate__(self):
+        # Memory maps are pickled by value: let each worker map the file itself
+        state = self.__dict__.copy()
+        state['_images'] = None
+        return state
+
+    @property
+    def images(self):
+        if self._images is None or self._pid != os.getpid():
+            self._images = np.load(os.path.join(self.root_dir, self.header['x']['file']), mmap_mode='c')
+            self._pid = os.getpid()
+        return self._images
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"Index {idx} out of range for dataset of size {len(self)}")
+        image = storage_tensor(self.images[idx]).unsqueeze(0)  # Assuming grayscale
+        if self.dequantize and image.dtype != torch.float32:
+            image = image.to(torch.float32)
+            if self.scale != 1.0:
+                image.mul_(self.scale)
+            if self.offset != 0.0:
+                image.add_(self.offset)
 
         if self.transform:
             image = self.transform(image)
 
-        return image, {'birads': birads, 'lesion': lesion}
+        return image, {key: labels[idx] for key, labels in self.labels.items()}
+
+
+class TarShardDataset(IterableDataset):
+    def __init__(self, root_dir, transform=None, dequantize=True, shuffle=True, shuffle_buffer=0, seed=0):
+        """
+        PyTorch IterableDataset streaming the tar shards written by the 'tar' output mode.
+
+        Each shard is read sequentially from start to end. Shuffling happens at shard level, plus
+        optionally through a buffer of samples, and DataLoader workers read disjoint sets of shards.
+
+        Args:
+            root_dir (str): Directory of the shards and their JSON index.
+            transform (callable, optional): Optional transform to apply to each sample.
+            dequantize (bool): Convert images stored as integers back to float32. If False, images keep
+                their storage dtype (uint16 as int32, see `storage_tensor`).
+            shuffle (bool): Visit the shards in a random order, different at every epoch (see `set_epoch`).
+            shuffle_buffer (int): Number of samples shuffled together across shards, 0 to keep their order.
+            seed (int): Base seed, combined with the epoch.
+        """
+        self.root_dir = root_dir
+        self.transform = transform
+        self.dequantize = dequantize
+        self.shuffle = shuffle
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.epoch = 0
+        with open(os.path.join(root_dir, TAR_INDEX_FILENAME)) as f:
+            self.index = json.load(f)
+        self.shards = [os.path.join(root_dir, shard['file']) for shard in self.index['shards']]
+        self.scale, self.offset = dequantization_params(self.index['x'])
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return int(self.index['n_rows'])
+
+    def _worker_shards(self, rng):
+        order = rng.permutation(len(self.shards)) if self.shuffle else np.arange(len(self.shards))
+        worker = get_worker_info()
+        if worker is not None:
+            order = order[worker.id::worker.num_workers]
+        return [self.shards[i] for i in order]
+
+    @staticmethod
+    def _read_shard(path):
+        """Yields the (image, label record) pairs of a shard, in order."""
+        image = None
+        with tarfile.open(path, 'r|') as tar:
+            for member in tar:
+                data = tar.extractfile(member).read()
+                if member.name.endswith('.npy'):
+                    image = np.load(io.BytesIO(data), allow_pickle=False)
+                elif member.name.endswith('.json'):
+                    yield image, json.loads(data)
+
+    def _sample(self, image, record):
+        image = storage_tensor(image).unsqueeze(0)  # Assuming grayscale
+        if self.dequantize and image.dtype != torch.float32:
+            image = image.to(torch.float32)
+            if self.scale != 1.0:
+                image.mul_(self.scale)
+            if self.offset != 0.0:
+                image.add_(self.offset)
+
+        if self.transform:
+            image = self.transform(image)
+
+        return image, {label_key(name): torch.tensor(label, dtype=torch.long) for name, label in record.items()}
+
+    def __iter__(self):
+        rng = np.random.default_rng([self.seed, self.epoch])
+        samples = (sample for path in self._worker_shards(rng) for sample in self._read_shard(path))
+        if self.shuffle and self.shuffle_buffer > 1:
+            samples = shuffle_buffer(samples, self.shuffle_buffer, rng)
+        for image, record in samples:
+            yield self._sample(image, record)
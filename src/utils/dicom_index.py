@@ -0,0 +1,137 @@
+import os
+import logging
+import pandas as pd
+from typing import Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pydicom import dcmread
+
+INDEX_COLUMNS = ['path', 'rows', 'columns', 'bits_stored', 'photometric_interpretation', 'transfer_syntax',
+                 'file_size', 'mtime_ns', 'error']
+# Integers are nullable, as attributes of unreadable files are missing
+INDEX_DTYPES = {column: 'Int64' if column in ('rows', 'columns', 'bits_stored', 'file_size', 'mtime_ns') else 'str'
+                for column in INDEX_COLUMNS}
+
+
+def read_header(path: str) -> dict:
+    """
+    Reads the image attributes of a DICOM file without loading its pixel data.
+
+    Returns:
+        dict: One index row (see `INDEX_COLUMNS`). Unreadable files get an `error` message and empty attributes.
+    """
+    row = dict.fromkeys(INDEX_COLUMNS)
+    row['path'] = path
+    try:
+        stat = os.stat(path)
+        row['file_size'], row['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+        ds = dcmread(path, stop_before_pixels=True)
+        row['rows'], row['columns'] = int(ds.Rows), int(ds.Columns)
+        row['bits_stored'] = int(ds.get('BitsStored', ds.get('BitsAllocated', 0)))
+        row['photometric_interpretation'] = str(ds.get('PhotometricInterpretation', ''))
+        file_meta = getattr(ds, 'file_meta', None)
+        row['transfer_syntax'] = str(file_meta.get('TransferSyntaxUID', '')) if file_meta is not None else ''
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def scan_headers(paths: Iterable[str], n_workers: int = 8) -> pd.DataFrame:
+    """Reads the headers of `paths` in parallel, see `read_header`."""
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        rows = list(executor.map(read_header, paths))
+    # Build integer columns directly: through float64, mtime_ns would lose precision
+    return pd.DataFrame({column: pd.array([row[column] for row in rows], dtype=INDEX_DTYPES[column])
+                         for column in INDEX_COLUMNS})
+
+
+def _read_index(filename: str) -> pd.DataFrame:
+    if filename.endswith('.parquet'):
+        return pd.read_parquet(filename).astype(INDEX_DTYPES)
+    return pd.read_csv(filename, keep_default_na=False, na_values=[''], dtype=INDEX_DTYPES)
+
+
+def _write_index(index: pd.DataFrame, filename: str) -> None:
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    part = filename + '.part'
+    if filename.endswith('.parquet'):
+        index.to_parquet(part, index=False)
+    else:
+        index.to_csv(part, index=False)
+    os.replace(part, filename)
+
+
+def build_index(paths: Iterable[str], filename: Optional[str] = None, n_workers: int = 8) -> pd.DataFrame:
+    """
+    Returns the header index of the DICOM files in `paths`, one row per unique path.
+
+    When `filename` is given (`.parquet` or `.csv`), the index is saved there, and rows of a previous
+    index whose file size and modification time did not change are reused instead of read again.
+
+    Args:
+        paths (iterable of str): DICOM files, e.g. the `absolute_path` columns of the loader DataFrames.
+        filename (str, optional): Index file to reuse and update.
+        n_workers (int): Number of parallel header reads.
+    """
+    paths = list(dict.fromkeys(str(path) for path in paths))
+    previous = None
+    if filename and os.path.exists(filename):
+        previous = _read_index(filename).set_index('path', drop=False)
+
+    reused, to_scan = [], []
+    for path in paths:
+        if previous is not None and path in previous.index:
+            row = previous.loc[path]
+            try:
+                stat = os.stat(path)
+                # Rows of files that were missing or unreadable have no size or modification time
+                if (pd.isna(row['error']) and pd.notna(row['file_size']) and pd.notna(row['mtime_ns'])
+                        and row['file_size'] == stat.st_size and row['mtime_ns'] == stat.st_mtime_ns):
+                    reused.append(path)
+                    continue
+            except OSError:
+                pass
+        to_scan.append(path)
+
+    scanned = scan_headers(to_scan, n_workers)
+    frames = [frame for frame in (previous.loc[reused, INDEX_COLUMNS] if reused else None, scanned) if frame is not None]
+    index = pd.concat(frames, ignore_index=True).set_index('path', drop=False).loc[paths].reset_index(drop=True)
+    logging.info(f"DICOM index: {len(to_scan)} headers read, {len(reused)} reused, "
+                 f"{int(index['error'].notna().sum())} unreadable")
+    if filename:
+        _write_index(index, filename)
+    return index
+
+
+SCHEDULES = ('input', 'size')
+
+
+def schedule(paths: Sequence[str], index: pd.DataFrame, order: str = 'input') -> Tuple[List[int], List[int]]:
+    """
+    Plans the processing of `paths` from their header index.
+
+    Files that are missing from the index or whose header could not be read are left out, so they never
+    reach the worker pool. With `order='size'`, the others are sorted by decreasing number of pixels
+    (then transfer syntax), so the largest, slowest images start first and consecutive images cost about
+    the same to decode, which keeps the in-order worker pool from waiting on a single slow image.
+
+    Returns:
+        (list, list): Positions in `paths` to process, in processing order, and positions left out.
+    """
+    if order not in SCHEDULES:
+        raise ValueError(f"Unknown schedule: {order}. Available: {list(SCHEDULES)}")
+    by_path = index.drop_duplicates('path').set_index('path')
+    valid, skipped = [], []
+    for position, path in enumerate(paths):
+        path = str(path)
+        if path in by_path.index and pd.isna(by_path.at[path, 'error']):
+            valid.append(position)
+        else:
+            skipped.append(position)
+    if order == 'size':
+        def cost(position):
+            row = by_path.loc[str(paths[position])]
+            return -int(row['rows']) * int(row['columns']), str(row['transfer_syntax'])
+        valid.sort(key=cost)
+    return valid, skipped
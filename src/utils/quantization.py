@@ -0,0 +1,66 @@
+import numpy as np
+from typing import Mapping, Tuple
+
+STORAGE_DTYPES = {
+    'float32': np.float32,
+    'float16': np.float16,
+    'uint16': np.uint16,
+    'uint8': np.uint8,
+}
+
+
+class Quantizer:
+    """
+    Encodes images into a compact storage dtype.
+
+    Integer dtypes map `value_range` linearly onto the full integer range: a stored value `q`
+    stands for `q * scale + offset`. Float dtypes are stored as is (scale 1, offset 0).
+    The scale and offset are meant to be saved as attributes of the image dataset, see `attrs`.
+
+    Args:
+        storage_dtype (str): One of 'float32', 'float16', 'uint16' or 'uint8'.
+        value_range (tuple): (min, max) of the pipeline output. Values outside are clipped.
+    """
+    def __init__(self, storage_dtype: str = 'float32', value_range: Tuple[float, float] = (0.0, 255.0)):
+        if storage_dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unknown storage dtype: {storage_dtype}. Available: {list(STORAGE_DTYPES)}")
+        low, high = map(float, value_range)
+        if high <= low:
+            raise ValueError(f"Invalid value range: {value_range}")
+        self.storage_dtype = storage_dtype
+        self.dtype = np.dtype(STORAGE_DTYPES[storage_dtype])
+        self.value_range = (low, high)
+        if self.dtype.kind == 'u':
+            self.scale = (high - low) / np.iinfo(self.dtype).max
+            self.offset = low
+        else:
+            self.scale, self.offset = 1.0, 0.0
+
+    def __call__(self, image: np.ndarray) -> np.ndarray:
+        return self.encode(image)
+
+    def encode(self, image: np.ndarray) -> np.ndarray:
+        image = np.asarray(image)
+        if self.dtype.kind != 'u':
+            return image.astype(self.dtype, copy=False)
+        encoded = (image - self.offset) / self.scale
+        np.rint(encoded, out=encoded)
+        np.clip(encoded, 0, np.iinfo(self.dtype).max, out=encoded)
+        return encoded.astype(self.dtype)
+
+    def attrs(self) -> dict:
+        return {'storage_dtype': self.storage_dtype, 'scale': self.scale, 'offset': self.offset}
+
+
+def dequantization_params(attrs: Mapping) -> Tuple[float, float]:
+    """Returns (scale, offset) from the attributes of an image dataset; (1, 0) for plain float datasets."""
+    return float(attrs.get('scale', 1.0)), float(attrs.get('offset', 0.0))
+
+
+def dequantize(array: np.ndarray, scale: float = 1.0, offset: float = 0.0) -> np.ndarray:
+    image = np.asarray(array, dtype=np.float32)
+    if scale != 1.0:
+        image = image * np.float32(scale)
+    if offset != 0.0:
+        image = image + np.float32(offset)
+    return image
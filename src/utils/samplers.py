@@ -0,0 +1,116 @@
+import numpy as np
+from typing import Iterable, Iterator, List, Sequence, TypeVar
+from torch.utils.data import Sampler
+
+T = TypeVar('T')
+
+
+def shuffle_buffer(items: Iterable[T], size: int, rng: np.random.Generator) -> Iterator[T]:
+    """
+    Shuffles a stream locally: items go through a buffer of `size` items, drawn from at random.
+
+    Only `size` items are held at once; a buffer at least as long as the stream shuffles it fully.
+    """
+    buffer = []
+    for item in items:
+        if len(buffer) < size:
+            buffer.append(item)
+            continue
+        pick = int(rng.integers(len(buffer)))
+        yield buffer[pick]
+        buffer[pick] = item
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+class ChunkShuffleBatchSampler(Sampler[List[int]]):
+    """
+    Batch sampler shuffling HDF5 files, then samples within each file through a shuffle buffer.
+
+    Files are visited in a random order and the rows of each file are streamed in order through a
+    buffer of `shuffle_buffer` indices, from which samples are drawn at random. Consecutive batches
+    therefore read from one or two files at a time, and rows close to each other, so compressed
+    HDF5 chunks are decompressed once per batch instead of once per sample. With a buffer at least
+    as large as the files, samples are fully shuffled within each file.
+
+    Meant as the `batch_sampler` of a DataLoader over an `HDF5ChunkedDataset`, whose `__getitems__`
+    then reads each batch with one h5py call per file.
+
+    Args:
+        chunk_sizes (sequence of int): Number of samples of each file, e.g. `dataset.chunk_sizes`.
+        batch_size (int): Number of samples per batch.
+        shuffle_buffer (int): Number of indices shuffled together. 1 reads each file sequentially.
+        drop_last (bool): Drop the last incomplete batch.
+        seed (int): Base seed, combined with the epoch (see `set_epoch`).
+    """
+    def __init__(self, chunk_sizes: Sequence[int], batch_size: int, shuffle_buffer: int = 1024,
+                 drop_last: bool = False, seed: int = 0):
+        if batch_size < 1 or shuffle_buffer < 1:
+            raise ValueError("batch_size and shuffle_buffer must be positive")
+        self.chunk_sizes = [int(size) for size in chunk_sizes]
+        self.chunk_offsets = np.concatenate([[0], np.cumsum(self.chunk_sizes, dtype=np.int64)])
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        """Changes the order of the next iteration, e.g. at the start of every epoch."""
+        self.epoch = epoch
+
+    def _indices(self, rng: np.random.Generator) -> Iterator[int]:
+        chunks = (range(int(self.chunk_offsets[i]), int(self.chunk_offsets[i + 1]))
+                  for i in rng.permutation(len(self.chunk_sizes)))
+        return shuffle_buffer((idx for chunk in chunks for idx in chunk), self.shuffle_buffer, rng)
+
+    def __iter__(self) -> Iterator[List[int]]:
+        rng = np.random.default_rng([self.seed, self.epoch])
+        batch = []
+        for idx in self._indices(rng):
+            batch.append(idx)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch and not self.drop_last:
+            yield batch
+
+    def __len__(self) -> int:
+        n_samples = int(self.chunk_offsets[-1])
+        if self.drop_last:
+            return n_samples // self.batch_size
+        return (n_samples + self.batch_size - 1) // self.batch_size
+
+
+class ClassBalancedSampler(Sampler[int]):
+    """
+    Sampler drawing every class equally often: samples are drawn with replacement, with a probability
+    inversely proportional to the size of their class, so minority samples are seen several times per
+    epoch instead of being written to disk as augmented copies.
+
+    Args:
+        labels (sequence of int): Class of every sample, e.g. `dataset.read_labels('y_birads')`.
+        num_samples (int, optional): Number of samples per epoch. Defaults to the number of samples.
+        seed (int): Base seed, combined with the epoch (see `set_epoch`).
+    """
+    def __init__(self, labels: Sequence[int], num_samples: int = None, seed: int = 0):
+        labels = np.asarray(labels)
+        if len(labels) == 0:
+            raise ValueError("labels must not be empty")
+        _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+        weights = 1.0 / counts[inverse]
+        self.probabilities = weights / weights.sum()
+        self.num_samples = len(labels) if num_samples is None else num_samples
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        """Changes the samples of the next iteration, e.g. at the start of every epoch."""
+        self.epoch = epoch
+
+    def __iter__(self) -> Iterator[int]:
+        rng = np.random.default_rng([self.seed, self.epoch])
+        yield from rng.choice(len(self.probabilities), size=self.num_samples, p=self.probabilities).tolist()
+
+    def __len__(self) -> int:
+        return self.num_samples
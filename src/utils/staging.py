@@ -0,0 +1,166 @@
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+
+class _Entry:
+    def __init__(self, local_path: str, size: int):
+        self.local_path = local_path
+        self.size = size
+        self.pins = 0
+        self.ready = threading.Event()
+        self.ok = False
+
+
+class StagingCache:
+    """
+    Copies input files to fast local storage (SSD, /tmp, etc.) ahead of processing.
+
+    Files are copied in parallel and kept under a byte budget: once the budget is reached, the least
+    recently used files that are no longer in use are evicted. Staged files are pinned until
+    `release` is called, so a file is never evicted while a worker may still read it.
+
+    Staging never drops entries: `stage` returns one path per input, in input order. A file that
+    cannot be staged (missing, copy error, or no room left in the budget) maps to its original
+    path, so the processing step reports the failure for that exact file and its labels.
+
+    Args:
+        cache_dir (str, optional): Directory holding the staged files. If None, a temporary directory is used.
+        max_bytes (int, optional): Byte budget of the cache. If None, the cache is unbounded.
+        n_workers (int): Number of parallel copies.
+    """
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, n_workers: int = 8):
+        self._owns_dir = cache_dir is None
+        self.cache_dir = cache_dir or tempfile.mkdtemp(prefix="staging_")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.n_workers = n_workers
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="staging")
+
+    def _local_path(self, src: str) -> str:
+        # Prefix with a digest of the full source path: basenames are not unique across studies
+        digest = hashlib.sha1(src.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}_{os.path.basename(src)}")
+
+    def _evict_for(self, size: int) -> bool:
+        """Evict unpinned entries, least recently used first, until `size` more bytes fit. Caller holds the lock."""
+        if self.max_bytes is None:
+            return True
+        for src in list(self._entries):
+            if self.used_bytes + size <= self.max_bytes:
+                break
+            entry = self._entries[src]
+            if entry.pins == 0 and entry.ready.is_set():
+                del self._entries[src]
+                self.used_bytes -= entry.size
+                try:
+                    os.remove(entry.local_path)
+                except OSError:
+                    pass
+        return self.used_bytes + size <= self.max_bytes
+
+    def _reserve(self, src: str) -> Optional[_Entry]:
+        """Pin the entry of `src`, creating it if needed. Returns None if the file cannot be staged."""
+        with self._lock:
+            entry = self._entries.get(src)
+            if entry is not None:
+                self._entries.move_to_end(src)
+                entry.pins += 1
+                self.hits += 1
+                return entry
+            self.misses += 1
+            try:
+                size = os.path.getsize(src)
+            except OSError as e:
+                logging.warning(f"Cannot stage {src}: {e}")
+                return None
+            if not self._evict_for(size):
+                logging.debug(f"Staging budget exhausted, reading {src} from its source")
+                return None
+            entry = _Entry(self._local_path(src), size)
+            entry.pins = 1
+            self._entries[src] = entry
+            self.used_bytes += size
+        self._pool.submit(self._copy, src, entry)
+        return entry
+
+    def _copy(self, src: str, entry: _Entry) -> None:
+        partial = entry.local_path + ".part"
+        try:
+            shutil.copy2(src, partial)
+            os.replace(partial, entry.local_path)
+            entry.ok = True
+        except Exception as e:
+            logging.warning(f"Failed to stage {src}: {e}")
+            with self._lock:
+                if self._entries.get(src) is entry:
+                    del self._entries[src]
+                    self.used_bytes -= entry.size
+            if os.path.exists(partial):
+                os.remove(partial)
+        finally:
+            entry.ready.set()
+
+    def stage(self, src_paths: Sequence[str]) -> List[str]:
+        """
+        Copy `src_paths` to the cache and return the path to read each of them from, in input order.
+
+        The returned files stay pinned until `release(src_paths)` is called.
+        """
+        src_paths = list(src_paths)
+        entries = [self._reserve(src) for src in src_paths]
+        local_paths = []
+        for src, entry in zip(src_paths, entries):
+            if entry is not None:
+                entry.ready.wait()
+            local_paths.append(entry.local_path if entry is not None and entry.ok else src)
+        return local_paths
+
+    def mapping(self, src_paths: Sequence[str]) -> Dict[str, str]:
+        """Stage `src_paths` and return a `{source path: path to read}` mapping."""
+        src_paths = list(src_paths)
+        return dict(zip(src_paths, self.stage(src_paths)))
+
+    def release(self, src_paths: Sequence[str]) -> None:
+        """Unpin staged files. They stay cached until evicted to make room for newer files."""
+        with self._lock:
+            for src in src_paths:
+                entry = self._entries.get(src)
+                if entry is not None and entry.pins > 0:
+                    entry.pins -= 1
+
+    def clear(self, force: bool = False) -> None:
+        """Remove every unpinned staged file, or every staged file if `force` is set."""
+        with self._lock:
+            for src, entry in list(self._entries.items()):
+                if force or (entry.pins == 0 and entry.ready.is_set()):
+                    del self._entries[src]
+                    self.used_bytes -= entry.size
+                    try:
+                        os.remove(entry.local_path)
+                    except OSError:
+                        pass
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        self.clear(force=True)
+        if self._owns_dir:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        logging.info(f"Staging cache: {self.hits} hits, {self.misses} misses")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,160 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import List
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, SecondaryCaptureImageStorage, generate_uid
+
+PHOTOMETRIC_INTERPRETATIONS = ('MONOCHROME1', 'MONOCHROME2')
+
+
+def synthetic_mammogram(rows: int = 3000, columns: int = 2400, bits_stored: int = 12, seed: int = 0) -> np.ndarray:
+    """
+    Returns a mammogram-like image: a bright half-ellipse (the breast) against one side of a dark,
+    noisy background, with a few denser blobs, as unsigned integers of `bits_stored` bits.
+    """
+    rng = np.random.default_rng(seed)
+    high = 2 ** bits_stored - 1
+    y, x = np.ogrid[:rows, :columns]
+    radius_y, radius_x = rows * rng.uniform(0.35, 0.45), columns * rng.uniform(0.6, 0.8)
+    distance = ((y - rows / 2) / radius_y) ** 2 + (x / radius_x) ** 2
+    image = np.where(distance < 1, 0.55 + 0.25 * np.sqrt(np.clip(1 - distance, 0, 1)), 0.05).astype(np.float32)
+    for _ in range(5):
+        center_y, center_x = rng.uniform(0.3, 0.7) * rows, rng.uniform(0.05, 0.5) * columns
+        size = rng.uniform(0.02, 0.06) * rows
+        image += 0.15 * np.exp(-((y - center_y) ** 2 + (x - center_x) ** 2) / (2 * size ** 2)).astype(np.float32)
+    image += rng.normal(0, 0.01, size=image.shape).astype(np.float32)
+    return np.clip(image * high, 0, high).astype(np.uint16)
+
+
+def write_dicom(path: str, pixels: np.ndarray, photometric: str = 'MONOCHROME2', bits_stored: int = 12) -> str:
+    """
+    Writes a single-frame, uncompressed DICOM file holding `pixels`, stored as unsigned 16 bit integers.
+
+    With 'MONOCHROME1', pixel values are written inverted, so that reading the file back with inversion
+    gives `pixels` again.
+    """
+    if photometric not in PHOTOMETRIC_INTERPRETATIONS:
+        raise ValueError(f"Unsupported photometric interpretation: {photometric}. Available: {list(PHOTOMETRIC_INTERPRETATIONS)}")
+    pixels = np.asarray(pixels).astype(np.uint16)
+    if photometric == 'MONOCHROME1':
+        pixels = (2 ** bits_stored - 1) - pixels
+
+    file_meta = FileMetaDataset()
+    file_meta.MediaStorageSOPClassUID = SecondaryCaptureImageStorage
+    file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = Dataset()
+    ds.file_meta = file_meta
+    ds.SOPClassUID = file_meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = file_meta.MediaStorageSOPInstanceUID
+    ds.Modality = 'MG'
+    ds.Rows, ds.Columns = pixels.shape
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = photometric
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, bits_stored, bits_stored - 1
+    ds.PixelRepresentation = 0
+    ds.PixelData = pixels.tobytes()
+    ds.save_as(str(path), enforce_file_format=True)
+    return str(path)
+
+
+def write_synthetic_dataset(output_dir: str, n_images: int, rows: int = 3000, columns: int = 2400,
+                            bits_stored: int = 12, photometric: str = 'MONOCHROME2', seed: int = 0) -> List[str]:
+    """Writes `n_images` synthetic mammograms as DICOM files into `output_dir` and returns their paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    return [
+        write_dicom(os.path.join(output_dir, f"synthetic_{i:05d}.dicom"),
+                    synthetic_mammogram(rows, columns, bits_stored, seed + i), photometric, bits_stored)
+        for i in range(n_images)
+    ]
+
+
+# Number of rows of the CBIS-DDSM csv files
+CBIS_SHAPES = {
+    'mass_case_description_train_set': 1318,
+    'mass_case_description_test_set': 378,
+    'calc_case_description_train_set': 1546,
+    'calc_case_description_test_set': 326,
+}
+
+
+def write_synthetic_cbis_csvs(data_dir: str, shapes: dict = None, unmatched: float = 0.01, seed: int = 0) -> None:
+    """
+    Writes CBIS-DDSM-like `metadata.csv` and case description csv files into `data_dir`, with the columns
+    and (by default) the number of rows of the real ones, see `CBIS_SHAPES`.
+
+    Each case description row references three series (full image, cropped image, ROI mask) listed in
+    `metadata.csv` under a Windows `File Location`; a fraction `unmatched` of the series is left out of
+    the metadata.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    shapes = CBIS_SHAPES if shapes is None else shapes
+    metadata = []
+    fields = [('image file path', 'full mammogram images', '000000.dcm'),
+              ('cropped image file path', 'cropped images', '000000.dcm'),
+              ('ROI mask file path', 'ROI mask images', '000001.dcm')]
+    for key, n_rows in shapes.items():
+        lesion, set_type = key.split('_')[0].capitalize(), 'Training' if '_train_' in key else 'Test'
+        rows = []
+        for i in range(n_rows):
+            case = f"{lesion}-{set_type}_P_{i:05d}_{rng.choice(['LEFT', 'RIGHT'])}_{rng.choice(['CC', 'MLO'])}"
+            row = {'patient_id': f"P_{i:05d}", 'breast_density': int(rng.integers(1, 5)),
+                   'left or right breast': case.split('_')[-2], 'image view': case.split('_')[-1],
+                   'abnormality id': 1, 'abnormality type': lesion.lower(),
+                   'pathology': rng.choice(['MALIGNANT', 'BENIGN', 'BENIGN_WITHOUT_CALLBACK']),
+                   'assessment': int(rng.integers(0, 6)), 'subtlety': int(rng.integers(1, 6))}
+            for column, description, filename in fields:
+                study_uid, series_uid = (f"1.3.6.1.4.1.9590.{key}.{i}.{column.split()[0]}.{part}" for part in ('study', 'series'))
+                row[column] = f"{case}/{study_uid}/{series_uid}/{filename}"
+                if rng.random() >= unmatched:
+                    metadata.append({'Series UID': series_uid, 'Subject ID': case, 'Study UID': study_uid,
+                                     'Series Description': description,
+                                     'File Location': f".\\CBIS-DDSM\\{case}\\{int(rng.integers(1, 13)):02d}-07-2016-DDSM-{i}"
+                                                      f"\\{int(rng.integers(1, 3))}.000000-{description}-{i}"})
+            rows.append(row)
+        pd.DataFrame(rows).to_csv(os.path.join(data_dir, f"{key}.csv"), index=False)
+    metadata = pd.DataFrame(metadata).sample(frac=1, random_state=seed)
+    metadata.to_csv(os.path.join(data_dir, 'metadata.csv'), index=False)
+
+
+VINDR_CATEGORIES = ['No Finding', 'Mass', 'Suspicious Calcification', 'Focal Asymmetry', 'Architectural Distortion',
+                    'Asymmetry', 'Suspicious Lymph Node', 'Skin Thickening', 'Global Asymmetry', 'Nipple Retraction']
+
+
+def _hex_id(kind: str, i: int) -> str:
+    return hashlib.md5(f"{kind}-{i}".encode()).hexdigest()
+
+
+def write_synthetic_vindr_annotations(data_dir: str, n_rows: int = 20486, duplicates: float = 0.1, seed: int = 0) -> str:
+    """
+    Writes a Vindr-Mammo-like `finding_annotations.csv` of `n_rows` rows into `data_dir` and returns its path.
+
+    Finding categories are list literals of one to three categories, and a fraction `duplicates` of the
+    rows repeats the image of the previous row, like images with several findings.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    n_categories = rng.choice([1, 2, 3], size=n_rows, p=[0.85, 0.12, 0.03])
+    weights = np.array([0.6, 0.15, 0.1] + [0.15 / (len(VINDR_CATEGORIES) - 3)] * (len(VINDR_CATEGORIES) - 3))
+    categories = [str([str(c) for c in rng.choice(VINDR_CATEGORIES, size=n, replace=False, p=weights)]) for n in n_categories]
+    image_ids = [_hex_id('image', i) for i in range(n_rows)]
+    for i in np.flatnonzero(rng.random(n_rows) < duplicates):
+        if i > 0:
+            image_ids[i] = image_ids[i - 1]
+    df = pd.DataFrame({
+        'study_id': [_hex_id('study', i // 4) for i in range(n_rows)],
+        'series_id': [_hex_id('series', i) for i in range(n_rows)],
+        'image_id': image_ids,
+        'laterality': rng.choice(['L', 'R'], size=n_rows),
+        'view_position': rng.choice(['CC', 'MLO'], size=n_rows),
+        'breast_birads': rng.choice([f"BI-RADS {i}" for i in range(1, 6)], size=n_rows),
+        'breast_density': rng.choice([f"DENSITY {c}" for c in 'ABCD'], size=n_rows),
+        'finding_categories': categories,
+        'split': rng.choice(['training', 'test'], size=n_rows, p=[0.8, 0.2]),
+    })
+    path = os.path.join(data_dir, 'finding_annotations.csv')
+    df.to_csv(path, index=False)
+    return path
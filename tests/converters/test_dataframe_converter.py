@@ -0,0 +1,142 @@
+import os
+import json
+import h5py
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+from functools import partial
+from src.core.registries import get_converter
+from src.processing.pipeline import BasePipeline
+from src.processing.operations.read import read_dicom
+from src.processing.operations.transform import resize
+from src.utils.synthetic import write_synthetic_dataset
+
+
+@pytest.fixture
+def dicom_paths(tmp_path):
+    return write_synthetic_dataset(str(tmp_path / "dicoms"), n_images=4, rows=64, columns=48)
+
+
+def small_pipeline():
+    pipeline = BasePipeline()
+    pipeline.add_operation(read_dicom)
+    pipeline.add_operation(partial(resize, new_size=16))
+    return pipeline
+
+# Loader-like DataFrames, with one row whose label or path is unknown
+DATAFRAMES = {
+    'vindr': lambda paths: pd.DataFrame({
+        'absolute_path': paths,
+        'breast_birads': ['1', '2', '0', '1'],
+        'finding_categories': ['0', '1', '1', '0'],
+    }),
+    'cbis': lambda paths: pd.DataFrame({
+        'absolute_path': paths,
+        'pathology': ['mass_MALIGNANT', 'calcification_BENIGN', 'mass_BENIGN', 'other_UNKNOWN'],
+    }),
+    'inbreast': lambda paths: pd.DataFrame({
+        'absolute_path': paths[:3] + [np.nan],
+        'Bi-rads': [1, '4c', 2.0, 5],
+        'Lesion annotation status': [1.0, 0.0, 1.0, 1.0],
+    }),
+}
+EXPECTED_LABELS = {
+    'vindr': {'y_birads': [1, 2, 0, 1], 'y_lesions': [0, 1, 1, 0]},
+    'cbis': {'y_pathology': [1, 2, 0]},
+    'inbreast': {'y_birads': [1, 0, 2], 'y_lesions': [1, 0, 1]},
+}
+
+# ---------------------------------------------------------------------
+# 1. Every dataset converts through the same column-spec converter
+# ---------------------------------------------------------------------
+@pytest.mark.parametrize("dataset_name", ["vindr", "cbis", "inbreast"])
+def test_dataframe_converter(tmp_path, dicom_paths, dataset_name):
+    converter = get_converter(dataset_name, small_pipeline(), 8, 2)
+    converter.run({'train': DATAFRAMES[dataset_name](dicom_paths)}, str(tmp_path / "out"))
+
+    with h5py.File(tmp_path / "out" / "train" / "batch_0000.h5") as f:
+        expected = EXPECTED_LABELS[dataset_name]
+        assert f['x'].shape == (len(next(iter(expected.values()))), 16, 16)
+        assert sorted(name for name in f if name != 'x') == sorted(expected)
+        for name, labels in expected.items():
+            np.testing.assert_array_equal(f[name][:], labels)
+            assert json.loads(f[name].attrs['label_mapping'])
+
+# ---------------------------------------------------------------------
+# 2. Images shared by several rows or splits are processed once
+# ---------------------------------------------------------------------
+@pytest.mark.parametrize("output_mode", ["batches", "split"])
+def test_shared_images_processed_once(tmp_path, dicom_paths, output_mode):
+    calls = []
+    def counted_read(path):
+        calls.append(path)
+        return read_dicom(path)
+
+    pipeline = BasePipeline()
+    pipeline.add_operation(counted_read)
+    pipeline.add_operation(partial(resize, new_size=16))
+    # One row per lesion: the first image has three, the second image two
+    paths = [dicom_paths[0], dicom_paths[1], dicom_paths[0], dicom_paths[2], dicom_paths[0], dicom_paths[1]]
+    test_df = pd.DataFrame({
+        'absolute_path': paths,
+        'pathology': ['mass_MALIGNANT', 'mass_BENIGN', 'calcification_BENIGN',
+                      'calcification_MALIGNANT', 'mass_BENIGN', 'calcification_BENIGN'],
+    })
+    converter = get_converter('cbis', pipeline, 2, 2, output_mode=output_mode)
+    converter.run({'val': test_df, 'test': test_df}, str(tmp_path / "out"))
+
+    assert sorted(calls) == sorted(dicom_paths[:3])
+    assert os.path.islink(tmp_path / "out" / "test" / ("batch_0000.h5" if output_mode == 'batches' else "test.h5"))
+    for split in ['val', 'test']:
+        filename = "batch_0000.h5" if output_mode == 'batches' else f"{split}.h5"
+        with h5py.File(tmp_path / "out" / split / filename) as f:
+            x, labels = f['x'][:], f['y_pathology'][:]
+        if output_mode == 'batches':
+            with h5py.File(tmp_path / "out" / split / "batch_0001.h5") as f:
+                x, labels = np.concatenate([x, f['x'][:]]), np.concatenate([labels, f['y_pathology'][:]])
+        # Group the rows by image: each image keeps the labels of all its rows
+        groups = {}
+        for image, label in zip(x, labels):
+            groups.setdefault(image.tobytes(), []).append(int(label))
+        assert sorted(sorted(group) for group in groups.values()) == [[0, 1, 2], [0, 2], [3]]
+
+# ---------------------------------------------------------------------
+# 3. Staged and unstaged runs share the operation cache of their source files
+# ---------------------------------------------------------------------
+def test_staged_run_shares_operation_cache(tmp_path, dicom_paths):
+    from src.processing.pipeline.cache import OperationCache
+    calls = []
+    def counted_read(path):
+        calls.append(path)
+        return read_dicom(path)
+
+    df = DATAFRAMES['vindr'](dicom_paths)
+    cache = OperationCache(str(tmp_path / "cache"))
+    for tmp_dir in (str(tmp_path / "staging"), None):
+        pipeline = BasePipeline()
+        pipeline.add_operation(counted_read)
+        pipeline.add_operation(partial(resize, new_size=16))
+        pipeline.enable_cache(cache, checkpoints=['counted_read'])
+        get_converter('vindr', pipeline, 8, 2, tmp_dir=tmp_dir).run({'train': df}, str(tmp_path / "out"))
+
+    # The staged run read every file, the unstaged run read none
+    assert len(calls) == len(dicom_paths)
+    assert all(path.startswith(str(tmp_path / "staging")) for path in calls)
+    assert cache.stats()['hits'] == len(dicom_paths)
+
+# ---------------------------------------------------------------------
+# 4. The dataset reads the label datasets of any spec
+# ---------------------------------------------------------------------
+def test_cbis_output_reads_back(tmp_path, dicom_paths):
+    from src.utils.dataset import HDF5ChunkedDataset
+    converter = get_converter('cbis', small_pipeline(), 2, 2)
+    converter.run({'train': DATAFRAMES['cbis'](dicom_paths)}, str(tmp_path / "out"))
+
+    dataset = HDF5ChunkedDataset(str(tmp_path / "out" / "train"))
+    samples = [dataset[i] for i in range(len(dataset))]
+    assert [sorted(labels) for _, labels in samples] == [['pathology']] * 3
+    assert sorted(int(labels['pathology']) for _, labels in samples) == sorted(EXPECTED_LABELS['cbis']['y_pathology'])
+    for (image, labels), (expected_image, expected_labels) in zip(dataset.__getitems__(list(range(3))), samples):
+        assert image.shape == (1, 16, 16) and torch.equal(image, expected_image)
+        assert labels == expected_labels
@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+from src.processing.pipeline import BasePipeline
+from src.core.converters.executors import get_executor_backend
+
+
+@pytest.fixture
+def sqrt_pipeline():
+    pipeline = BasePipeline()
+    pipeline.add_operation(np.asarray)
+    pipeline.add_operation(np.sqrt)
+    return pipeline
+
+# ---------------------------------------------------------------------
+# 1. Thread and process backends return identical results in input order
+# ---------------------------------------------------------------------
+@pytest.mark.parametrize("backend_name", ["thread", "process"])
+def test_backend_preserves_order(sqrt_pipeline, backend_name):
+    items = [np.full((8, 8), i ** 2, dtype=np.float32) for i in range(10)]
+    with get_executor_backend(backend_name, sqrt_pipeline, n_workers=2) as backend:
+        results = list(backend.imap(items))
+
+    assert [i for i, _, _ in results] == list(range(10))
+    for i, image, error in results:
+        assert error is None
+        assert image.dtype == np.float32
+        np.testing.assert_array_equal(image, np.full((8, 8), i, dtype=np.float32))
+    assert backend.peak_rss() > 0
+
+# ---------------------------------------------------------------------
+# 2. A failing item is reported in place without stopping the others
+# ---------------------------------------------------------------------
+@pytest.mark.parametrize("backend_name", ["thread", "process"])
+def test_backend_reports_errors(sqrt_pipeline, backend_name):
+    items = [4.0, "not a number", 16.0]
+    with get_executor_backend(backend_name, sqrt_pipeline, n_workers=2) as backend:
+        results = list(backend.imap(items))
+
+    assert results[0][1] == 2.0 and results[2][1] == 4.0
+    assert results[1][1] is None
+    assert isinstance(results[1][2], RuntimeError)
+
+# ---------------------------------------------------------------------
+# 3. Operation profiles of the workers are merged into the main pipeline
+# ---------------------------------------------------------------------
+@pytest.mark.parametrize("backend_name", ["thread", "process"])
+def test_backend_merges_profiles(sqrt_pipeline, backend_name):
+    sqrt_pipeline.enable_profiling()
+    items = [np.ones((8, 8), dtype=np.float32)] * 5
+    with get_executor_backend(backend_name, sqrt_pipeline, n_workers=2) as backend:
+        list(backend.imap(items))
+
+    stats = sqrt_pipeline.profiler.stats()
+    assert list(stats) == ['asarray', 'sqrt']
+    assert stats['sqrt']['calls'] == 5
+    assert stats['sqrt']['output_bytes']['max'] == 8 * 8 * 4
+
+
+def test_unknown_backend(sqrt_pipeline):
+    with pytest.raises(ValueError):
+        get_executor_backend("gpu", sqrt_pipeline)
@@ -0,0 +1,100 @@
+import os
+import h5py
+import numpy as np
+from src.processing.pipeline import BasePipeline
+from src.core.converters.base import BaseConverter
+from src.processing.operations.markers import batchable, fixed_shape
+
+
+class CountingPipeline(BasePipeline):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self.operations = [self.load]
+
+    def load(self, value):
+        self.calls.append(value)
+        return np.full((4, 4), value, dtype=np.float32)
+
+
+class ArrayConverter(BaseConverter):
+    def write(self, filename, batch_images, labels):
+        with h5py.File(filename, 'w') as f:
+            f.create_dataset('x', data=np.array(batch_images))
+            f.create_dataset('y', data=np.array(labels))
+
+    def run(self, values, output_dir):
+        try:
+            self._process_batch(values, output_dir, [v * 10 for v in values])
+        finally:
+            self.close()
+
+
+def convert(tmp_path, values, resume):
+    pipeline = CountingPipeline()
+    ArrayConverter(pipeline, batch_size=2, n_workers=2, resume=resume).run(values, str(tmp_path))
+    return pipeline.calls
+
+# ---------------------------------------------------------------------
+# 1. A resumed run only redoes missing or corrupted batches
+# ---------------------------------------------------------------------
+def test_resume_skips_completed_batches(tmp_path):
+    values = list(range(6))
+    assert sorted(convert(tmp_path, values, resume=False)) == values
+    assert os.path.exists(tmp_path / "manifest.json")
+
+    os.remove(tmp_path / "batch_0001.h5")
+    with open(tmp_path / "batch_0002.h5", 'r+b') as f:
+        f.seek(-8, os.SEEK_END)
+        f.write(b'\x00' * 8)
+
+    assert sorted(convert(tmp_path, values, resume=True)) == [2, 3, 4, 5]
+    assert convert(tmp_path, values, resume=True) == []
+    with h5py.File(tmp_path / "batch_0002.h5") as f:
+        np.testing.assert_array_equal(f['y'][:], [40, 50])
+
+# ---------------------------------------------------------------------
+# 2. Batches built from other inputs or settings are redone
+# ---------------------------------------------------------------------
+def test_resume_checks_inputs_and_fingerprint(tmp_path):
+    convert(tmp_path, [0, 1, 2, 3], resume=False)
+    assert sorted(convert(tmp_path, [0, 1, 2, 9], resume=True)) == [2, 9]
+
+    pipeline = CountingPipeline()
+    pipeline.add_operation(np.sqrt)
+    ArrayConverter(pipeline, batch_size=2, resume=True).run([0, 1, 2, 9], str(tmp_path))
+    assert sorted(pipeline.calls) == [0, 1, 2, 9]
+
+# ---------------------------------------------------------------------
+# 3. Without --resume everything is converted again
+# ---------------------------------------------------------------------
+def test_no_resume_reconverts(tmp_path):
+    convert(tmp_path, [0, 1, 2], resume=False)
+    assert sorted(convert(tmp_path, [0, 1, 2], resume=False)) == [0, 1, 2]
+
+# ---------------------------------------------------------------------
+# 4. Fixed-shape images are stacked, and the batchable tail runs once per batch
+# ---------------------------------------------------------------------
+class StackingPipeline(CountingPipeline):
+    def __init__(self):
+        super().__init__()
+        self.operations = [self.load, fixed_shape(np.ravel), batchable(np.sqrt)]
+
+
+class StackConverter(ArrayConverter):
+    def write(self, filename, batch_images, labels):
+        assert isinstance(batch_images, np.ndarray)
+        super().write(filename, batch_images, labels)
+
+
+def test_batched_tail_on_stacked_images(tmp_path):
+    pipeline = StackingPipeline()
+    converter = StackConverter(pipeline, batch_size=3, n_workers=2, storage_dtype='uint8', value_range=(0, 2))
+    assert converter.stack_start == 2
+    converter.run([0, 'missing', 1, 4], str(tmp_path))
+    with h5py.File(tmp_path / "batch_0000.h5") as f:
+        assert f['x'].dtype == np.uint8
+        np.testing.assert_array_equal(f['x'][:], np.repeat([[0], [127]], 16, axis=1))
+        np.testing.assert_array_equal(f['y'][:], [0, 10])
+    with h5py.File(tmp_path / "batch_0001.h5") as f:
+        np.testing.assert_array_equal(f['x'][:], np.full((1, 16), 255))
@@ -0,0 +1,61 @@
+import threading
+import time
+import pytest
+from src.core.converters.stages import Stage, run_stages
+
+# ---------------------------------------------------------------------
+# 1. Items flow through every stage in order
+# ---------------------------------------------------------------------
+def test_run_stages_order():
+    written = []
+    timings = run_stages(range(20), [
+        Stage('double', lambda x: 2 * x),
+        Stage('increment', lambda x: x + 1, queue_depth=3),
+        Stage('write', written.append),
+    ])
+    assert written == [2 * x + 1 for x in range(20)]
+    assert set(timings) == {'double', 'increment', 'write', 'wall'}
+
+# ---------------------------------------------------------------------
+# 2. Stages overlap: wall time approaches the slowest stage, not the sum
+# ---------------------------------------------------------------------
+def test_run_stages_overlap():
+    def sleepy(x):
+        time.sleep(0.05)
+        return x
+
+    timings = run_stages(range(8), [Stage('a', sleepy), Stage('b', sleepy), Stage('c', sleepy)])
+    assert timings['wall'] < 0.8 * (timings['a'] + timings['b'] + timings['c'])
+
+# ---------------------------------------------------------------------
+# 3. Bounded queues: a fast producer never runs far ahead of the consumer
+# ---------------------------------------------------------------------
+def test_run_stages_bounded():
+    produced, lag = [], []
+    lock = threading.Lock()
+
+    def produce(x):
+        with lock:
+            produced.append(x)
+        return x
+
+    def consume(x):
+        time.sleep(0.01)
+        with lock:
+            lag.append(len(produced) - x)
+
+    run_stages(range(30), [Stage('produce', produce, queue_depth=2), Stage('consume', consume)])
+    # queued items + the one being handed over + the one being consumed
+    assert max(lag) <= 2 + 2
+
+# ---------------------------------------------------------------------
+# 4. An error in any stage stops the pipeline and is re-raised
+# ---------------------------------------------------------------------
+def test_run_stages_error():
+    def fail(x):
+        if x == 3:
+            raise RuntimeError("boom")
+        return x
+
+    with pytest.raises(RuntimeError, match="boom"):
+        run_stages(range(100), [Stage('fail', fail), Stage('sink', lambda x: None)])
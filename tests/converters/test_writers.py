@@ -0,0 +1,152 @@
+import io
+import json
+import tarfile
+import h5py
+import numpy as np
+import pandas as pd
+from src.processing.pipeline import BasePipeline
+from src.core.converters.base import BaseConverter
+from src.core.converters.writers import NpySplitWriter, TarShardWriter
+
+
+def fail_on_negative(value):
+    if value < 0:
+        raise ValueError("negative input")
+    return np.full((3, 5), value, dtype=np.float32)
+
+
+class SplitConverter(BaseConverter):
+    def __init__(self, **kwargs):
+        pipeline = BasePipeline()
+        pipeline.add_operation(fail_on_negative)
+        kwargs.setdefault('output_mode', 'split')
+        super().__init__(pipeline, batch_size=3, n_workers=2, **kwargs)
+
+    def write(self, filename, batch_images, *labels):
+        raise AssertionError("split mode never writes whole batches")
+
+    def label_datasets(self, n_labels):
+        return {'y_value': {'meaning': 'value * 10'}}
+
+    def run(self, values, output_dir):
+        try:
+            self._process_batch(values, output_dir, [v * 10 for v in values])
+        finally:
+            self.close()
+
+# ---------------------------------------------------------------------
+# 1. Split mode writes every image to one file, in input order
+# ---------------------------------------------------------------------
+def test_split_mode_single_file(tmp_path):
+    values = [0, 1, -1, 3, 4, 5, 6]
+    SplitConverter().run(values, str(tmp_path / "train"))
+
+    assert sorted(p.name for p in (tmp_path / "train").iterdir()) == ["manifest.json", "train.h5"]
+    with h5py.File(tmp_path / "train" / "train.h5") as f:
+        assert f['x'].shape == (6, 3, 5)
+        assert f['x'].chunks == (1, 3, 5)
+        np.testing.assert_array_equal(f['x'][:, 0, 0], [0, 1, 3, 4, 5, 6])
+        np.testing.assert_array_equal(f['y_value'][:], [0, 10, 30, 40, 50, 60])
+        assert 'label_mapping' in f['y_value'].attrs
+
+# ---------------------------------------------------------------------
+# 2. A resumed run keeps intact leading chunks and rewrites the rest
+# ---------------------------------------------------------------------
+def test_split_mode_resume(tmp_path):
+    values = list(range(9))
+    SplitConverter().run(values, str(tmp_path))
+
+    with h5py.File(tmp_path / f"{tmp_path.name}.h5", 'a') as f:
+        f['x'][4] = -1  # corrupt the second chunk
+    SplitConverter(resume=True).run(values, str(tmp_path))
+
+    with h5py.File(tmp_path / f"{tmp_path.name}.h5") as f:
+        assert f['x'].shape[0] == 9
+        np.testing.assert_array_equal(f['x'][:, 0, 0], values)
+        np.testing.assert_array_equal(f['y_value'][:], [v * 10 for v in values])
+
+# ---------------------------------------------------------------------
+# 3. npy mode writes trimmed memory-mappable arrays and resumes likewise
+# ---------------------------------------------------------------------
+def test_npy_mode(tmp_path):
+    values = [0, 1, -1, 3, 4, 5, 6]
+    SplitConverter(output_mode='npy', storage_dtype='uint8', value_range=(0, 255)).run(values, str(tmp_path))
+
+    x = np.load(tmp_path / "x.npy", mmap_mode='r')
+    assert x.shape == (6, 3, 5) and x.dtype == np.uint8
+    np.testing.assert_array_equal(x[:, 0, 0], [0, 1, 3, 4, 5, 6])
+    np.testing.assert_array_equal(np.load(tmp_path / "y_value.npy"), [0, 10, 30, 40, 50, 60])
+    header = json.loads((tmp_path / "header.json").read_text())
+    assert header['n_rows'] == 6
+    assert header['x']['storage_dtype'] == 'uint8'
+    assert header['labels']['y_value']['label_mapping'] == {'meaning': 'value * 10'}
+    del x
+
+    x = np.load(tmp_path / "x.npy", mmap_mode='r+')
+    x[4] = 99  # corrupt the second chunk
+    del x
+    SplitConverter(output_mode='npy', storage_dtype='uint8', value_range=(0, 255), resume=True).run(values, str(tmp_path))
+    np.testing.assert_array_equal(np.load(tmp_path / "x.npy")[:, 0, 0], [0, 1, 3, 4, 5, 6])
+
+def test_npy_mode_resume_without_arrays(tmp_path):
+    # Header flushed before any image was written
+    NpySplitWriter(str(tmp_path), {'y_value': {}}).close()
+    assert (tmp_path / "header.json").exists() and not (tmp_path / "x.npy").exists()
+
+    values = [0, 1, 2, 3]
+    SplitConverter(output_mode='npy', resume=True).run(values, str(tmp_path))
+    np.testing.assert_array_equal(np.load(tmp_path / "x.npy")[:, 0, 0], values)
+    np.testing.assert_array_equal(np.load(tmp_path / "y_value.npy"), [v * 10 for v in values])
+
+# ---------------------------------------------------------------------
+# 4. tar mode writes fixed-size shards and resumes within a shard
+# ---------------------------------------------------------------------
+def test_tar_mode(tmp_path):
+    values = list(range(10))
+    SplitConverter(output_mode='tar', shard_size=4).run(values, str(tmp_path))
+
+    index = json.loads((tmp_path / "shards.json").read_text())
+    assert index['n_rows'] == 10
+    assert [shard['n_samples'] for shard in index['shards']] == [4, 4, 2]
+    with tarfile.open(tmp_path / "shard-00001.tar") as tar:
+        assert tar.getnames() == [f"{row:09d}.{ext}" for row in range(4, 8) for ext in ("npy", "json")]
+        assert json.load(tar.extractfile("000000005.json")) == {'y_value': 50}
+
+    # Corrupt the last chunk (rows 6 to 8), which starts in the middle of the second shard
+    with tarfile.open(tmp_path / "shard-00002.tar", 'w') as tar:
+        pass
+    SplitConverter(output_mode='tar', shard_size=4, resume=True).run(values, str(tmp_path))
+
+    index = json.loads((tmp_path / "shards.json").read_text())
+    assert [shard['n_samples'] for shard in index['shards']] == [4, 4, 2]
+    with tarfile.open(tmp_path / "shard-00002.tar") as tar:
+        assert tar.getnames() == ["000000008.npy", "000000008.json", "000000009.npy", "000000009.json"]
+        np.testing.assert_array_equal(np.load(io.BytesIO(tar.extractfile("000000009.npy").read())), fail_on_negative(9))
+
+def test_tar_resume_reads_shards_once(tmp_path, monkeypatch):
+    values = list(range(12))
+    SplitConverter(output_mode='tar', shard_size=2).run(values, str(tmp_path))
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    entries = [entry for entry in manifest['entries'].values() if 'rows' in entry]
+
+    opened = []
+    original = tarfile.open
+    monkeypatch.setattr(tarfile, 'open', lambda *args, **kwargs: opened.append(args[0]) or original(*args, **kwargs))
+    writer = TarShardWriter(str(tmp_path), {'y_value': {}}, shard_size=2)
+    assert len(opened) == 6
+    for entry in entries:
+        assert writer.rows_checksum(*entry['rows']) == entry['checksum']
+    assert len(opened) == 6
+
+# ---------------------------------------------------------------------
+# 5. A header index drops unreadable inputs and orders the others
+# ---------------------------------------------------------------------
+def test_dicom_index_schedule(tmp_path):
+    values = [1, 2, 3, 4]
+    index = pd.DataFrame({'path': ['1', '2', '3', '4'], 'rows': [1, 3, 2, None], 'columns': [1, 1, 1, None],
+                          'transfer_syntax': [''] * 4, 'error': [None, None, None, 'InvalidDicomError']})
+    SplitConverter(dicom_index=index, schedule='size').run(values, str(tmp_path))
+
+    with h5py.File(tmp_path / f"{tmp_path.name}.h5") as f:
+        np.testing.assert_array_equal(f['x'][:, 0, 0], [2, 3, 1])
+        np.testing.assert_array_equal(f['y_value'][:], [20, 30, 10])
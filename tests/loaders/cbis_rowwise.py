@@ -0,0 +1,14 @@
+import pandas as pd
+from src.core.df_loaders.cbis import CBISDataframeLoader, PATH_FIELDS
+
+
+def correct_paths_iterrows(loader: CBISDataframeLoader, df: pd.DataFrame, metadata_df: pd.DataFrame) -> pd.DataFrame:
+    """Former row by row implementation of `CBISDataframeLoader.correct_paths`, scanning `metadata.csv` for each path."""
+    for idx, row in df.iterrows():
+        for field in PATH_FIELDS:
+            study_id, series_uid = loader.get_image_path_ids(row, field)
+            meta = metadata_df[(metadata_df['Series UID'] == series_uid) & (metadata_df['Study UID'] == study_id)]
+            if not meta.empty:
+                df.at[idx, field] = loader.normalize_and_format_path(meta['File Location'].values[0])
+    return df
+
@@ -0,0 +1,67 @@
+import os
+import pandas as pd
+import pytest
+from src.core.df_loaders import VindrDataframeLoader, CBISDataframeLoader, INBreastDataframeLoader
+from src.core.df_loaders.cbis import LESION_FILES
+from src.utils.synthetic import write_synthetic_vindr_annotations, write_synthetic_cbis_csvs
+
+
+def load_without_parsing(loader):
+    def fail():
+        raise AssertionError("sources parsed again")
+    loader._load = fail
+    return loader.load()
+
+
+def assert_same(result, expected):
+    assert list(result) == list(expected)
+    for key in expected:
+        pd.testing.assert_frame_equal(result[key], expected[key])
+
+# ---------------------------------------------------------------------
+# 1. Reloading gives the same DataFrames without parsing the sources
+# ---------------------------------------------------------------------
+def test_cached_load_vindr(tmp_path):
+    write_synthetic_vindr_annotations(str(tmp_path / "vindr"), n_rows=200)
+    cache_dir = str(tmp_path / "cache")
+    expected = VindrDataframeLoader(str(tmp_path / "vindr")).load()
+
+    assert_same(VindrDataframeLoader(str(tmp_path / "vindr"), cache_dir=cache_dir).load(), expected)
+    assert_same(load_without_parsing(VindrDataframeLoader(str(tmp_path / "vindr"), cache_dir=cache_dir)), expected)
+
+    # Other parameters or sources miss the cache
+    mapping = {'no_finding': '1', 'mass': '0'}
+    with pytest.raises(AssertionError, match="parsed again"):
+        load_without_parsing(VindrDataframeLoader(str(tmp_path / "vindr"), lesions_mapping=mapping, cache_dir=cache_dir))
+    write_synthetic_vindr_annotations(str(tmp_path / "vindr"), n_rows=200, seed=1)
+    with pytest.raises(AssertionError, match="parsed again"):
+        load_without_parsing(VindrDataframeLoader(str(tmp_path / "vindr"), cache_dir=cache_dir))
+
+
+def test_cached_load_cbis(tmp_path):
+    write_synthetic_cbis_csvs(str(tmp_path), {key: 10 for key in LESION_FILES})
+    cache_dir = str(tmp_path / "cache")
+    expected = CBISDataframeLoader(str(tmp_path)).load()
+    CBISDataframeLoader(str(tmp_path), cache_dir=cache_dir).load()
+
+    result = load_without_parsing(CBISDataframeLoader(str(tmp_path), cache_dir=cache_dir))
+    assert_same(result, expected)
+    assert result['val'] is result['test']
+
+# ---------------------------------------------------------------------
+# 2. The INbreast split is seeded, so cached and fresh splits agree
+# ---------------------------------------------------------------------
+def test_cached_load_inbreast(tmp_path):
+    pd.DataFrame({
+        'Bi-rads': [1, 2, 3, 4, 5, 2, 3, 1, 2, 4, None, None],
+        'Lesion annotation status': [1, None, 2, 1, None, 1, 1, None, 2, 1, None, None],
+        'File name': [f"{i:08d}" for i in range(12)],
+    }).to_excel(tmp_path / "INbreast.xls", index=False)
+    cache_dir = str(tmp_path / "cache")
+
+    expected = INBreastDataframeLoader(str(tmp_path)).load()
+    assert_same(INBreastDataframeLoader(str(tmp_path)).load(), expected)
+    INBreastDataframeLoader(str(tmp_path), cache_dir=cache_dir).load()
+    assert_same(load_without_parsing(INBreastDataframeLoader(str(tmp_path), cache_dir=cache_dir)), expected)
+    other_seed = INBreastDataframeLoader(str(tmp_path), seed=1).load()
+    assert sorted(other_seed['train'].index) != sorted(expected['train'].index)
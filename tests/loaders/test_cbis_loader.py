@@ -0,0 +1,56 @@
+import os
+import pandas as pd
+import pytest
+from src.core.df_loaders import CBISDataframeLoader
+from src.core.df_loaders.cbis import LESION_FILES
+from src.utils.synthetic import write_synthetic_cbis_csvs
+from tests.loaders.cbis_rowwise import correct_paths_iterrows
+
+SHAPES = {key: 20 for key in LESION_FILES}
+
+
+@pytest.fixture
+def cbis_dir(tmp_path):
+    write_synthetic_cbis_csvs(str(tmp_path), SHAPES, unmatched=0.2)
+    return tmp_path
+
+# ---------------------------------------------------------------------
+# 1. The indexed correction matches the former row by row one
+# ---------------------------------------------------------------------
+def test_cbis_correct_paths_matches_iterrows(cbis_dir):
+    loader = CBISDataframeLoader(str(cbis_dir))
+    metadata_df = pd.read_csv(cbis_dir / "metadata.csv")
+    # Duplicated series: the first row wins
+    metadata_df = pd.concat([metadata_df, metadata_df.assign(**{'File Location': 'other'})], ignore_index=True)
+    df = pd.read_csv(cbis_dir / "mass_case_description_train_set_corrected.csv")
+    raw = pd.read_csv(cbis_dir / "mass_case_description_train_set.csv")
+    df[['image_file_path', 'cropped_image_file_path', 'roi_mask_file_path']] = \
+        raw[['image file path', 'cropped image file path', 'ROI mask file path']].to_numpy()
+
+    expected = correct_paths_iterrows(loader, df.copy(), metadata_df)
+    corrected = loader.correct_paths(df.copy(), loader.metadata_locations(metadata_df))
+    pd.testing.assert_frame_equal(corrected, expected)
+    assert corrected['image_file_path'].str.startswith('CBIS-DDSM/').any()
+    assert not corrected['image_file_path'].str.startswith('CBIS-DDSM/').all()
+
+# ---------------------------------------------------------------------
+# 2. Corrected files are only regenerated when the source files change
+# ---------------------------------------------------------------------
+def test_cbis_corrected_files_regenerated_on_change(cbis_dir):
+    corrected = cbis_dir / "calc_case_description_test_set_corrected.csv"
+    CBISDataframeLoader(str(cbis_dir))
+    os.utime(corrected, ns=(0, 0))
+
+    CBISDataframeLoader(str(cbis_dir))
+    assert os.stat(corrected).st_mtime_ns == 0
+
+    metadata = pd.read_csv(cbis_dir / "metadata.csv")
+    metadata.iloc[1:].to_csv(cbis_dir / "metadata.csv", index=False)
+    loader = CBISDataframeLoader(str(cbis_dir))
+    assert os.stat(corrected).st_mtime_ns != 0
+
+    dataframes = loader.load()
+    assert len(dataframes['train']) == 40 and len(dataframes['test']) == 40
+    paths = dataframes['train']['absolute_path']
+    assert paths.str.startswith(str(cbis_dir)).all()
+    assert paths.str.endswith(('/1-1.dcm', '000000.dcm')).all()
@@ -1,5 +1,7 @@
 import pytest
+import pandas as pd
 from src.core.df_loaders import VindrDataframeLoader
+from tests.loaders.vindr_rowwise import load_rowwise
 
 
 
@@ -28,4 +30,28 @@ def test_vindr_loader_valid(fake_good_finding_annotations):
 def test_vindr_loader_missing_file(tmp_path):
     loader = VindrDataframeLoader(str(tmp_path))
     with pytest.raises(Exception):
-        loader.load()
\ No newline at end of file
+        loader.load()
+
+# ---------------------------------------------------------------------
+# 3. The vectorized `.load()` gives the same DataFrames as the row by row one
+# ---------------------------------------------------------------------
+def test_vindr_loader_matches_rowwise(tmp_path):
+    from src.utils.synthetic import write_synthetic_vindr_annotations
+    path = write_synthetic_vindr_annotations(str(tmp_path), n_rows=500, duplicates=0.2)
+    df = pd.read_csv(path)
+    # Literals the vectorized parser leaves to ast.literal_eval, and unusual spacing
+    df.loc[0, 'finding_categories'] = '["Mass", "No Finding"]'
+    df.loc[1, 'finding_categories'] = "[ 'Suspicious Calcification' ,'No Finding' ]"
+    df.loc[2, 'finding_categories'] = "[]"
+    df.loc[3, 'finding_categories'] = "'Mass'"
+    df.loc[4, 'finding_categories'] = "['Mass',]"
+    df.loc[5, 'finding_categories'] = "['No, Finding', 'Mass']"
+    df.loc[6, 'breast_birads'] = "BI-RADS  2"
+    df.to_csv(path, index=False)
+
+    loader = VindrDataframeLoader(str(tmp_path))
+    expected, result = load_rowwise(loader), loader.load()
+    assert list(result) == list(expected)
+    for key in expected:
+        pd.testing.assert_frame_equal(result[key], expected[key])
+    assert set(expected['train']['finding_categories']) == {'0', '1'}
@@ -0,0 +1,36 @@
+import os
+import ast
+import warnings
+import pandas as pd
+from typing import Dict
+from src.core.df_loaders import VindrDataframeLoader
+from src.utils.errors import check_file_exists, check_required_columns, check_non_empty_df
+
+
+def load_rowwise(loader: VindrDataframeLoader) -> Dict[str, pd.DataFrame]:
+    """Former row by row implementation of `VindrDataframeLoader.load`."""
+    filepath = os.path.join(loader.data_dir, 'finding_annotations.csv')
+    check_file_exists(filepath)
+    df_find = pd.read_csv(filepath)
+    check_required_columns(df_find, {'study_id', 'image_id', 'finding_categories', 'breast_birads', 'split'})
+
+    df_find['finding_categories'] = df_find['finding_categories'].apply(ast.literal_eval)
+    df_find['finding_categories'] = df_find['finding_categories'].apply(loader.format_category_list)
+    df_find['breast_birads'] = df_find['breast_birads'].apply(loader.format_char)
+    df_find['breast_birads'] = df_find['breast_birads'].replace(loader.birads_mapping)
+    df_find.drop_duplicates(subset='image_id', keep=False, inplace=True)
+
+    target_categories = ['mass', 'no_finding']
+    loader.replace_categories(df_find, 'finding_categories', target_categories)
+    df_find = df_find[df_find['finding_categories'].isin(target_categories)]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        df_find['finding_categories'] = df_find['finding_categories'].replace(loader.lesions_mapping)
+        df_find['absolute_path'] = df_find.apply(loader._construct_image_path, axis=1)
+
+    train_df = df_find[df_find['split'] == 'training']
+    test_df = df_find[df_find['split'] == 'test']
+    check_non_empty_df(train_df, "Training Dataframe")
+    check_non_empty_df(test_df, "Test DatDataframe")
+    return {'train': train_df, 'val': test_df}
+
@@ -0,0 +1,48 @@
+import os
+import cv2
+import numpy as np
+import pytest
+from glob import glob
+from src.processing.augmentations.balanced import BalancedAugmentor
+from src.processing.augmentations.classwise import ClasswiseAugmentor
+
+
+@pytest.fixture
+def png_dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    for cls, n_images in [('0', 4), ('1', 2), ('2', 1)]:
+        os.makedirs(tmp_path / cls)
+        for i in range(n_images):
+            cv2.imwrite(str(tmp_path / cls / f"{i}.png"), rng.integers(0, 255, (24, 24, 3), dtype=np.uint8))
+    return tmp_path
+
+
+def augmented(data_dir):
+    return {os.path.relpath(path, data_dir): cv2.imread(path) for path in sorted(glob(os.path.join(data_dir, '*', 'aug_*.png')))}
+
+# ---------------------------------------------------------------------
+# 1. Augmentations only depend on the seed, not on the workers
+# ---------------------------------------------------------------------
+def test_augmentation_is_reproducible(png_dataset):
+    stats = ClasswiseAugmentor(str(png_dataset), 3, ['1', '2'], n_workers=2, executor='process', seed=1).run()
+    assert stats['images'] == 3 and stats['augmented'] == 9 and stats['augmented_per_sec'] > 0
+    first = augmented(png_dataset)
+    assert len(first) == 9
+
+    # Rerunning, in threads this time, rewrites the same images and does not augment augmentations
+    ClasswiseAugmentor(str(png_dataset), 3, ['1', '2'], n_workers=3, executor='thread', seed=1).run()
+    second = augmented(png_dataset)
+    assert second.keys() == first.keys()
+    assert all(np.array_equal(first[name], second[name]) for name in first)
+
+    ClasswiseAugmentor(str(png_dataset), 3, ['1', '2'], n_workers=1, executor='thread', seed=2).run()
+    assert not all(np.array_equal(first[name], image) for name, image in augmented(png_dataset).items())
+
+# ---------------------------------------------------------------------
+# 2. Balanced augmentation over-samples the smaller classes
+# ---------------------------------------------------------------------
+def test_balanced_augmentor(png_dataset):
+    stats = BalancedAugmentor(str(png_dataset), [0] * 4 + [1] * 2 + [2], n_workers=2, executor='thread').run()
+    assert stats['augmented'] == 2 * 2 + 1 * 4
+    assert len(glob(str(png_dataset / '0' / 'aug_*.png'))) == 0
+    assert len(glob(str(png_dataset / '2' / 'aug_*.png'))) == 4
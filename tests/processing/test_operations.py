@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from src.processing.pipeline import BreastImageProcessingPipeline
+from src.processing.operations.normalize import minmax_normalisation, lean_to_float
+from src.processing.operations.read import read_dicom
+from src.processing.operations.transform import roi_box, box_iou
+from src.utils.synthetic import synthetic_mammogram, write_dicom
+
+
+@pytest.fixture
+def mammogram(tmp_path):
+    return write_dicom(tmp_path / "mammogram.dcm", synthetic_mammogram(600, 450, bits_stored=12, seed=1))
+
+
+def test_minmax_normalisation_leaves_input_untouched():
+    image = np.array([[2.0, 4.0], [6.0, 10.0]], dtype=np.float32)
+    normalized = minmax_normalisation(image)
+    np.testing.assert_allclose(normalized, [[0, 63.75], [127.5, 255]])
+    np.testing.assert_array_equal(image, [[2, 4], [6, 10]])
+
+
+def test_lean_minmax_is_in_place_uint16():
+    image = np.array([[100, 200], [300, 500]], dtype=np.uint16)
+    normalized = minmax_normalisation(image, lean=True)
+    assert normalized is image or np.shares_memory(normalized, image)
+    np.testing.assert_allclose(lean_to_float(normalized), [[0, 63.75], [127.5, 255]], atol=0.01)
+
+
+def test_lean_pipeline_matches_default(mammogram):
+    assert read_dicom(mammogram, lean=True).dtype == np.uint16
+
+    default = BreastImageProcessingPipeline().process(mammogram)
+    lean = BreastImageProcessingPipeline(lean=True).process(mammogram)
+
+    assert lean.dtype == default.dtype == np.float32
+    assert lean.shape == default.shape
+    np.testing.assert_allclose(lean, default, atol=0.05)
+
+
+def test_box_iou():
+    assert box_iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert box_iou((0, 0, 10, 10), (5, 0, 10, 10)) == pytest.approx(50 / 150)
+    assert box_iou((0, 0, 10, 10), (20, 20, 5, 5)) == 0.0
+
+
+@pytest.mark.parametrize("lean", [False, True])
+def test_proxy_roi_box_contains_full_resolution_box(lean):
+    image = synthetic_mammogram(1200, 900, seed=2)
+    image = minmax_normalisation(image if lean else image.astype(np.float32), lean=lean)
+
+    reference = roi_box(image, lean=lean)
+    x, y, w, h = roi_box(image, lean=lean, proxy_scale=1 / 8)
+
+    rx, ry, rw, rh = reference
+    assert x <= rx and y <= ry and x + w >= rx + rw and y + h >= ry + rh
+    assert box_iou((x, y, w, h), reference) > 0.9
+    with pytest.raises(ValueError):
+        roi_box(image, proxy_scale=2)
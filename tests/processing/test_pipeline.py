@@ -1,6 +1,11 @@
+import os
+import json
 import pytest
 import numpy as np
 from src.processing.pipeline import BasePipeline
+from src.processing.pipeline.cache import OperationCache
+from src.processing.pipeline.profiling import OperationProfiler
+from src.processing.operations.markers import batchable, fixed_shape
 
 def test_add_valid_operation():
     pipeline = BasePipeline()
@@ -52,3 +57,122 @@ def test_add_valid_operation():
 
 #     output = pipeline.process(input_img)
 #     assert np.array_equal(output, expected)
+
+
+def write_input(tmp_path, value=1.0):
+    path = tmp_path / "input.npy"
+    np.save(path, np.full((4, 4), value, dtype=np.float32))
+    return str(path)
+
+
+def counting(operation, calls):
+    def wrapped(image):
+        calls.append(operation.__name__)
+        return operation(image)
+    wrapped.__name__ = wrapped.__qualname__ = operation.__name__
+    return wrapped
+
+
+def test_cache_resumes_from_longest_prefix(tmp_path):
+    calls = []
+    pipeline = BasePipeline()
+    for operation in (np.load, np.sqrt, np.negative):
+        pipeline.add_operation(counting(operation, calls))
+    pipeline.enable_cache(OperationCache(str(tmp_path / "cache")), checkpoints=[0, 'sqrt'])
+    path = write_input(tmp_path, 4.0)
+
+    first = pipeline.process(path)
+    assert calls == ['load', 'sqrt', 'negative']
+    assert pipeline.cache.stats()['misses'] == 1
+
+    calls.clear()
+    second = pipeline.process(path)
+    assert calls == ['negative']
+    np.testing.assert_array_equal(first, second)
+    assert pipeline.cache.stats()['hits'] == 1
+
+    # Changing the tail keeps the cached prefix, changing the prefix misses
+    pipeline.operations[2] = counting(np.exp, calls)
+    calls.clear()
+    pipeline.process(path)
+    assert calls == ['exp']
+
+    pipeline.operations[1] = counting(np.square, calls)
+    pipeline.cache_checkpoints = [0, 1]
+    calls.clear()
+    pipeline.process(path)
+    assert calls == ['square', 'exp']
+
+
+def test_cache_invalidated_by_input_change(tmp_path):
+    pipeline = BasePipeline()
+    pipeline.add_operation(np.load)
+    pipeline.enable_cache(OperationCache(str(tmp_path / "cache")))
+    path = write_input(tmp_path, 1.0)
+    pipeline.process(path)
+
+    path = write_input(tmp_path, 2.0)
+    os.utime(path, ns=(0, 0))
+    np.testing.assert_array_equal(pipeline.process(path), np.full((4, 4), 2.0))
+
+
+def test_cache_eviction(tmp_path):
+    cache = OperationCache(str(tmp_path / "cache"), max_bytes=1000)
+    for i in range(10):
+        cache.put(OperationCache.key(('input', i), 'fingerprint'), np.zeros(40, dtype=np.float32))
+
+    assert cache.size() <= 1000
+    assert cache.stats()['evictions'] > 0
+    assert cache.get(OperationCache.key(('input', 9), 'fingerprint')) is not None
+
+
+@fixed_shape
+def to_square(image):
+    return np.resize(image, (4, 4)).astype(np.float32)
+
+
+def test_process_batch_matches_process():
+    calls = []
+
+    @batchable
+    def scale(images):
+        calls.append(images.shape)
+        return images / 2
+
+    pipeline = BasePipeline()
+    for operation in (np.sqrt, to_square, scale, np.fliplr):
+        pipeline.add_operation(operation)
+    images = [np.arange(n, dtype=np.float32) for n in (3, 16, 20)]
+
+    assert pipeline.batch_start() == 2
+    batch = pipeline.process_batch(images)
+    calls.clear()
+    expected = np.stack([pipeline.process(image) for image in images])
+    np.testing.assert_array_equal(batch, expected)
+    # Per image calls only
+    assert calls == [(4, 4)] * 3
+
+    calls.clear()
+    pipeline.process_batch(images)
+    assert calls == [(3, 4, 4)]
+
+
+def test_profiling(tmp_path):
+    pipeline = BasePipeline()
+    pipeline.add_operation(np.asarray)
+    pipeline.add_operation(lambda image: np.tile(image, (100, 100)))
+    pipeline.enable_profiling(OperationProfiler(trace_memory=True))
+    for value in range(4):
+        pipeline.process(np.full((2, 2), value, dtype=np.float64))
+
+    stats = pipeline.profiler.stats()
+    assert list(stats) == ['asarray', '<lambda>']
+    tile = stats['<lambda>']
+    assert tile['calls'] == 4
+    assert tile['output_bytes']['p50'] == 200 * 200 * 8
+    assert tile['peak_bytes']['max'] >= 200 * 200 * 8
+    assert tile['wall_s']['p50'] <= tile['wall_s']['max']
+
+    pipeline.profiler.dump(str(tmp_path / "profile.json"))
+    with open(tmp_path / "profile.json") as f:
+        assert json.load(f) == stats
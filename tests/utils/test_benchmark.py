@@ -0,0 +1,24 @@
+import pytest
+from src.utils.benchmark import OPERATION_CASES, benchmark_operations, benchmark_converter, compare_to_baseline
+from src.utils.synthetic import write_synthetic_dataset
+
+
+@pytest.fixture
+def dicom_paths(tmp_path):
+    return write_synthetic_dataset(str(tmp_path), n_images=2, rows=600, columns=480, photometric='MONOCHROME1')
+
+
+def test_benchmark_operations(dicom_paths):
+    results = benchmark_operations(dicom_paths, repeats=1)
+    assert list(results) == [name for name, _, _ in OPERATION_CASES]
+    assert all(value > 0 for value in results.values())
+
+
+def test_benchmark_converter(dicom_paths):
+    assert benchmark_converter(dicom_paths, batch_size=2, n_workers=1) > 0
+
+
+def test_compare_to_baseline():
+    baseline = {'read_dicom': 100.0, 'resize': 1000.0, 'clahe': 10.0}
+    regressions = compare_to_baseline({'read_dicom': 80.0, 'resize': 500.0}, baseline, tolerance=0.3)
+    assert [(r['name'], r['ratio']) for r in regressions] == [('resize', 0.5), ('clahe', None)]
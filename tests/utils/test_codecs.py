@@ -0,0 +1,41 @@
+import h5py
+import pytest
+import numpy as np
+from src.utils.codecs import codec_options, chunk_shape, autotune, recommend
+
+
+def test_codec_options():
+    assert codec_options('none') == {}
+    assert codec_options('lzf') == {'compression': 'lzf'}
+    assert codec_options('gzip') == {'compression': 'gzip', 'compression_opts': 4}
+    assert codec_options('gzip-9') == {'compression': 'gzip', 'compression_opts': 9}
+    with pytest.raises(ValueError):
+        codec_options('rar')
+
+
+def test_chunk_shape():
+    assert chunk_shape('auto', (224, 224)) is None
+    assert chunk_shape('image', (224, 224)) == (1, 224, 224)
+    assert chunk_shape('images-8', (224, 224)) == (8, 224, 224)
+    assert chunk_shape('images-8', (224, 224), n_images=3) == (3, 224, 224)
+    assert chunk_shape('tile-64', (224, 100)) == (1, 64, 64)
+    assert chunk_shape('tile-512', (224, 100)) == (1, 224, 100)
+    with pytest.raises(ValueError):
+        chunk_shape('rows', (224, 224))
+
+
+@pytest.mark.parametrize("codec", ['none', 'lzf', 'gzip-1'])
+@pytest.mark.parametrize("layout", ['auto', 'image', 'images-4', 'tile-8'])
+def test_codec_roundtrip(tmp_path, codec, layout):
+    images = np.random.default_rng(0).integers(0, 255, size=(5, 16, 16), dtype=np.uint8)
+    with h5py.File(tmp_path / "x.h5", 'w') as f:
+        f.create_dataset('x', data=images, chunks=chunk_shape(layout, images.shape[1:], len(images)), **codec_options(codec))
+    with h5py.File(tmp_path / "x.h5", 'r') as f:
+        np.testing.assert_array_equal(f['x'][:], images)
+
+
+def test_autotune_recommendations():
+    images = np.zeros((4, 16, 16), dtype=np.uint8)
+    results = autotune(images, ['none', 'gzip-1'], ['image'], n_reads=5)
+    assert len(results) == 2
+    assert recommend(results)['smallest']['codec'] == 'gzip-1'
@@ -0,0 +1,176 @@
+import os
+import h5py
+import pytest
+import torch
+import numpy as np
+from src.utils import dataset as dataset_module
+from torch.utils.data import DataLoader
+from src.utils.dataset import HDF5ChunkedDataset, AugmentedDataset, MemmapDataset, TarShardDataset, INDEX_CACHE_FILENAME
+from src.core.converters.writers import NpySplitWriter, TarShardWriter
+from src.utils.samplers import ClassBalancedSampler
+
+
+def write_chunk(path, images, offset=0):
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('x', data=images)
+        f.create_dataset('y_birads', data=np.arange(len(images)) + offset)
+        f.create_dataset('y_lesions', data=np.zeros(len(images), dtype=np.int64))
+
+
+@pytest.fixture
+def chunk_dir(tmp_path):
+    sizes = [3, 1, 4]
+    offset = 0
+    for i, size in enumerate(sizes):
+        images = np.full((size, 4, 4), i, dtype=np.float32)
+        write_chunk(str(tmp_path / f"batch_{i:04d}.h5"), images, offset)
+        offset += size
+    return tmp_path
+
+
+def test_index_maps_samples_to_files(chunk_dir):
+    dataset = HDF5ChunkedDataset(str(chunk_dir))
+
+    assert len(dataset) == 8
+    assert [dataset.locate(i) for i in (0, 2, 3, 4, 7, -1)] == [(0, 0), (0, 2), (1, 0), (2, 0), (2, 3), (2, 3)]
+    assert [int(dataset[i][1]['birads']) for i in range(len(dataset))] == list(range(8))
+    assert float(dataset[3][0].max()) == 1.0
+    with pytest.raises(IndexError):
+        dataset[8]
+
+
+
+def test_preallocated_split_file_exposes_written_rows(tmp_path):
+    # Split file of an interrupted conversion: capacity of 8 rows, 3 written
+    images = np.zeros((8, 4, 4), dtype=np.float32)
+    images[:3] = np.arange(1, 4, dtype=np.float32)[:, None, None]
+    write_chunk(str(tmp_path / "train.h5"), images)
+    with h5py.File(tmp_path / "train.h5", 'a') as f:
+        f.attrs['n_rows'] = 3
+    dataset = HDF5ChunkedDataset(str(tmp_path))
+
+    assert len(dataset) == 3
+    assert [float(image[0, 0, 0]) for image, _ in dataset.__getitems__([2, 0, 1])] == [3.0, 1.0, 2.0]
+    with pytest.raises(IndexError):
+        dataset[3]
+
+
+def test_handles_stay_open_and_are_dropped_after_fork(chunk_dir):
+    dataset = HDF5ChunkedDataset(str(chunk_dir), max_open_files=2)
+    for i in range(len(dataset)):
+        dataset[i]
+    assert sorted(dataset._handles) == [1, 2]
+
+    dataset._pid = -1  # Pretend the dataset was inherited from another process
+    dataset[0]
+    assert list(dataset._handles) == [0]
+    dataset.close()
+    assert not dataset._handles
+
+
+def test_index_cache_only_rescans_changed_files(chunk_dir, monkeypatch):
+    HDF5ChunkedDataset(str(chunk_dir))
+    assert os.path.exists(chunk_dir / INDEX_CACHE_FILENAME)
+
+    write_chunk(str(chunk_dir / "batch_0001.h5"), np.zeros((2, 4, 4), dtype=np.float32))
+    opened = []
+    original = dataset_module.h5py.File
+    monkeypatch.setattr(dataset_module.h5py, 'File', lambda path, *args, **kwargs: opened.append(path) or original(path, *args, **kwargs))
+
+    dataset = HDF5ChunkedDataset(str(chunk_dir))
+    assert dataset.chunk_sizes == [3, 2, 4]
+    assert [os.path.basename(path) for path in opened] == ["batch_0001.h5"]
+
+
+def test_getitems_matches_getitem(chunk_dir):
+    dataset = HDF5ChunkedDataset(str(chunk_dir))
+    indices = [7, 0, 3, 2, 7, -8]
+
+    batch = dataset.__getitems__(indices)
+
+    for idx, (image, labels) in zip(indices, batch):
+        expected_image, expected_labels = dataset[idx]
+        assert torch.equal(image, expected_image)
+        assert labels == expected_labels
+
+
+def test_augmented_dataset_reads_labels_only(tmp_path, monkeypatch):
+    import albumentations as A
+    images = np.arange(4 * 2 * 3, dtype=np.float32).reshape(4, 2, 3) * 10
+    with h5py.File(tmp_path / "batch_0000.h5", 'w') as f:
+        f.create_dataset('x', data=images)
+        f.create_dataset('y_birads', data=[0, 0, 0, 1])
+        f.create_dataset('y_lesions', data=[1, 0, 1, 1])
+    dataset = AugmentedDataset(HDF5ChunkedDataset(str(tmp_path)), A.Compose([A.HorizontalFlip(p=1)]))
+
+    monkeypatch.setattr(HDF5ChunkedDataset, '_datasets', lambda *args: pytest.fail("images were read"))
+    assert dataset.class_counts() == {0: 3, 1: 1}
+    monkeypatch.undo()
+
+    image, labels = dataset[1]
+    assert image.shape == (1, 2, 3) and image.dtype == torch.float32
+    np.testing.assert_allclose(image[0].numpy(), images[1][:, ::-1], rtol=1e-5)
+    assert labels['birads'] == 0 and labels['lesion'] == 0
+
+    sampler = ClassBalancedSampler(dataset.labels(), num_samples=8)
+    loader = DataLoader(dataset, batch_size=4, sampler=sampler)
+    assert sum(len(labels['birads']) for _, labels in loader) == 8
+
+
+def test_memmap_dataset_returns_views(tmp_path):
+    images = np.arange(4 * 2 * 3, dtype=np.float32).reshape(4, 2, 3)
+    with NpySplitWriter(str(tmp_path), {'y_birads': {}, 'y_lesions': {}}, expected_rows=8) as writer:
+        for i, image in enumerate(images):
+            writer.append(image, [i, 2 * i])
+        writer.end_chunk()
+
+    dataset = MemmapDataset(str(tmp_path))
+    image, labels = dataset[2]
+
+    assert len(dataset) == 4
+    assert torch.equal(image, torch.from_numpy(images[2]).unsqueeze(0))
+    assert image.untyped_storage().data_ptr() == dataset.images[2].ctypes.data
+    assert labels == {'birads': 2, 'lesion': 4}
+    image.zero_()  # Copy-on-write: the file is left untouched
+    np.testing.assert_array_equal(np.load(tmp_path / "x.npy")[2], images[2])
+
+
+def test_tar_shard_dataset_streams_every_sample_once(tmp_path):
+    attrs = {'storage_dtype': 'uint8', 'scale': 0.5, 'offset': 1.0}
+    with TarShardWriter(str(tmp_path), {'y_birads': {}, 'y_lesions': {}}, shard_size=3, x_attrs=attrs) as writer:
+        for i in range(10):
+            writer.append(np.full((2, 2), i, dtype=np.uint8), [i, 0])
+        writer.end_chunk()
+
+    dataset = TarShardDataset(str(tmp_path), shuffle_buffer=4, seed=3)
+    samples = list(dataset)
+    assert len(dataset) == len(samples) == 10
+    assert sorted(int(labels['birads']) for _, labels in samples) == list(range(10))
+    for image, labels in samples:
+        assert image.shape == (1, 2, 2) and image.dtype == torch.float32
+        assert float(image[0, 0, 0]) == int(labels['birads']) * 0.5 + 1.0
+
+    dataset.set_epoch(1)
+    assert [int(labels['birads']) for _, labels in dataset] != [int(labels['birads']) for _, labels in samples]
+
+    loader = DataLoader(TarShardDataset(str(tmp_path)), batch_size=4, num_workers=2)
+    assert sorted(int(i) for _, labels in loader for i in labels['birads']) == list(range(10))
+
+
+def test_uint16_storage_batches_as_int32(tmp_path):
+    images = np.arange(4 * 2 * 2, dtype=np.uint16).reshape(4, 2, 2) * 1000
+    attrs = {'storage_dtype': 'uint16', 'scale': 0.5, 'offset': 0.0}
+    write_chunk(str(tmp_path / "batch_0000.h5"), images)
+    for output_dir, writer_class in [("npy", NpySplitWriter), ("tar", TarShardWriter)]:
+        os.makedirs(tmp_path / output_dir)
+        with writer_class(str(tmp_path / output_dir), {'y_birads': {}, 'y_lesions': {}}, x_attrs=attrs) as writer:
+            for i, image in enumerate(images):
+                writer.append(image, [i, 0])
+            writer.end_chunk()
+
+    datasets = [HDF5ChunkedDataset(str(tmp_path), dequantize=False), MemmapDataset(str(tmp_path / "npy"), dequantize=False),
+                TarShardDataset(str(tmp_path / "tar"), dequantize=False, shuffle=False)]
+    for dataset in datasets:
+        (batch, labels), = list(DataLoader(dataset, batch_size=4))
+        assert batch.dtype == torch.int32 and batch.shape == (4, 1, 2, 2)
+        np.testing.assert_array_equal(batch[:, 0].numpy(), images)
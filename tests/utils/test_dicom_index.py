@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pydicom.dataset import Dataset
+from pydicom.uid import ExplicitVRLittleEndian
+from src.utils import dicom_index
+from src.utils.dicom_index import build_index, schedule
+from src.processing.operations.read import read_dicom
+from src.utils.synthetic import write_dicom
+
+
+@pytest.fixture
+def dicom_files(tmp_path):
+    return [
+        write_dicom(tmp_path / "small.dcm", np.zeros((4, 6))),
+        write_dicom(tmp_path / "large.dcm", np.zeros((8, 8)), photometric='MONOCHROME1', bits_stored=10),
+        str(tmp_path / "missing.dcm"),
+    ]
+
+
+def test_index_reads_headers_only(dicom_files, monkeypatch):
+    monkeypatch.setattr(Dataset, 'pixel_array', property(lambda ds: pytest.fail("pixel data decoded")))
+    index = build_index(dicom_files)
+
+    assert list(index['path']) == dicom_files
+    assert list(index['rows'][:2]) == [4, 8] and list(index['columns'][:2]) == [6, 8]
+    assert list(index['bits_stored'][:2]) == [12, 10]
+    assert list(index['photometric_interpretation'][:2]) == ['MONOCHROME2', 'MONOCHROME1']
+    assert index['transfer_syntax'][0] == ExplicitVRLittleEndian
+    assert index['error'][:2].isna().all() and 'FileNotFoundError' in index['error'][2]
+
+
+@pytest.mark.parametrize("extension", ["parquet", "csv"])
+def test_saved_index_is_reused(dicom_files, tmp_path, monkeypatch, extension):
+    filename = str(tmp_path / f"index.{extension}")
+    first = build_index(dicom_files, filename)
+
+    read = []
+    original = dicom_index.read_header
+    monkeypatch.setattr(dicom_index, 'read_header', lambda path: read.append(path) or original(path))
+    second = build_index(dicom_files[::-1], filename)
+
+    assert read == [dicom_files[2]]  # Only the unreadable file is read again
+    pd.testing.assert_frame_equal(second.iloc[::-1].reset_index(drop=True), first)
+
+
+
+@pytest.mark.parametrize("extension", ["parquet", "csv"])
+def test_missing_file_is_read_once_created(dicom_files, tmp_path, extension):
+    filename = str(tmp_path / f"index.{extension}")
+    build_index(dicom_files, filename)
+
+    write_dicom(dicom_files[2], np.zeros((2, 3)))
+    index = build_index(dicom_files, filename)
+
+    assert index['error'].isna().all()
+    assert index['rows'][2] == 2 and index['columns'][2] == 3
+
+
+def test_schedule(dicom_files):
+    index = build_index(dicom_files)
+    assert schedule(dicom_files, index) == ([0, 1], [2])
+    assert schedule(dicom_files, index, 'size') == ([1, 0], [2])
+    with pytest.raises(ValueError):
+        schedule(dicom_files, index, 'random')
+
+
+def test_read_dicom_inverts_monochrome1(tmp_path):
+    pixels = np.array([[0, 1], [1000, 1023]])
+    for photometric in ['MONOCHROME1', 'MONOCHROME2']:
+        path = write_dicom(tmp_path / f"{photometric}.dcm", pixels, photometric=photometric, bits_stored=10)
+        np.testing.assert_array_equal(read_dicom(path), pixels)
+        np.testing.assert_array_equal(read_dicom(path, lean=True), pixels)
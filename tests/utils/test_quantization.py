@@ -0,0 +1,30 @@
+import pytest
+import numpy as np
+from src.utils.quantization import Quantizer, dequantize, dequantization_params
+
+
+@pytest.mark.parametrize("storage_dtype, tolerance", [
+    ('float32', 0), ('float16', 0.125), ('uint16', 255 / 65535), ('uint8', 0.5),
+])
+def test_roundtrip(storage_dtype, tolerance):
+    image = np.random.default_rng(0).uniform(0, 255, size=(32, 32)).astype(np.float32)
+    quantizer = Quantizer(storage_dtype, (0, 255))
+
+    encoded = quantizer.encode(image)
+    decoded = dequantize(encoded, *dequantization_params(quantizer.attrs()))
+
+    assert encoded.dtype == np.dtype(storage_dtype)
+    assert decoded.dtype == np.float32
+    assert np.abs(decoded - image).max() <= tolerance + 1e-4
+
+
+def test_values_outside_range_are_clipped():
+    quantizer = Quantizer('uint8', (10, 20))
+    np.testing.assert_array_equal(quantizer.encode(np.array([0.0, 10.0, 20.0, 30.0])), [0, 0, 255, 255])
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        Quantizer('int4')
+    with pytest.raises(ValueError):
+        Quantizer('uint8', (1, 1))
@@ -0,0 +1,45 @@
+import pytest
+import numpy as np
+from src.utils.samplers import ChunkShuffleBatchSampler, ClassBalancedSampler
+
+
+def test_every_index_once_per_epoch():
+    sampler = ChunkShuffleBatchSampler([5, 3, 7], batch_size=4, shuffle_buffer=3)
+    batches = list(sampler)
+
+    assert len(batches) == len(sampler) == 4
+    assert sorted(idx for batch in batches for idx in batch) == list(range(15))
+
+
+def test_order_depends_on_seed_and_epoch():
+    sampler = ChunkShuffleBatchSampler([50, 50], batch_size=10, seed=1)
+    first = list(sampler)
+    assert list(sampler) == first
+    sampler.set_epoch(1)
+    assert list(sampler) != first
+
+
+def test_unit_buffer_reads_files_sequentially():
+    sampler = ChunkShuffleBatchSampler([4, 4], batch_size=8, shuffle_buffer=1)
+    (batch,) = list(sampler)
+    assert batch in ([0, 1, 2, 3, 4, 5, 6, 7], [4, 5, 6, 7, 0, 1, 2, 3])
+
+
+def test_drop_last():
+    sampler = ChunkShuffleBatchSampler([5, 6], batch_size=4, drop_last=True)
+    assert len(sampler) == len(list(sampler)) == 2
+    with pytest.raises(ValueError):
+        ChunkShuffleBatchSampler([5], batch_size=0)
+
+
+def test_class_balanced_sampler_draws_classes_equally():
+    labels = [0] * 90 + [1] * 9 + [2]
+    sampler = ClassBalancedSampler(labels, num_samples=3000, seed=1)
+    counts = np.bincount(np.asarray(labels)[list(sampler)], minlength=3)
+
+    assert len(sampler) == counts.sum() == 3000
+    assert all(abs(count - 1000) < 100 for count in counts)
+    first = list(sampler)
+    assert list(sampler) == first
+    sampler.set_epoch(1)
+    assert list(sampler) != first
@@ -0,0 +1,61 @@
+import os
+from src.utils.staging import StagingCache
+
+
+def make_files(tmp_path, n, size=100):
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    paths = []
+    for i in range(n):
+        path = src_dir / f"{i}.dicom"
+        path.write_bytes(bytes([i]) * size)
+        paths.append(str(path))
+    return paths
+
+# ---------------------------------------------------------------------
+# 1. Staged paths stay aligned with the inputs, even with missing files
+# ---------------------------------------------------------------------
+def test_stage_keeps_alignment(tmp_path):
+    paths = make_files(tmp_path, 3)
+    paths.insert(1, str(tmp_path / "src" / "missing.dicom"))
+
+    with StagingCache(str(tmp_path / "cache")) as cache:
+        staged = cache.stage(paths)
+
+        assert len(staged) == len(paths)
+        assert staged[1] == paths[1]
+        for src, local in zip(paths[::2], staged[::2]):
+            assert local.startswith(str(tmp_path / "cache"))
+            assert open(local, 'rb').read() == open(src, 'rb').read()
+
+# ---------------------------------------------------------------------
+# 2. The byte budget is enforced by evicting released files, LRU first
+# ---------------------------------------------------------------------
+def test_budget_evicts_least_recently_used(tmp_path):
+    paths = make_files(tmp_path, 4)
+
+    with StagingCache(str(tmp_path / "cache"), max_bytes=250) as cache:
+        first = cache.stage(paths[:2])
+        cache.release(paths[:2])
+        # Touch file 0 so that file 1 becomes the least recently used entry
+        cache.stage(paths[:1])
+        cache.release(paths[:1])
+        third = cache.stage(paths[2:3])
+
+        assert cache.used_bytes <= 250
+        assert os.path.exists(first[0])
+        assert not os.path.exists(first[1])
+        assert os.path.exists(third[0])
+
+# ---------------------------------------------------------------------
+# 3. Pinned files are never evicted: over-budget files are read in place
+# ---------------------------------------------------------------------
+def test_pinned_files_are_not_evicted(tmp_path):
+    paths = make_files(tmp_path, 3)
+
+    with StagingCache(str(tmp_path / "cache"), max_bytes=250) as cache:
+        staged = cache.stage(paths)
+
+        assert all(os.path.exists(p) for p in staged)
+        assert staged[2] == paths[2]
+        assert cache.hits == 0 and cache.misses == 3